@@ -0,0 +1,70 @@
+"""
+Storage backends of the managers.
+
+The backend class is set with the DOCUMENTS_BACKEND setting, the fully qualified
+class name, and created per key space with the keyword arguments of the
+DOCUMENTS_BACKEND_OPTIONS setting. The default is the embedded SQLite backend.
+"""
+import threading
+
+from django.conf import settings
+from django.utils.importlib import import_module
+
+from base import Backend, ColumnFamily, NotFoundException
+
+
+DEFAULT_BACKEND = 'django_documents.backends.sqlite.SQLiteBackend'
+
+
+def load_backend_class(fq_classname):
+    module_name, class_name = fq_classname.rsplit('.', 1)
+    return getattr(import_module(module_name), class_name)
+
+
+class BackendCache(object):
+    """
+    The backends per key space
+    """
+    # Use the Borg pattern to share state between all instances. Details at
+    # http://aspn.activestate.com/ASPN/Cookbook/Python/Recipe/66531.
+    __shared_state = dict(
+        backends = {},
+        # incremented by close_all, see Manager._get_column_family
+        generation = 0,
+        _lock = threading.Lock(),
+    )
+
+    def __init__(self):
+        self.__dict__ = self.__shared_state
+
+    def get_backend(self, key_space_name):
+        if getattr(settings, 'ISINTEST', False):
+            key_space_name = 'TEST_' + key_space_name
+        try:
+            return self.backends[key_space_name]
+        except KeyError:
+            with self._lock:
+                backend = self.backends.get(key_space_name)
+                if backend is None:
+                    backend_class = load_backend_class(getattr(settings, 'DOCUMENTS_BACKEND', DEFAULT_BACKEND))
+                    options = getattr(settings, 'DOCUMENTS_BACKEND_OPTIONS', {})
+                    backend = self.backends[key_space_name] = backend_class(key_space_name, **options)
+            return backend
+
+    def close_all(self):
+        """
+        Closes all backends, a next get_backend creates new ones
+        """
+        with self._lock:
+            backends = self.backends.values()
+            self.backends.clear()
+            self.generation += 1
+        for backend in backends:
+            backend.close()
+
+
+backendCache = BackendCache()
+
+
+def get_backend(key_space_name):
+    return backendCache.get_backend(key_space_name)
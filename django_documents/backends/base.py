@@ -0,0 +1,93 @@
+"""
+The interface of storage backends.
+
+A backend stores the documents of one key space, in column families. A column
+family maps keys to rows, a row is a dict of column name to (string) value,
+like the Cassandra column families the managers were written for.
+"""
+
+
+class NotFoundException(Exception):
+    """
+    The key, or none of the requested columns, is not in the column family
+    """
+    pass
+
+
+class ColumnFamily(object):
+    """
+    The rows of one column family
+    """
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+
+    def insert(self, key, columns, replace = False):
+        """
+        Stores the columns (dict of name to value) of the row with key, other
+        columns of the row are kept, unless replace is set: the columns are
+        the whole row then
+        """
+        raise NotImplementedError()
+
+    def batch_insert(self, rows, replace = False):
+        """
+        Stores the columns of many rows, rows is a list of (key, columns) like insert.
+        Backends should override this, to write the rows at once.
+        """
+        for key, columns in rows:
+            self.insert(key, columns, replace)
+
+    def get(self, key, columns = None):
+        """
+        Returns the dict with the columns of the row with key, only the given columns
+        when columns is not None. Raises a NotFoundException when there is nothing to return.
+        """
+        raise NotImplementedError()
+
+    def multiget(self, keys, columns = None):
+        """
+        Returns a SortedDict with per found key its columns, like get, in the order of keys.
+        Backends should override this, with as few round trips as possible.
+        """
+        from django.utils.datastructures import SortedDict
+        result = SortedDict()
+        for key in keys:
+            try:
+                result[key] = self.get(key, columns)
+            except NotFoundException:
+                pass
+        return result
+
+    def remove(self, key, columns = None):
+        """
+        Removes the row with key, or only the given columns of it
+        """
+        raise NotImplementedError()
+
+    def get_range(self, start = '', finish = '', count = None, columns = None):
+        """
+        Generator yielding (key, columns) for the rows with start <= key <= finish,
+        ordered by key. An empty finish means no upper bound, count limits the number of rows.
+        """
+        raise NotImplementedError()
+
+
+class Backend(object):
+    """
+    The storage of one key space
+    """
+
+    def __init__(self, key_space_name, **options):
+        self.key_space_name = key_space_name
+        self.options = options
+
+    def get_column_family(self, name):
+        """
+        Returns the ColumnFamily name, it is created when it doesn't exist
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        pass
@@ -0,0 +1,255 @@
+"""
+Embedded SQLite backend, with a database file per key space.
+
+Options (DOCUMENTS_BACKEND_OPTIONS):
+- path: the directory of the database files, ':memory:' (the default) keeps
+  the key spaces in memory
+- timeout: seconds to wait for a lock held by another connection
+- synchronous: the synchronous pragma, NORMAL is safe in WAL mode
+
+A column family is a table with a row per column of a document. File databases
+are used in WAL mode, so reading doesn't block writing, with a connection per
+thread and process. The connection of a thread is closed when the thread ends.
+An in-memory database has one connection that is shared by all threads. The
+SQL of the statements is built once per column family, so the statement cache
+of the connections reuses the prepared statements.
+"""
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+from django.utils.datastructures import SortedDict
+
+from base import Backend, ColumnFamily, NotFoundException
+
+
+MEMORY = ':memory:'
+
+# SQLite allows 999 parameters per statement
+MAX_PARAMETERS = 500
+
+# number of keys read at a time by get_range
+RANGE_PAGE_SIZE = 256
+
+CACHED_STATEMENTS = 256
+
+# tables without rowid store the rows in the primary key index
+WITHOUT_ROWID = " WITHOUT ROWID" if sqlite3.sqlite_version_info >= (3, 8, 2) else ""
+
+
+def _chunks(items, size):
+    for i in xrange(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SQLiteColumnFamily(ColumnFamily):
+
+    def __init__(self, backend, name):
+        super(SQLiteColumnFamily, self).__init__(backend, name)
+        table = '"cf_%s"' % name.replace('"', '""')
+        self.create_sql = ('CREATE TABLE IF NOT EXISTS %s (key TEXT NOT NULL, name TEXT NOT NULL, value TEXT, '
+                           'PRIMARY KEY (key, name))%s' % (table, WITHOUT_ROWID))
+        self.insert_sql = 'INSERT OR REPLACE INTO %s (key, name, value) VALUES (?, ?, ?)' % table
+        self.get_sql = 'SELECT name, value FROM %s WHERE key = ?' % table
+        self.get_columns_sql = 'SELECT name, value FROM %s WHERE key = ? AND name IN (%%s)' % table
+        self.multiget_sql = 'SELECT key, name, value FROM %s WHERE key IN (%%s)' % table
+        self.remove_sql = 'DELETE FROM %s WHERE key = ?' % table
+        self.remove_column_sql = 'DELETE FROM %s WHERE key = ? AND name = ?' % table
+        # the first page of get_range starts at start, the next pages after the last key read
+        self.range_sql = 'SELECT DISTINCT key FROM %s WHERE key %%s ? ORDER BY key LIMIT ?' % table
+        self.range_finish_sql = 'SELECT DISTINCT key FROM %s WHERE key %%s ? AND key <= ? ORDER BY key LIMIT ?' % table
+        # statements with n parameters in IN (...), by (statement, n)
+        self._in_sql = {}
+
+    def _get_in_sql(self, sql, count):
+        try:
+            return self._in_sql[(sql, count)]
+        except KeyError:
+            in_sql = self._in_sql[(sql, count)] = sql % ", ".join(["?"] * count)
+            return in_sql
+
+    def insert(self, key, columns, replace = False):
+        rows = [(key, name, value) for name, value in columns.iteritems()]
+        with self.backend.transaction() as connection:
+            if replace:
+                connection.execute(self.remove_sql, (key,))
+            connection.executemany(self.insert_sql, rows)
+
+    def batch_insert(self, rows, replace = False):
+        # one transaction for all rows
+        keys = [(key,) for key, columns in rows]
+        rows = [(key, name, value) for key, columns in rows for name, value in columns.iteritems()]
+        with self.backend.transaction() as connection:
+            if replace:
+                connection.executemany(self.remove_sql, keys)
+            connection.executemany(self.insert_sql, rows)
+
+    def get(self, key, columns = None):
+        with self.backend.connection() as connection:
+            if columns is None:
+                rows = connection.execute(self.get_sql, (key,)).fetchall()
+            else:
+                columns = list(columns)
+                if not columns:
+                    raise NotFoundException(key)
+                rows = connection.execute(self._get_in_sql(self.get_columns_sql, len(columns)),
+                                          [key] + columns).fetchall()
+        if not rows:
+            raise NotFoundException(key)
+        return dict(rows)
+
+    def multiget(self, keys, columns = None):
+        keys = list(keys)
+        if columns is not None:
+            columns = set(columns)
+        found = {}
+        with self.backend.connection() as connection:
+            for chunk in _chunks(keys, MAX_PARAMETERS):
+                cursor = connection.execute(self._get_in_sql(self.multiget_sql, len(chunk)), chunk)
+                for key, name, value in cursor:
+                    if columns is None or name in columns:
+                        row = found.get(key)
+                        if row is None:
+                            row = found[key] = {}
+                        row[name] = value
+        result = SortedDict()
+        for key in keys:
+            if key in found:
+                result[key] = found[key]
+        return result
+
+    def remove(self, key, columns = None):
+        with self.backend.transaction() as connection:
+            if columns is None:
+                connection.execute(self.remove_sql, (key,))
+            else:
+                connection.executemany(self.remove_column_sql, [(key, name) for name in columns])
+
+    def get_range(self, start = '', finish = '', count = None, columns = None):
+        operator = '>='
+        while count is None or count > 0:
+            page_size = RANGE_PAGE_SIZE if count is None else min(count, RANGE_PAGE_SIZE)
+            with self.backend.connection() as connection:
+                if finish:
+                    keys = connection.execute(self.range_finish_sql % operator, (start, finish, page_size)).fetchall()
+                else:
+                    keys = connection.execute(self.range_sql % operator, (start, page_size)).fetchall()
+            if not keys:
+                return
+            keys = [key for (key,) in keys]
+            for key, row in self.multiget(keys, columns).iteritems():
+                yield key, row
+            if count is not None:
+                count -= len(keys)
+            start = keys[-1]
+            operator = '>'
+
+
+class ThreadConnection(object):
+    """
+    The connection of a thread, only the thread local data refers to it, so the
+    connection is closed when the thread ends
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.pid = os.getpid()
+
+    def __del__(self):
+        self.connection.close()
+
+
+class SQLiteBackend(Backend):
+
+    def __init__(self, key_space_name, path = MEMORY, timeout = 30.0, synchronous = 'NORMAL', **options):
+        super(SQLiteBackend, self).__init__(key_space_name, **options)
+        if path == MEMORY:
+            self.database = MEMORY
+        else:
+            self.database = os.path.join(path, "%s.sqlite3" % key_space_name)
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        # the ThreadConnections in use, to close them with close
+        self._thread_connections = weakref.WeakSet()
+        self._shared_connection = None
+        self._column_families = {}
+
+    def _connect(self):
+        connection = sqlite3.connect(self.database, timeout = self.timeout, check_same_thread = False,
+                                     cached_statements = CACHED_STATEMENTS)
+        connection.text_factory = unicode
+        if self.database != MEMORY:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=%s' % self.synchronous)
+        return connection
+
+    def get_connection(self):
+        """
+        Returns the connection of the current thread
+        """
+        if self.database == MEMORY:
+            with self._lock:
+                if self._shared_connection is None:
+                    self._shared_connection = self._connect()
+                return self._shared_connection
+        local = self._local
+        thread_connection = getattr(local, 'thread_connection', None)
+        # a forked process must not use the connection of its parent
+        if thread_connection is None or thread_connection.pid != os.getpid():
+            thread_connection = local.thread_connection = ThreadConnection(self._connect())
+            with self._lock:
+                self._thread_connections.add(thread_connection)
+        return thread_connection.connection
+
+    @contextmanager
+    def connection(self):
+        """
+        Context with the connection, for reading
+        """
+        if self.database == MEMORY:
+            # all threads share the connection
+            with self._lock:
+                yield self.get_connection()
+        else:
+            yield self.get_connection()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context with the connection, committed at the end or rolled back on an exception
+        """
+        with self.connection() as connection:
+            try:
+                yield connection
+            except:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def get_column_family(self, name):
+        try:
+            return self._column_families[name]
+        except KeyError:
+            with self._lock:
+                column_family = self._column_families.get(name)
+                if column_family is None:
+                    column_family = SQLiteColumnFamily(self, name)
+                    with self.transaction() as connection:
+                        connection.execute(column_family.create_sql)
+                    self._column_families[name] = column_family
+            return column_family
+
+    def close(self):
+        with self._lock:
+            connections = [thread_connection.connection for thread_connection in self._thread_connections]
+            if self._shared_connection is not None:
+                connections.append(self._shared_connection)
+            self._thread_connections = weakref.WeakSet()
+            self._shared_connection = None
+            self._local = threading.local()
+        for connection in connections:
+            connection.close()
@@ -0,0 +1,452 @@
+"""
+Compact binary serialization of documents.
+
+Field values are written by position, in the order of ``_meta.fields``, so field
+names are never written. The fully qualified class name of a document is written
+only the first time the class occurs in a stream, after that the class is
+referred to by its number in the class table of the stream. A BinaryStreamWriter
+writes many documents to a stream with one class table, a document written on
+its own (by BinarySerializer, or by serialize_many, whose workers encode the
+documents independently) starts a new class table. Integers and lengths are
+written as (zigzag) varints.
+
+Both sides must use the same model definitions, fields added at the end of a
+model are tolerated in both directions.
+"""
+import datetime
+import decimal
+import struct
+import types
+
+from django.utils.encoding import smart_unicode
+from django.utils.tzinfo import FixedOffset
+
+from .utils import get_fqclassname_forclass, get_class
+
+
+FORMAT_VERSION = 1
+# version of a document that continues the class table of the document before it
+CONTINUED_FORMAT_VERSION = 2
+
+# value tags
+NONE = 0
+FALSE = 1
+TRUE = 2
+INT = 3
+FLOAT = 4
+UNICODE = 5
+BYTES = 6
+DECIMAL = 7
+DATE = 8
+DATETIME = 9
+DATETIME_TZ = 10
+TIME = 11
+LIST = 12
+DICT = 13
+OBJECT = 14
+
+_DOUBLE = struct.Struct('<d')
+_BYTE_CHARS = [chr(i) for i in range(256)]
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_MICROSECONDS_PER_SECOND = 1000000
+
+
+def _varint(value):
+    """
+    Returns the varint encoding of a non negative integer
+    """
+    if value < 0x80:
+        return _BYTE_CHARS[value]
+    chars = []
+    while value >= 0x80:
+        chars.append(_BYTE_CHARS[(value & 0x7f) | 0x80])
+        value >>= 7
+    chars.append(_BYTE_CHARS[value])
+    return ''.join(chars)
+
+
+def _zigzag(value):
+    if value < 0:
+        return ((-value) << 1) - 1
+    return value << 1
+
+
+def _unzigzag(value):
+    if value & 1:
+        return -((value + 1) >> 1)
+    return value >> 1
+
+
+def _time_to_microseconds(value):
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * _MICROSECONDS_PER_SECOND + value.microsecond
+
+
+def _microseconds_to_time(microseconds):
+    seconds, microsecond = divmod(microseconds, _MICROSECONDS_PER_SECOND)
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return hour, minute, second, microsecond
+
+
+class BinaryPlan(object):
+    """
+    Per class description of the positional layout of a document
+    """
+
+    def __init__(self, clazz):
+        from .documents import DynamicModel
+        self.clazz = clazz
+        self.clazz_name = get_fqclassname_forclass(clazz)
+        self.attnames = tuple([field.attname for field in clazz._meta.fields])
+        self.is_dynamic = issubclass(clazz, DynamicModel)
+
+
+def get_binary_plan(clazz):
+    """
+    Returns the (cached) binary layout for a model class
+    """
+    meta = clazz._meta
+    try:
+        return meta._binary_plan
+    except AttributeError:
+        plan = meta._binary_plan = BinaryPlan(clazz)
+        return plan
+
+
+class _Encoder(object):
+
+    def __init__(self, ignore_missing = False):
+        self.chunks = []
+        self.write = self.chunks.append
+        self.class_ids = {}
+        self.ignore_missing = ignore_missing
+
+    def encode_document(self, obj, continued = False):
+        self.write(_BYTE_CHARS[CONTINUED_FORMAT_VERSION if continued else FORMAT_VERSION])
+        self.encode_value(obj)
+
+    def getvalue(self):
+        return ''.join(self.chunks)
+
+    def reset_chunks(self):
+        self.chunks = []
+        self.write = self.chunks.append
+
+    def encode_string(self, value):
+        self.write(_varint(len(value)))
+        self.write(value)
+
+    def encode_value(self, value):
+        write = self.write
+        value_type = type(value)
+        # bool before int, bool is a subclass of int
+        if value is None:
+            write(_BYTE_CHARS[NONE])
+        elif value_type is types.BooleanType:
+            write(_BYTE_CHARS[value and TRUE or FALSE])
+        elif value_type is types.UnicodeType:
+            write(_BYTE_CHARS[UNICODE])
+            self.encode_string(value.encode('utf-8'))
+        elif value_type is types.IntType or value_type is types.LongType:
+            write(_BYTE_CHARS[INT])
+            write(_varint(_zigzag(value)))
+        elif value_type is types.FloatType:
+            write(_BYTE_CHARS[FLOAT])
+            write(_DOUBLE.pack(value))
+        elif value_type is types.StringType:
+            write(_BYTE_CHARS[BYTES])
+            self.encode_string(value)
+        elif hasattr(value, '_meta'):
+            self.encode_object(value)
+        elif isinstance(value, (types.ListType, types.TupleType)):
+            write(_BYTE_CHARS[LIST])
+            write(_varint(len(value)))
+            for item in value:
+                self.encode_value(item)
+        elif isinstance(value, types.DictType):
+            write(_BYTE_CHARS[DICT])
+            write(_varint(len(value)))
+            for key, item in value.iteritems():
+                self.encode_value(key)
+                self.encode_value(item)
+        elif isinstance(value, datetime.datetime):
+            offset = value.utcoffset()
+            if offset is None:
+                write(_BYTE_CHARS[DATETIME])
+            else:
+                write(_BYTE_CHARS[DATETIME_TZ])
+                write(_varint(_zigzag(offset.days * 1440 + offset.seconds // 60)))
+            write(_varint(_zigzag(value.toordinal() - _EPOCH_ORDINAL)))
+            write(_varint(_time_to_microseconds(value)))
+        elif isinstance(value, datetime.date):
+            write(_BYTE_CHARS[DATE])
+            write(_varint(_zigzag(value.toordinal() - _EPOCH_ORDINAL)))
+        elif isinstance(value, datetime.time):
+            write(_BYTE_CHARS[TIME])
+            write(_varint(_time_to_microseconds(value)))
+        elif isinstance(value, decimal.Decimal):
+            write(_BYTE_CHARS[DECIMAL])
+            self.encode_string(str(value))
+        elif isinstance(value, (int, long)):
+            write(_BYTE_CHARS[INT])
+            write(_varint(_zigzag(value)))
+        elif isinstance(value, float):
+            write(_BYTE_CHARS[FLOAT])
+            write(_DOUBLE.pack(value))
+        else:
+            # unicode subclasses, lazy translations and other values end up as text
+            write(_BYTE_CHARS[UNICODE])
+            self.encode_string(smart_unicode(value).encode('utf-8'))
+
+    def encode_object(self, instance):
+        write = self.write
+        clazz = instance.__class__
+        plan = get_binary_plan(clazz)
+        write(_BYTE_CHARS[OBJECT])
+        class_id = self.class_ids.get(clazz)
+        if class_id is None:
+            # first occurrence: the next free number followed by the class name
+            class_id = self.class_ids[clazz] = len(self.class_ids)
+            write(_varint(class_id))
+            self.encode_string(plan.clazz_name)
+        else:
+            write(_varint(class_id))
+
+        write(_varint(len(plan.attnames)))
+        encode_value = self.encode_value
+        for attname in plan.attnames:
+            try:
+                value = getattr(instance, attname)
+            except AttributeError:
+                if not self.ignore_missing:
+                    raise
+                value = None
+            encode_value(value)
+
+        if plan.is_dynamic:
+            dynamic_attributes = instance._get_dynamic_attributes()
+            write(_varint(len(dynamic_attributes)))
+            for name, value in dynamic_attributes.iteritems():
+                self.encode_string(name.encode('utf-8'))
+                self.encode_object(value)
+
+
+class _Decoder(object):
+
+    def __init__(self, data):
+        if isinstance(data, bytearray):
+            data = memoryview(data)
+        self.data = data
+        self.pos = 0
+        self.end = len(data)
+        self.classes = []
+        self.documents = 0
+
+    def read_varint(self):
+        data = self.data
+        pos = self.pos
+        byte = ord(data[pos])
+        pos += 1
+        if byte < 0x80:
+            self.pos = pos
+            return byte
+        result = byte & 0x7f
+        shift = 7
+        while True:
+            byte = ord(data[pos])
+            pos += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        self.pos = pos
+        return result
+
+    def read_string(self):
+        length = self.read_varint()
+        start = self.pos
+        end = start + length
+        if end > self.end:
+            raise IndexError("string runs past the end of the data")
+        self.pos = end
+        value = self.data[start:end]
+        if not isinstance(value, str):
+            # a slice of a memoryview, only the string itself is copied
+            value = value.tobytes()
+        return value
+
+    def decode_document(self):
+        version = ord(self.data[self.pos])
+        self.pos += 1
+        if version == FORMAT_VERSION:
+            # a new class table
+            self.classes = []
+        elif version != CONTINUED_FORMAT_VERSION:
+            raise ValueError("unsupported binary format version %s" % version)
+        elif not self.documents:
+            raise ValueError("the document continues the class table of the documents before it")
+        self.documents += 1
+        return self.decode_value()
+
+    def decode_value(self):
+        tag = ord(self.data[self.pos])
+        self.pos += 1
+        if tag == OBJECT:
+            return self.decode_object()
+        elif tag == UNICODE:
+            return self.read_string().decode('utf-8')
+        elif tag == INT:
+            return _unzigzag(self.read_varint())
+        elif tag == NONE:
+            return None
+        elif tag == TRUE:
+            return True
+        elif tag == FALSE:
+            return False
+        elif tag == FLOAT:
+            pos = self.pos
+            self.pos = pos + 8
+            return _DOUBLE.unpack_from(self.data, pos)[0]
+        elif tag == LIST:
+            decode_value = self.decode_value
+            return [decode_value() for _ in xrange(self.read_varint())]
+        elif tag == DICT:
+            adict = {}
+            for _ in xrange(self.read_varint()):
+                key = self.decode_value()
+                adict[key] = self.decode_value()
+            return adict
+        elif tag == DATE:
+            return datetime.date.fromordinal(_unzigzag(self.read_varint()) + _EPOCH_ORDINAL)
+        elif tag == DATETIME or tag == DATETIME_TZ:
+            tzinfo = None
+            if tag == DATETIME_TZ:
+                tzinfo = FixedOffset(_unzigzag(self.read_varint()))
+            day = datetime.date.fromordinal(_unzigzag(self.read_varint()) + _EPOCH_ORDINAL)
+            hour, minute, second, microsecond = _microseconds_to_time(self.read_varint())
+            return datetime.datetime(day.year, day.month, day.day, hour, minute, second, microsecond, tzinfo)
+        elif tag == TIME:
+            return datetime.time(*_microseconds_to_time(self.read_varint()))
+        elif tag == BYTES:
+            return self.read_string()
+        elif tag == DECIMAL:
+            return decimal.Decimal(self.read_string())
+        raise ValueError("unknown value tag %s at position %s" % (tag, self.pos - 1))
+
+    def decode_object(self):
+        class_id = self.read_varint()
+        if class_id == len(self.classes):
+            self.classes.append(get_binary_plan(get_class(self.read_string())))
+        plan = self.classes[class_id]
+
+        attnames = plan.attnames
+        known_count = len(attnames)
+        decode_value = self.decode_value
+        values = {}
+        for position in xrange(self.read_varint()):
+            value = decode_value()
+            # values of fields the model doesn't know (anymore) are skipped
+            if position < known_count:
+                values[attnames[position]] = value
+        instance = plan.clazz._from_values(values)
+
+        if plan.is_dynamic:
+            for _ in xrange(self.read_varint()):
+                name = self.read_string().decode('utf-8')
+                if ord(self.data[self.pos]) != OBJECT:
+                    raise ValueError("dynamic attribute %s is not a document" % name)
+                self.pos += 1
+                instance.add_dynamic_attribute(name, self.decode_object())
+        return instance
+
+
+class BinarySerializer(object):
+    """
+    Serializes a document to the compact binary format
+    """
+
+    def serialize(self, obj, **options):
+        self.options = options
+        encoder = _Encoder(options.get('ignoreMissingAttributes', False))
+        encoder.encode_document(obj)
+        value = encoder.getvalue()
+        stream = options.get('stream')
+        if stream is not None:
+            stream.write(value)
+        return value
+
+
+class BinaryStreamWriter(object):
+    """
+    Writes documents to a stream one after the other, with one class table
+    for all of them. Read them back with BinaryUnserializer.iter_unserialize.
+    """
+
+    def __init__(self, stream, **options):
+        self.stream = stream
+        self.encoder = _Encoder(options.get('ignoreMissingAttributes', False))
+        self.count = 0
+
+    def write(self, obj):
+        """
+        Writes obj to the stream, nothing is written when it can't be encoded
+        """
+        encoder = self.encoder
+        encoder.reset_chunks()
+        class_ids = encoder.class_ids.copy()
+        try:
+            encoder.encode_document(obj, continued = self.count > 0)
+        except:
+            # the classes of obj are written with the next document that uses them
+            encoder.class_ids = class_ids
+            encoder.reset_chunks()
+            raise
+        self.stream.write(encoder.getvalue())
+        encoder.reset_chunks()
+        self.count += 1
+
+
+class BinaryUnserializer(object):
+    """
+    Unserializes documents from the compact binary format. Accepts a str,
+    bytearray, memoryview or stream, strings and memoryviews are decoded in place.
+    """
+
+    def _get_data(self, data):
+        if hasattr(data, 'read'):
+            data = data.read()
+        return data
+
+    def _check_class(self, obj, clazz):
+        if clazz is not None and not isinstance(obj, clazz):
+            from .serializer import DeserializationError
+            raise DeserializationError("Expected a %s, got a %s" % (clazz.__name__, obj.__class__.__name__))
+
+    def unserialize(self, data, clazz = None, **options):
+        decoder = _Decoder(self._get_data(data))
+        try:
+            obj = decoder.decode_document()
+        except (IndexError, struct.error, ValueError, UnicodeDecodeError), e:
+            from .serializer import DeserializationError
+            raise DeserializationError("Invalid binary document: %s" % e)
+        if decoder.pos != decoder.end:
+            from .serializer import DeserializationError
+            raise DeserializationError("Unexpected data after the binary document at position %s" % decoder.pos)
+        self._check_class(obj, clazz)
+        return obj
+
+    def iter_unserialize(self, data, clazz = None, **options):
+        """
+        Generator over the documents in data, consisting of binary documents
+        written one after the other (as serialize_many and BinaryStreamWriter
+        write them to a stream).
+        """
+        decoder = _Decoder(self._get_data(data))
+        while decoder.pos < decoder.end:
+            try:
+                obj = decoder.decode_document()
+            except (IndexError, struct.error, ValueError, UnicodeDecodeError), e:
+                from .serializer import DeserializationError
+                raise DeserializationError("Invalid binary document: %s" % e)
+            self._check_class(obj, clazz)
+            yield obj
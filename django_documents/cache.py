@@ -0,0 +1,163 @@
+"""
+In-process cache of documents read by a Manager.
+
+A DocumentCache is given to a manager, ``objects = Manager(cache = DocumentCache())``,
+and keeps the documents read with get (without props) by key space, column family
+and id. The least recently used documents are evicted when the estimated size of
+the cached documents, the length of their stored columns, exceeds max_size.
+Documents older than ttl seconds are read again.
+
+Cached documents are invalidated by the data_post_save and data_post_delete
+signals, of documents stored in the column families of the managers that use
+the cache. get returns a copy of the cached document, unless the cache is made
+with copy_on_read = False, the cached document is shared then and must not be
+changed.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import signals as persistent_signals
+
+
+DEFAULT_MAX_SIZE = 16 * 1024 * 1024
+
+
+def get_cache_key(key_space_name, column_family_name, id):
+    return (key_space_name, column_family_name, id)
+
+
+def get_storage_names(clazz):
+    """
+    Returns (key_space_name, column_family_name) of the documents of clazz, those
+    of the root model for a subclass without a Meta of its own
+    """
+    for klass in clazz.__mro__:
+        meta = getattr(klass, '_meta', None)
+        if meta is not None and meta.key_space_name is not None:
+            return meta.key_space_name, meta.column_family_name
+    return None, None
+
+
+def estimate_size(key_jsonvalue_dict):
+    """
+    Returns the size of a document by the length of its stored columns
+    """
+    size = 0
+    for name, value in key_jsonvalue_dict.iteritems():
+        size += len(name)
+        if value is not None:
+            size += len(value)
+    return size
+
+
+class DocumentCache(object):
+    """
+    LRU cache of documents, limited by the estimated size of the documents
+    """
+
+    def __init__(self, max_size = DEFAULT_MAX_SIZE, ttl = None, copy_on_read = True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.copy_on_read = copy_on_read
+        self._lock = threading.Lock()
+        # cache key -> (document, size, expires), the least recently used first
+        self._entries = OrderedDict()
+        self.size = 0
+        # (key space name, column family name) -> number of invalidations, see get_generation.
+        # Only the column families registered by the managers are invalidated.
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        persistent_signals.data_post_save.connect(self._invalidate_instance)
+        persistent_signals.data_post_delete.connect(self._invalidate_instance)
+
+    def get(self, key):
+        """
+        Returns the document of key, None when it isn't cached
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            document, size, expires = entry
+            if expires is not None and expires < time.time():
+                self.size -= size
+                self.misses += 1
+                return None
+            # most recently used
+            self._entries[key] = entry
+            self.hits += 1
+        if self.copy_on_read:
+            return copy.deepcopy(document)
+        return document
+
+    def register(self, key_space_name, column_family_name):
+        """
+        Invalidate the documents of the column family when they are saved or deleted
+        """
+        with self._lock:
+            self._generations.setdefault((key_space_name, column_family_name), 0)
+
+    def get_generation(self, key):
+        """
+        Returns a value to pass to put, for a document that is read after calling this
+        """
+        return self._generations.get(key[:2], 0)
+
+    def put(self, key, document, size, generation = None):
+        """
+        Caches document, unless something was invalidated since generation was got:
+        the document might have been read before it was changed then
+        """
+        if size > self.max_size:
+            return
+        if self.copy_on_read:
+            document = copy.deepcopy(document)
+        expires = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[:2], 0):
+                return
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+            self._entries[key] = (document, size, expires)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size, _) = self._entries.popitem(last = False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            storage = key[:2]
+            self._generations[storage] = self._generations.get(storage, 0) + 1
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+
+    def _invalidate_instance(self, sender, instance, **kwargs):
+        key_space_name, column_family_name = get_storage_names(instance.__class__)
+        if (key_space_name, column_family_name) in self._generations:
+            self.invalidate(get_cache_key(key_space_name, column_family_name, instance.id))
+
+    def clear(self):
+        with self._lock:
+            for storage in self._generations:
+                self._generations[storage] += 1
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """
+        Returns a dict with the counters and the number and size of the cached documents
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'count': len(self._entries), 'size': self.size}
@@ -39,5 +39,7 @@ class ClassFactoryCache(object):
         Register a model, abstract models are not registered
         """
         self._class_factory_cache.append(class_factory) 
+        from resolver import classResolver
+        classResolver.invalidate()
         
 classFactoryCache = ClassFactoryCache()
\ No newline at end of file
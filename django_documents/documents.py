@@ -1,6 +1,7 @@
 import copy
 import weakref
 import re
+import types
 
 
 from django.core import validators
@@ -17,6 +18,7 @@ from bisect import bisect
 import signals as persistent_signals
 from fields import FieldDoesNotExist
 from .utils import get_fqclassname_forclass, to_unicode_utf8
+from validation import get_validation_plan
 import django_documents.managers  # @UnusedImport needed for triggering connecting to signals, DO NOT REMOVE 
 
 
@@ -34,6 +36,10 @@ def subclass_exception(name, parents, module):
 # Calculate the verbose_name by converting from InitialCaps to "lowercase with spaces".
 get_verbose_name = lambda class_name: re.sub('(((?<=[a-z])[A-Z])|([A-Z](?![A-Z]|$)))', ' \\1', class_name).lower().strip()
 
+# attributes of Meta that are compiled from the fields and must be dropped when a field is added
+COMPILED_CACHE_NAMES = ('_field_indexes', '_serialization_plan', '_xml_child_fields', '_binary_plan',
+                        '_xml_text_element_tags', '_xml_element_tags', '_init_plan', '_validation_plan')
+
 DEFAULT_NAMES = ('verbose_name', 'permissions', 
                  'app_label',
                  'abstract', 'managed', 'proxy', 'auto_created')
@@ -81,6 +87,8 @@ class Meta(object):
         
         self.abstract_managers = []
         self.concrete_managers = []
+        # instances are stored in __slots__ instead of a __dict__
+        self.compact = False
 
     def contribute_to_class(self, cls, name):
         
@@ -120,6 +128,7 @@ class Meta(object):
 
             setattr(self, "is_group", meta_attrs.pop('is_group', None))
             setattr(self, "display_order", meta_attrs.pop('display_order', None))
+            setattr(self, "compact", meta_attrs.pop('compact', False))
             # Any leftover attributes must be invalid.
             if meta_attrs != {}:
                 raise TypeError("'class Meta' got invalid attribute(s): %s" % ','.join(meta_attrs.keys()))
@@ -144,7 +153,12 @@ class Meta(object):
                 del self._field_name_cache
 
         if hasattr(self, '_name_map'):
-            del self._name_map      
+            del self._name_map
+
+        # plans and lookup tables compiled from the fields
+        for cache_name in COMPILED_CACHE_NAMES:
+            if hasattr(self, cache_name):
+                delattr(self, cache_name)
 
     
     def _fields(self):
@@ -176,23 +190,48 @@ class Meta(object):
         self._field_name_cache = [x for x, _ in cache] 
      
 
+    def _get_field_indexes(self):
+        """
+        Returns the dictionaries from name, attname and xml_element_name to field.
+        When names are not unique the first field wins, as with a linear search.
+        """
+        try:
+            return self._field_indexes
+        except AttributeError:
+            by_name, by_attname, by_xml_element_name = {}, {}, {}
+            for f in self.fields:
+                by_name.setdefault(f.name, f)
+                by_attname.setdefault(f.attname, f)
+                by_xml_element_name.setdefault(f.xml_element_name, f)
+            self._field_indexes = (by_name, by_attname, by_xml_element_name)
+            return self._field_indexes
+
     def get_field(self, name, many_to_many=True):
         """
         Returns the requested field by name. Raises FieldDoesNotExist on error.
         """
-        to_search = self.fields
-        for f in to_search:
-            if f.name == name:
-                return f
-        raise FieldDoesNotExist('%s has no field named %r' % (self.object_name, name))
+        field = self._get_field_indexes()[0].get(name)
+        if field is None:
+            raise FieldDoesNotExist('%s has no field named %r' % (self.object_name, name))
+        return field
+    
+    def get_field_or_none(self, name):
+        """
+        Returns the requested field by name or None if there is no such field.
+        """
+        return self._get_field_indexes()[0].get(name)
     
+    def get_field_by_attname(self, attname):
+        field = self._get_field_indexes()[1].get(attname)
+        if field is None:
+            raise FieldDoesNotExist('%s has no field with attname %r' % (self.object_name, attname))
+        return field
     
     def get_field_by_xml_element_name(self, xml_element_name):
-        to_search = self.fields
-        for f in to_search:
-            if f.xml_element_name == xml_element_name:
-                return f
-        raise FieldDoesNotExist('%s has no field with xml_element_name %r' % (self.object_name, xml_element_name))
+        field = self._get_field_indexes()[2].get(xml_element_name)
+        if field is None:
+            raise FieldDoesNotExist('%s has no field with xml_element_name %r' % (self.object_name, xml_element_name))
+        return field
     
     
     def describe(self, described_classes = None, recursive = False):
@@ -235,6 +274,64 @@ class Meta(object):
 
 
 from register import register_model
+
+
+def get_compact_slots(name, parents, attrs):
+    """
+    Returns the __slots__ of a compact model: its fields (by attname), the caches
+    of its relations and the instance state. All model superclasses must be slotted
+    too, otherwise the instances would still get a __dict__.
+    """
+    from fields import Field
+    existing_slots = set()
+    for parent in parents:
+        for klass in parent.__mro__:
+            if klass is object:
+                continue
+            if not '__slots__' in klass.__dict__:
+                raise TypeError("Compact model %s can only extend compact models, %s isn't compact" % (name, klass.__name__))
+            existing_slots.update(klass.__dict__['__slots__'])
+
+    slots = []
+    def add_slot(slot):
+        if not slot in existing_slots:
+            existing_slots.add(slot)
+            slots.append(slot)
+
+    for base in parents:
+        if hasattr(base, '_meta'):
+            for field in base._meta.local_fields:
+                add_slot(field.rel is None and field.attname or field.get_cache_name())
+    fields = sorted([(obj, obj_name) for obj_name, obj in attrs.items() if isinstance(obj, Field)])
+    for field, field_name in fields:
+        add_slot(field.rel is None and field_name or '_%s_cache' % field_name)
+    for slot in ('key', '_state', '_errors'):
+        add_slot(slot)
+    return tuple(slots)
+
+
+def get_compact_state(self):
+    """
+    __getstate__ of compact models, returns the values of the slots that are set
+    """
+    from related import LazyRelatedValue, get_cached_related_value
+    state = {}
+    for klass in self.__class__.__mro__:
+        for slot in klass.__dict__.get('__slots__', ()):
+            try:
+                value = getattr(self, slot)
+            except AttributeError:
+                continue
+            if value.__class__ is LazyRelatedValue:
+                value = get_cached_related_value(self, slot)
+            state[slot] = value
+    return state
+
+
+def set_compact_state(self, state):
+    for slot, value in state.iteritems():
+        setattr(self, slot, value)
+
             
 class ModelBase(type):
     """
@@ -249,8 +346,15 @@ class ModelBase(type):
 
         # Create the class.
         module = attrs.pop('__module__')
-        new_class = super_new(cls, name, bases, {'__module__': module})
         attr_meta = attrs.pop('Meta', None)
+        new_attrs = {'__module__': module}
+        if getattr(attr_meta, 'compact', False):
+            new_attrs['__slots__'] = get_compact_slots(name, parents, attrs)
+            new_attrs['__getstate__'] = get_compact_state
+            new_attrs['__setstate__'] = set_compact_state
+        elif '__slots__' in attrs:
+            new_attrs['__slots__'] = attrs.pop('__slots__')
+        new_class = super_new(cls, name, bases, new_attrs)
         abstract = getattr(attr_meta, 'abstract', False)
         if not attr_meta:
             meta = getattr(new_class, 'Meta', None)
@@ -417,82 +521,126 @@ class ModelState(object):
     """
     def __init__(self, db=None):
         self.db = db        
+        # snapshot of the fields at the last successful full_clean, see validation
+        self.validated = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['validated'] = None
+        return state
         
         
+class InitPlan(object):
+    """
+    What Model.__init__ does for a class, worked out once: the attnames in
+    positional order and the defaults. Defaults that don't depend on the
+    instance are computed in advance and stored straight into the instance
+    dictionary (or the slots of a compact model).
+    """
+
+    def __init__(self, cls):
+        from related import ReverseSingleObjectDescriptor, ReverseListRelatedObjectDescriptor, MapObjectDescriptor
+        cache_only_descriptors = (ReverseSingleObjectDescriptor, ReverseListRelatedObjectDescriptor, MapObjectDescriptor)
+
+        fields = cls._meta.fields
+        self.compact = cls._meta.compact
+        self.attnames = tuple([field.attname for field in fields])
+        # key in the instance dictionary (or slot) holding the value of a field
+        self.storage_names = {}
+        # defaults stored directly into the instance dictionary (or slots)
+        self.defaults = {}
+        # (position, attname, field) of defaults that are set with setattr, in field order
+        self.other_defaults = []
+        for position, field in enumerate(fields):
+            attname = field.attname
+            descriptor = cls.__dict__.get(attname)
+            if descriptor is None:
+                for base in cls.__mro__[1:]:
+                    descriptor = base.__dict__.get(attname)
+                    if descriptor is not None:
+                        break
+            if isinstance(descriptor, DeferredAttribute):
+                # This field will be populated on request.
+                continue
+            if isinstance(descriptor, cache_only_descriptors):
+                storage_name = field.get_cache_name()
+            elif isinstance(descriptor, types.MemberDescriptorType):
+                # slot of a compact model
+                storage_name = attname
+            elif hasattr(type(descriptor), '__set__'):
+                storage_name = None
+            else:
+                storage_name = attname
+            if storage_name is not None:
+                self.storage_names[attname] = storage_name
+
+            if storage_name is None or callable(field.default):
+                self.other_defaults.append((position, attname, field))
+            else:
+                default = field.get_default()
+                if default is None or storage_name == attname:
+                    self.defaults[storage_name] = default
+                else:
+                    # the descriptor checks the type of a related default
+                    self.other_defaults.append((position, attname, field))
+
+
+def get_init_plan(cls):
+    """
+    Returns the (cached) InitPlan of a model class
+    """
+    meta = cls._meta
+    try:
+        return meta._init_plan
+    except AttributeError:
+        plan = meta._init_plan = InitPlan(cls)
+        return plan
+
+
 class Model(object):
     __metaclass__ = ModelBase
+    # subclasses get a __dict__ unless they are compact
+    __slots__ = ()
     _deferred = False
 
     def __init__(self, *args, **kwargs):
         #signals.pre_init.send(sender=self.__class__, args=args, kwargs=kwargs)
+        plan = get_init_plan(self.__class__)
         self.key = None
 
         # Set up the storage for instance state
         self._state = ModelState()
 
-        # There is a rather weird disparity here; if kwargs, it's set, then args
-        # overrides it. It should be one or the other; don't duplicate the work
-        # The reason for the kwargs check is that standard iterator passes in by
-        # args, and instantiation for iteration is 33% faster.
+        attnames = plan.attnames
         args_len = len(args)
-        if args_len > len(self._meta.fields):
+        if args_len > len(attnames):
             # Daft, but matches old exception sans the err msg.
             raise IndexError("Number of args exceeds number of fields")
 
-        fields_iter = iter(self._meta.fields)
-        if not kwargs:
-            # The ordering of the izip calls matter - izip throws StopIteration
-            # when an iter throws it. So if the first iter throws it, the second
-            # is *not* consumed. We rely on this, so don't change the order
-            # without changing the logic.
-            for val, field in izip(args, fields_iter):
-                setattr(self, field.attname, val)
+        # the defaults that can be, are computed in advance, fields given as 
+        # argument simply overwrite them
+        if plan.compact:
+            for storage_name, default in plan.defaults.iteritems():
+                setattr(self, storage_name, default)
         else:
-            # Slower, kwargs-ready version.
-            for val, field in izip(args, fields_iter):
-                setattr(self, field.attname, val)
-                kwargs.pop(field.name, None)
-                from related import RelationMeta
-                # Maintain compatibility with existing calls.
-                if isinstance(field.rel, RelationMeta):
-                    kwargs.pop(field.attname, None)
-
-        # Now we're left with the unprocessed fields that *must* come from
-        # keywords, or default.
-
-        for field in fields_iter:
-            is_related_object = False
-            # This slightly odd construct is so that we can access any
-            # data-descriptor object (DeferredAttribute) without triggering its
-            # __get__ method.
-            if (field.attname not in kwargs and
-                    isinstance(self.__class__.__dict__.get(field.attname), DeferredAttribute)):
-                # This field will be populated on request.
-                continue
+            self.__dict__.update(plan.defaults)
+        for position, attname, field in plan.other_defaults:
+            # This is done with a check rather than always computing the
+            # default because we don't want get_default() to be evaluated, 
+            # and then not used. Refs #12057.
+            if position >= args_len and not attname in kwargs:
+                setattr(self, attname, field.get_default())
+
+        for val, attname in izip(args, attnames):
+            setattr(self, attname, val)
             if kwargs:
-                try:
-                    val = kwargs.pop(field.attname)
-                except KeyError:
-                        # This is done with an exception rather than the
-                        # default argument on pop because we don't want
-                        # get_default() to be evaluated, and then not used.
-                        # Refs #12057.
-                    val = field.get_default()
-            else:
-                val = field.get_default()
-            if is_related_object:
-                # ROHO todo solve this
-                rel_obj = None
-                # If we are passed a related instance, set it using the
-                # field.name instead of field.attname (e.g. "user" instead of
-                # "user_id") so that the object gets properly cached (and type
-                # checked) by the RelatedObjectDescriptor.
-                setattr(self, field.name, rel_obj)
-            else:
-                #if val: # don't attemp to set a None
-                setattr(self, field.attname, val)
+                kwargs.pop(attname, None)
 
         if kwargs:
+            for attname in attnames[args_len:]:
+                if attname in kwargs:
+                    setattr(self, attname, kwargs.pop(attname))
+
             for prop in kwargs.keys():
                 try:
                     if isinstance(getattr(self.__class__, prop), property):
@@ -502,10 +650,61 @@ class Model(object):
             if kwargs:
                 raise TypeError("'%s' is an invalid keyword argument for this function" % kwargs.keys()[0])
         #signals.post_init.send(sender=self.__class__, instance=self)
+
+    @classmethod
+    def _from_values(cls, values = None):
+        """
+        Creates an instance from trusted values (by attname), skipping the type
+        checks of the relation descriptors. Values of fields that are not given get 
+        their default.
+        """
+        if cls.__init__.im_func is not Model.__init__.im_func:
+            # the class has its own initialization
+            instance = cls()
+            if values:
+                for attname, value in values.iteritems():
+                    setattr(instance, attname, value)
+            return instance
+
+        plan = get_init_plan(cls)
+        instance = cls.__new__(cls)
+        if plan.compact:
+            # collected first, set in the slots at the end
+            instance_dict = {}
+        else:
+            instance_dict = instance.__dict__
+        instance_dict['key'] = None
+        instance_dict['_state'] = ModelState()
+        instance_dict.update(plan.defaults)
+        if values is None:
+            values = {}
+        for position, attname, field in plan.other_defaults:
+            if not attname in values:
+                setattr(instance, attname, field.get_default())
+        if values:
+            storage_names = plan.storage_names
+            for attname, value in values.iteritems():
+                storage_name = storage_names.get(attname)
+                if storage_name is None:
+                    setattr(instance, attname, value)
+                else:
+                    instance_dict[storage_name] = value
+        if plan.compact:
+            for storage_name, value in instance_dict.iteritems():
+                setattr(instance, storage_name, value)
+        return instance
         
         
     def _get_FIELD_display(self, field):
         value = getattr(self, field.attname)
+        index = field.get_choice_index()
+        if index is not None:
+            if index.tables:
+                table = index.get_table(get_language().split('-')[0])
+            else:
+                table = index.default_table
+            return force_unicode(table.get(value, value), strings_only=True)
+
         flat_choices_dict = dict(field.flatchoices)
         display_values = flat_choices_dict.get(value, value)
         if isinstance( display_values, dict):
@@ -564,48 +763,23 @@ class Model(object):
         Cleans all fields and raises a ValidationError containing message_dict
         of all validation errors if any occur.
         """
-        if exclude is None:
-            exclude = []
-
-        errors = {}
-        for f in self._meta.fields:
-            if f.name in exclude:
-                continue
-            # Skip validation for empty fields with blank=True. The developer
-            # is responsible for making sure they have a valid value.
-            raw_value = getattr(self, f.attname)
-            if f.blank and raw_value in validators.EMPTY_VALUES:
-                continue
-            try:
-                setattr(self, f.attname, f.clean(raw_value, self))
-            except ValidationError, e:
-                errors[f.name] = e.messages
-                self._add_error(f.attname, e.messages)
-
+        if exclude is not None:
+            exclude = set(exclude)
+        errors = get_validation_plan(self.__class__).clean_fields(self, exclude)
         if errors:
             raise ObjectValidationError(errors)
     
-    def full_clean(self, exclude=None):
+    def full_clean(self, exclude=None, incremental=False):
         """
         Calls clean_fields, clean, and validate_unique, on the model,
         and raises a ``ObjectValidationError`` for any errors that occured.
+        With incremental only the fields and nested models that changed since
+        the last successful full_clean are validated, the first incremental
+        full_clean validates everything.
         """
-        errors = {}
-        if exclude is None:
-            exclude = []
-
-        try:
-            self.clean_fields(exclude=exclude)
-        except ValidationError, e:
-            errors = e.update_error_dict(errors)
-
-        # Form.clean() is run even if other validation fails, so do the
-        # same with Model.clean() for consistency.
-        try:
-            self.clean()
-        except ValidationError, e:
-            errors = e.update_error_dict(errors)
-
+        if exclude is not None:
+            exclude = set(exclude)
+        errors = get_validation_plan(self.__class__).full_clean(self, exclude, incremental)
         if errors:
             raise ObjectValidationError(errors, obj = self)
         
@@ -626,6 +800,7 @@ class Model(object):
         
 class DataAspect(Model):
     
+    __slots__ = ()
     
     class Meta:
         abstract = True
@@ -658,7 +833,9 @@ class DynamicModel(Model):
         Note that when __setattr__ is called by setting 
         a attribute __getattr__ isn't called
         """
-        
+        if name.startswith('__') and name.endswith('__'):
+            # special names (also __dynamicdict__ itself while unpickling) are never dynamic
+            raise AttributeError(name)
         try:
             return self.__dynamicdict__[name]    
         except KeyError:
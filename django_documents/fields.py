@@ -4,9 +4,9 @@ from django.core import exceptions, validators
 from django.utils.functional import curry
 from django.utils.translation import ugettext_lazy as _
 from django.utils.encoding import smart_unicode, force_unicode, smart_str
-from django.utils import datetime_safe
     
 from utils import to_unicode_utf8
+from temporal import TemporalFormatError, DateTimeParser, parse_date, parse_time, format_date, format_datetime, format_time
     
 import types
 import sys
@@ -14,7 +14,6 @@ import sys
 
 import datetime
 import re
-import time
 from itertools import tee
 
 
@@ -41,6 +40,69 @@ class NOT_PROVIDED:
 class FieldDoesNotExist(Exception):
     pass
 
+
+def get_choice_display(display, language):
+    """
+    Returns the display value for language of a choice, a display value can be
+    a dict with the display value per language
+    """
+    if isinstance(display, dict):
+        label = display.get(language)
+        if label is None and display:
+            label = display.itervalues().next()
+        return label
+    return display
+
+
+def scan_choices(choices, value):
+    """
+    Returns whether value is one of the choices, including the choices of optgroups
+    """
+    for option_key, option_value in choices:
+        if isinstance(option_value, (list, tuple)):
+            # This is an optgroup, so look inside the group for options.
+            for optgroup_key, _optgroup_value in option_value:
+                if value == optgroup_key:
+                    return True
+        elif value == option_key:
+            return True
+    return False
+
+
+class ChoiceIndex(object):
+    """
+    The flattened choices of a field: the set of valid values and, for every
+    language of the {language: label} display values, a table with the display
+    value per value.
+    """
+
+    def __init__(self, choices):
+        self.source = choices
+        displays = {}
+        for option_key, option_value in choices:
+            if isinstance(option_value, (list, tuple)):
+                for optgroup_key, optgroup_value in option_value:
+                    displays.setdefault(optgroup_key, optgroup_value)
+            else:
+                displays.setdefault(option_key, option_value)
+        self.values = frozenset(displays)
+
+        languages = set()
+        for display in displays.itervalues():
+            if isinstance(display, dict):
+                languages.update(display.keys())
+        self.tables = {}
+        for language in languages:
+            self.tables[language] = dict((value, get_choice_display(display, language))
+                                         for value, display in displays.iteritems())
+        # for languages without display values
+        self.default_table = dict((value, get_choice_display(display, None))
+                                  for value, display in displays.iteritems())
+
+    def get_table(self, language):
+        return self.tables.get(language, self.default_table)
+
+
 class Field(object):
     """Base class for all field types"""
     
@@ -222,19 +284,8 @@ class Field(object):
             # Skip validation for non-editable fields.
             return
         if self._choices and value:
-            if hasattr(self._choices, '__call__'):
-                choices = self._choices()
-            else:
-                choices = self._choices
-                
-            for option_key, option_value in choices:
-                if isinstance(option_value, (list, tuple)):
-                    # This is an optgroup, so look inside the group for options.
-                    for optgroup_key, _optgroup_value in option_value:
-                        if value == optgroup_key:
-                            return
-                elif value == option_key:
-                    return
+            if self.is_valid_choice(value):
+                return
             raise exceptions.ValidationError(self.error_messages['invalid_choice'] % value)
 
         if value is None and not self.null:
@@ -353,6 +404,38 @@ class Field(object):
             return self._choices
     choices = property(_get_choices)
 
+    def get_choice_index(self):
+        """
+        Returns the ChoiceIndex of the choices, built once. None for callable
+        choices and choices that aren't hashable.
+        """
+        choices = self._choices
+        if hasattr(choices, '__call__'):
+            return None
+        cached = getattr(self, '_choice_index', None)
+        if cached is None or cached[0] is not choices:
+            if hasattr(choices, 'next'):
+                choices = self._choices = list(choices)
+            try:
+                index = ChoiceIndex(choices)
+            except TypeError:
+                index = None
+            cached = self._choice_index = (choices, index)
+        return cached[1]
+
+    def is_valid_choice(self, value):
+        index = self.get_choice_index()
+        if index is None:
+            choices = self._choices
+            if hasattr(choices, '__call__'):
+                choices = choices()
+            return scan_choices(choices, value)
+        try:
+            return value in index.values
+        except TypeError:
+            # unhashable values are never equal to a choice
+            return False
+
     def _get_flatchoices(self):
         """Flattened version of choices tuple."""
         flat = []
@@ -388,13 +471,18 @@ class Field(object):
     def get_display_value(self,value, language):
         
         if self._choices:
-            for item in self._choices:
+            index = self.get_choice_index()
+            if index is not None:
+                try:
+                    return index.get_table(language).get(value, value)
+                except TypeError:
+                    return value
+            choices = self._choices
+            if hasattr(choices, '__call__'):
+                choices = choices()
+            for item in choices:
                 if value == item[0]:
-                    display_value_dict = item[1]
-                    if language in display_value_dict:
-                        return display_value_dict[language]
-                    else:
-                        return display_value_dict.itervalues().next()
+                    return get_choice_display(item[1], language)
         return value    
 
 import decimal
@@ -525,8 +613,6 @@ class FloatField(Field):
         
         
 
-ansi_date_re = re.compile(r'^\d{4}-\d{1,2}-\d{1,2}$')
-
 class DateField(Field):
     description = _("Date (without time)")
 
@@ -554,16 +640,12 @@ class DateField(Field):
         if isinstance(value, datetime.date):
             return value
 
-        if not ansi_date_re.search(value):
-            raise exceptions.ValidationError(self.error_messages['invalid'])
-        # Now that we have the date string in YYYY-MM-DD format, check to make
-        # sure it's a valid date.
-        # We could use time.strptime here and catch errors, but datetime.date
-        # produces much friendlier error messages.
-        year, month, day = map(int, value.split('-'))
         try:
-            return datetime.date(year, month, day)
+            return parse_date(value)
+        except TemporalFormatError:
+            raise exceptions.ValidationError(self.error_messages['invalid'])
         except ValueError, e:
+            # datetime.date produces much friendlier error messages than strptime
             msg = self.error_messages['invalid_date'] % _(str(e))
             raise exceptions.ValidationError(msg)
 
@@ -582,7 +664,7 @@ class DateField(Field):
         if val is None:
             data = ''
         else:
-            data = datetime_safe.new_date(val).strftime("%Y-%m-%d")
+            data = format_date(val)
         return data
 
 
@@ -591,9 +673,8 @@ class DateField(Field):
         if self.name in dict:
             str_value = dict[self.name]
         
-            year, month, day = map(int, str_value.split('-'))
             try:
-                value = datetime.date(year, month, day)
+                value = parse_date(str_value)
             except ValueError:
                 raise exceptions.ValidationError("Value [%s]is incorrect date format " % str_value)     
     
@@ -606,9 +687,8 @@ class DateField(Field):
         if field_element:
             str_value = field_element.text
     
-            year, month, day = map(int, str_value.split('-'))
             try:
-                value = datetime.date(year, month, day)
+                value = parse_date(str_value)
             except ValueError:
                 raise exceptions.ValidationError("Value [%s]is incorrect date format " % str_value)     
     
@@ -641,28 +721,10 @@ class TimeField(Field):
             # information
             return value.time()
 
-        # Attempt to parse a datetime:
-        value = smart_str(value)
-        # split usecs, because they are not recognized by strptime.
-        if '.' in value:
-            try:
-                value, usecs = value.split('.')
-                usecs = int(usecs)
-            except ValueError:
-                raise exceptions.ValidationError(self.error_messages['invalid'])
-        else:
-            usecs = 0
-        kwargs = {'microsecond': usecs}
-
-        try: # Seconds are optional, so try converting seconds first.
-            return datetime.time(*time.strptime(value, '%H:%M:%S')[3:6],
-                                 **kwargs)
+        try:
+            return parse_time(smart_str(value))
         except ValueError:
-            try: # Try without seconds.
-                return datetime.time(*time.strptime(value, '%H:%M')[3:5],
-                                         **kwargs)
-            except ValueError:
-                raise exceptions.ValidationError(self.error_messages['invalid'])
+            raise exceptions.ValidationError(self.error_messages['invalid'])
 
 
     def value_to_string(self, obj):
@@ -670,7 +732,7 @@ class TimeField(Field):
         if val is None:
             data = ''
         else:
-            data = val.strftime("%H:%M:%S")
+            data = format_time(val)
         return data
 
 class DateTimeField(DateField):
@@ -679,43 +741,10 @@ class DateTimeField(DateField):
     }
     description = _("Date (with time)")
 
-    @classmethod
-    def _conv_with_seconds_t(cls, value, usecs):
-        kwargs = {'microsecond': usecs}
-        return datetime.datetime(*time.strptime(value, '%Y-%m-%dT%H:%M:%S')[:6],**kwargs)
-
-    @classmethod
-    def _conv_with_seconds(cls, value, usecs):
-        kwargs = {'microsecond': usecs}
-        return datetime.datetime(*time.strptime(value, '%Y-%m-%d %H:%M:%S')[:6],**kwargs)
-
-    @classmethod
-    def _conv_without_seconds_t(cls, value, usecs):
-        kwargs = {'microsecond': usecs}        
-        return datetime.datetime(*time.strptime(value, '%Y-%m-%dT%H:%M')[:5],**kwargs)
-
-    @classmethod
-    def _conv_without_seconds(cls, value, usecs):
-        kwargs = {'microsecond': usecs}        
-        return datetime.datetime(*time.strptime(value, '%Y-%m-%d %H:%M')[:5],**kwargs)
-
-    @classmethod
-    def _conv_without_time(cls, value, usecs):
-        kwargs = {'microsecond': usecs}        
-        return datetime.datetime(*time.strptime(value, '%Y-%m-%d')[:3],**kwargs)
-
-        
-        
-
-    def _convert(self, value, usecs):
-        conversions_meth_list = [self._conv_with_seconds_t,self._conv_with_seconds, self._conv_without_seconds_t, self._conv_without_seconds, self._conv_without_time]
-        
-        for convert_meth in conversions_meth_list:
-            try:
-                return convert_meth(value, usecs)
-            except ValueError:
-                pass
-        raise ValueError()   
+    def __init__(self, *args, **kwargs):
+        # a strict field only accepts ISO-8601 values, it doesn't try dateutil for other formats
+        self.parser = DateTimeParser(kwargs.pop('strict', False))
+        DateField.__init__(self, *args, **kwargs)
 
     def get_internal_type(self):
         return "DateTimeField"
@@ -730,25 +759,8 @@ class DateTimeField(DateField):
         if isinstance(value, datetime.date):
             return datetime.datetime(value.year, value.month, value.day)
 
-        # Attempt to parse a datetime:
-        value = smart_str(value)
-        try:
-            import dateutil.parser
-            return dateutil.parser.parse(value)
-        except ValueError:
-            pass
-        
-        # split usecs, because they are not recognized by strptime.
-        if '.' in value:
-            try:
-                value, usecs = value.split('.')
-                usecs = int(usecs)
-            except ValueError:
-                raise exceptions.ValidationError(self.error_messages['invalid'])
-        else:
-            usecs = 0
         try:
-            return self._convert(value, usecs)
+            return self.parser.parse(smart_str(value))
         except ValueError:
             raise exceptions.ValidationError(self.error_messages['invalid'])
     
@@ -757,8 +769,7 @@ class DateTimeField(DateField):
         if val is None:
             data = ''
         else:
-            d = datetime_safe.new_datetime(val)
-            data = d.strftime('%Y-%m-%dT%H:%M:%S')
+            data = format_datetime(val, 'T')
         return data
 
 class TextField(Field):
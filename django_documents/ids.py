@@ -0,0 +1,141 @@
+"""
+Generation of document ids.
+
+Ids are 26 character strings in Crockford's base32, like ULIDs: 48 bits with the
+time in milliseconds, 32 bits identifying the node (host and process) and a
+48 bit sequence. Ids of one generator are strictly increasing, so ids sort in
+the order they were generated and ids of different nodes sort by time.
+
+The node is worked out once per process, a forked process gets a new node and
+sequence. A generator can be used by several threads.
+"""
+import hashlib
+import os
+import random
+import socket
+import threading
+import time
+
+
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ID_LENGTH = 26
+
+TIME_BITS = 48
+NODE_BITS = 32
+SEQUENCE_BITS = 48
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# a sequence starts at a random value in the lower half, leaving room to count up
+START_SEQUENCE_BITS = SEQUENCE_BITS - 1
+
+
+def encode_id(value):
+    """
+    Returns the 128 bit value as id
+    """
+    chars = []
+    for _ in xrange(ID_LENGTH):
+        chars.append(ENCODING[value & 31])
+        value >>= 5
+    chars.reverse()
+    return "".join(chars)
+
+
+def decode_id(id):
+    """
+    Returns the 128 bit value of id
+    """
+    value = 0
+    for char in id.upper():
+        value = (value << 5) | ENCODING.index(char)
+    return value
+
+
+def get_id_time(id):
+    """
+    Returns the time, in milliseconds since the epoch, at which id was generated
+    """
+    return decode_id(id) >> (NODE_BITS + SEQUENCE_BITS)
+
+
+def get_node():
+    """
+    Returns the 32 bit identity of this host and process
+    """
+    try:
+        host = socket.gethostname()
+    except socket.error:
+        # if we can't get a host name, just imagine one
+        host = str(random.getrandbits(64))
+    digest = hashlib.md5("%s %s" % (host, os.getpid())).digest()
+    return int(digest[:NODE_BITS // 8].encode('hex'), 16)
+
+
+class IdGenerator(object):
+    """
+    Generates ids, thread safe and fork safe
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._node = None
+        self._random = random.Random()
+        self._last_millis = 0
+        self._sequence = 0
+
+    def _reset(self):
+        # called for a new process, a fork must not continue the parent's sequence
+        self._pid = os.getpid()
+        self._node = get_node()
+        self._random.seed()
+        self._last_millis = 0
+
+    def _next_values(self, count):
+        """
+        Returns the 128 bit values of count new ids, must be called with the lock
+        """
+        if self._pid != os.getpid():
+            self._reset()
+        millis = long(time.time() * 1000)
+        if millis > self._last_millis:
+            self._last_millis = millis
+            self._sequence = self._random.getrandbits(START_SEQUENCE_BITS)
+        # else the clock didn't move, or went back, continue the sequence of the last millisecond
+        values = []
+        prefix = ((self._last_millis << NODE_BITS) | self._node) << SEQUENCE_BITS
+        for _ in xrange(count):
+            self._sequence += 1
+            if self._sequence > MAX_SEQUENCE:
+                # sequence is used up, borrow the next millisecond
+                self._last_millis += 1
+                self._sequence = self._random.getrandbits(START_SEQUENCE_BITS)
+                prefix = ((self._last_millis << NODE_BITS) | self._node) << SEQUENCE_BITS
+            values.append(prefix | self._sequence)
+        return values
+
+    def generate(self):
+        """
+        Returns a new id
+        """
+        with self._lock:
+            value = self._next_values(1)[0]
+        return encode_id(value)
+
+    def allocate(self, count):
+        """
+        Returns a list of count new, increasing ids, for inserting many documents
+        """
+        with self._lock:
+            values = self._next_values(count)
+        return [encode_id(value) for value in values]
+
+
+idGenerator = IdGenerator()
+
+
+def generate_id():
+    return idGenerator.generate()
+
+
+def allocate_ids(count):
+    return idGenerator.allocate(count)
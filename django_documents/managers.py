@@ -1,5 +1,4 @@
 import signals as persistent_signals
-from fields import FieldDoesNotExist
 import copy
 
 
@@ -11,11 +10,8 @@ def ensure_default_manager(sender, **kwargs):
         return
     if not getattr(cls, '_default_manager', None):
         # Create the default manager, if needed.
-        try:
-            cls._meta.get_field('objects')
+        if cls._meta.get_field_or_none('objects') is not None:
             raise ValueError("Model %s must specify a custom Manager, because it has a field named 'objects'" % cls.__name__)
-        except FieldDoesNotExist:
-            pass
         cls.add_to_class('objects', Manager())
         cls._base_manager = cls.objects
     elif not getattr(cls, '_base_manager', None):
@@ -36,18 +32,38 @@ def ensure_default_manager(sender, **kwargs):
 
 #persistent_signals.aspect_class_prepared.connect(ensure_default_manager)
 
-#import pycassa
+from parallel import imap_ordered
 from serializer import create_key_jsonvalue_dict, object_from_key_jsonvalue_dict
 from utils import  get_fqclassname_forinstance, get_class
 from django.conf import settings
-    
+from django.utils.datastructures import SortedDict
+from django.core.exceptions import ValidationError
+
+# number of documents read with one backend request by get_many
+GET_MANY_BATCH_SIZE = 1000
+# number of documents written with one backend request by save_many
+SAVE_MANY_BATCH_SIZE = 500
+
+
+def _clean_and_encode(obj):
+    """
+    Returns (message_dict, None) for an invalid obj, (None, (id, key_jsonvalue_dict)) otherwise
+    """
+    try:
+        obj.full_clean()
+    except ValidationError, e:
+        return e.update_error_dict({}), None
+    assert not obj.id is None, "key must have a value"
+    key_jsonvalue_dict = create_key_jsonvalue_dict(obj)
+    key_jsonvalue_dict['_clazz'] = get_fqclassname_forinstance(obj)
+    return None, (obj.id, key_jsonvalue_dict)
 
 
 class Manager(object):
     # Tracks each time a Manager instance is created. Used to retain order.
     creation_counter = 0
 
-    def __init__(self):
+    def __init__(self, cache = None, single_flight = False, negative_ttl = None):
         super(Manager, self).__init__()
         self._set_creation_counter()
         self.model = None
@@ -56,20 +72,26 @@ class Manager(object):
         self._column_family_name = None
         self._pool = None
         self._column_family = None
+        self._backend_generation = None
+        # optional DocumentCache of the documents read by get
+        self.cache = cache
+        # coalesces concurrent gets of the same id, see singleflight
+        self._flights = None
+        if single_flight or negative_ttl:
+            from singleflight import SingleFlight
+            from backends import NotFoundException
+            self._flights = SingleFlight(negative_ttl, NotFoundException, copy.deepcopy)
  
         
-#    def _get_column_family(self):
-#        if self._pool is None:
-#            assert not self._key_space_name is None, "key space must have been set in meta of class"
-#            assert not self._column_family_name is None, "column family name must have been set in meta of class"
-            
-#            key_space_name = self._key_space_name
-#            if hasattr(settings, 'ISINTEST'):
-#                key_space_name = 'TEST_' + self._key_space_name
-#            #self._pool = pycassa.connect(key_space_name, settings.CASSANDRA_SERVER_LIST)
-#            self._pool = pycassa.ConnectionPool(key_space_name, server_list= settings.CASSANDRA_SERVER_LIST)
-#            self._column_family = pycassa.ColumnFamily(self._pool, self._column_family_name)
-#        return self._column_family    
+    def _get_column_family(self):
+        from backends import backendCache
+        # the backends are created again after backendCache.close_all
+        if self._column_family is None or self._backend_generation != backendCache.generation:
+            assert not self._key_space_name is None, "key space must have been set in meta of class"
+            assert not self._column_family_name is None, "column family name must have been set in meta of class"
+            self._backend_generation = backendCache.generation
+            self._column_family = backendCache.get_backend(self._key_space_name).get_column_family(self._column_family_name)
+        return self._column_family    
 
     def contribute_to_class(self, model, name):
         # TODO: Use weakref because of possible memory leak / circular reference.
@@ -85,6 +107,8 @@ class Manager(object):
         
             self._key_space_name = model._meta.key_space_name
             self._column_family_name = model._meta.column_family_name
+            if self.cache is not None:
+                self.cache.register(self._key_space_name, self._column_family_name)
         
             
 
@@ -126,19 +150,106 @@ class Manager(object):
         key_jsonvalue_dict = create_key_jsonvalue_dict(obj)
         # save special values
         key_jsonvalue_dict['_clazz'] = get_fqclassname_forinstance(obj)
-        self._get_column_family().insert(id, key_jsonvalue_dict)
+        # the columns of relations that are None now must go
+        self._get_column_family().insert(id, key_jsonvalue_dict, replace = True)
+        if self._flights is not None:
+            self._flights.clear_errors()
         cls = self.model.__class__
         persistent_signals.data_post_save.send(sender=cls, instance=obj)
 
+    def save_many(self, objs, batch_size = None, workers = None, chunksize = None):
+        """
+        Saves the objs, none of them when one of them is invalid. All objs are validated
+        and encoded first, with workers > 1 by a pool of worker processes (which clean
+        copies of the objs). An ObjectValidationError with the message_dict per index of
+        an invalid obj is raised before anything is written.
+        The objs are written batch_size (default SAVE_MANY_BATCH_SIZE) at a time, after
+        each batch data_post_save_many is sent for the batch and data_post_save per obj.
+        """
+        objs = list(objs)
+        if batch_size is None:
+            batch_size = SAVE_MANY_BATCH_SIZE
+        errors = {}
+        rows = []
+        for index, (message_dict, row) in enumerate(imap_ordered(_clean_and_encode, objs, workers, chunksize)):
+            if message_dict is not None:
+                errors[index] = message_dict
+            elif not errors:
+                rows.append(row)
+        if errors:
+            from documents import ObjectValidationError
+            raise ObjectValidationError(errors)
+        column_family = self._get_column_family()
+        cls = self.model.__class__
+        for start in xrange(0, len(rows), batch_size):
+            column_family.batch_insert(rows[start:start + batch_size], replace = True)
+            if self._flights is not None:
+                self._flights.clear_errors()
+            batch = objs[start:start + batch_size]
+            persistent_signals.data_post_save_many.send(sender=cls, instances=batch)
+            for obj in batch:
+                persistent_signals.data_post_save.send(sender=cls, instance=obj)
+
     
     def get(self, id, props = None):    
         if props:
             props.append('_clazz')
             props.append('id')
+        elif self.cache is not None:
+            from cache import get_cache_key
+            obj = self.cache.get(get_cache_key(self._key_space_name, self._column_family_name, id))
+            if obj is not None:
+                return obj
+        if self._flights is None:
+            return self._fetch(id, props)
+        obj, leader = self._flights.do((id, tuple(props) if props else None), self._fetch, id, props)
+        return obj
+
+    def _fetch(self, id, props):
+        """
+        Reads and decodes the document of id, and caches it when it is complete
+        """
+        cache = None if props else self.cache
+        if cache is not None:
+            from cache import get_cache_key
+            key = get_cache_key(self._key_space_name, self._column_family_name, id)
+            generation = cache.get_generation(key)
         retrieved_dict = self._get_column_family().get(id, props)
         clazz_name = retrieved_dict['_clazz']
         clazz = get_class(clazz_name)
-        return object_from_key_jsonvalue_dict(clazz, retrieved_dict)
+        obj = object_from_key_jsonvalue_dict(clazz, retrieved_dict)
+        if cache is not None:
+            from cache import estimate_size
+            cache.put(key, obj, estimate_size(retrieved_dict), generation)
+        return obj
+    
+    def get_many(self, ids, props = None):
+        """
+        Returns a SortedDict with the documents by id, in the order of ids. Ids of
+        documents that don't exist have None as value. The documents are read with
+        a multiget per GET_MANY_BATCH_SIZE ids.
+        """
+        columns = None
+        if props:
+            columns = list(props) + ['_clazz', 'id']
+        ids = list(ids)
+        column_family = self._get_column_family()
+        classes = {}
+        result = SortedDict()
+        for start in xrange(0, len(ids), GET_MANY_BATCH_SIZE):
+            batch = ids[start:start + GET_MANY_BATCH_SIZE]
+            rows = column_family.multiget(batch, columns)
+            for id in batch:
+                retrieved_dict = rows.get(id)
+                if retrieved_dict is None:
+                    result[id] = None
+                    continue
+                clazz_name = retrieved_dict['_clazz']
+                clazz = classes.get(clazz_name)
+                if clazz is None:
+                    clazz = classes[clazz_name] = get_class(clazz_name)
+                result[id] = object_from_key_jsonvalue_dict(clazz, retrieved_dict)
+        return result
     
         
     
@@ -0,0 +1,76 @@
+"""
+Helpers for spreading work over a pool of processes.
+"""
+import multiprocessing
+from collections import deque
+from itertools import islice
+
+
+# number of items send to a worker at once, when not specified
+DEFAULT_CHUNKSIZE = 64
+
+# number of chunks per worker that are sent but not yet consumed, more items
+# aren't taken from the items until the first chunk is consumed
+PENDING_CHUNKS_PER_WORKER = 2
+
+
+def get_chunksize(workers, size = None):
+    """
+    Returns the number of items to send to a worker at once, so size items
+    are spread over the workers
+    """
+    if size is None:
+        return DEFAULT_CHUNKSIZE
+    return max(1, min(DEFAULT_CHUNKSIZE, size // (workers * 4)))
+
+
+def _call_chunk(func, chunk):
+    return [func(item) for item in chunk]
+
+
+def imap_ordered(func, items, workers = None, chunksize = None, size = None):
+    """
+    Generator yielding func(item) for all items, in the order of the items.
+
+    With workers > 1 the calls are spread over a pool of worker processes,
+    results are yielded as soon as all results before them are available.
+    func must be a module level function and the items and results must be
+    picklable. Without workers everything is done in the current process.
+
+    size is the number of items, when items has no len, it is used to work
+    out the chunksize. The items are taken as the workers need them, so they
+    aren't all in memory at the same time when items is a generator.
+    """
+    if not workers or workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    if chunksize is None:
+        if hasattr(items, '__len__'):
+            size = len(items)
+        chunksize = get_chunksize(workers, size)
+
+    items = iter(items)
+    pending = deque()
+    pool = multiprocessing.Pool(workers)
+    completed = False
+    try:
+        while True:
+            while len(pending) < workers * PENDING_CHUNKS_PER_WORKER:
+                chunk = list(islice(items, chunksize))
+                if not chunk:
+                    break
+                pending.append(pool.apply_async(_call_chunk, (func, chunk)))
+            if not pending:
+                break
+            for result in pending.popleft().get():
+                yield result
+        completed = True
+    finally:
+        # stop the workers when the caller stopped consuming or an error occurred
+        if completed:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
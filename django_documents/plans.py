@@ -0,0 +1,134 @@
+"""
+Compiled serialization plans.
+
+A plan is built once per model class and flattens what ``Model.visit`` and
+``PythonSerializerVisitor`` work out for every instance: which fields there are,
+how to read and convert their values and what kind of relation they are.
+"""
+import types
+from copy import deepcopy
+
+from django.utils.encoding import smart_unicode, is_protected_type
+
+from .fields import Field
+from .related import OneOf, ListOf, MapOf
+from .utils import get_fqclassname_forclass
+
+
+CLAZZ = '_clazz'
+
+# step kinds
+FIELD = 0
+ONE_OF_DICT = 1
+ONE_OF = 2
+LIST_OF_BUILT_IN = 3
+LIST_OF = 4
+MAP_OF_BUILT_IN = 5
+MAP_OF = 6
+VISIT = 7   # unknown relation field, let the field handle a visitor
+
+
+def _compile_step(field):
+    name = field.name
+    if field.rel is None:
+        if type(field).value_to_string.im_func is Field.value_to_string.im_func:
+            # default value_to_string is smart_unicode of the value we already have
+            convert = None
+        else:
+            convert = field.value_to_string
+        return (FIELD, name, field.attname, convert)
+
+    if type(field).handle_visit.im_func is OneOf.handle_visit.im_func and isinstance(field, OneOf):
+        kind = ONE_OF_DICT if field.rel.to == types.DictType else ONE_OF
+    elif type(field).handle_visit.im_func is ListOf.handle_visit.im_func and isinstance(field, ListOf):
+        kind = LIST_OF_BUILT_IN if field.rel.contains_built_in_type else LIST_OF
+    elif type(field).handle_visit.im_func is MapOf.handle_visit.im_func and isinstance(field, MapOf):
+        kind = MAP_OF_BUILT_IN if field.rel.contains_built_in_type else MAP_OF
+    else:
+        kind = VISIT
+    return (kind, name, field.attname, field)
+
+
+def get_field_value(instance, attname, convert):
+    """
+    Returns the serialized value of a plain field, convert is the field's
+    value_to_string or None when that is the default implementation
+    """
+    value = getattr(instance, attname)
+    # Protected types (i.e., primitives like None, numbers, dates,
+    # and Decimals) are passed through as is. All other values are
+    # converted to string first.
+    if is_protected_type(value):
+        return value
+    if convert is None:
+        return smart_unicode(value)
+    return convert(instance)
+
+
+class SerializationPlan(object):
+    """
+    Flat encoding plan for one model class, produces the same dictionaries as
+    visiting an instance with a PythonSerializerVisitor
+    """
+
+    def __init__(self, clazz):
+        self.clazz = clazz
+        self.clazz_name = get_fqclassname_forclass(clazz)
+        self.steps = tuple([_compile_step(field) for field in clazz._meta.local_fields])
+
+    def serialize(self, instance, options):
+        ignore_missing = options.get('ignoreMissingAttributes', False)
+        obj_dict = {CLAZZ: self.clazz_name}
+        errors = getattr(instance, '_errors', None)
+        if errors is not None:
+            obj_dict['_errors'] = errors
+
+        for kind, name, attname, extra in self.steps:
+            if kind == FIELD:
+                try:
+                    obj_dict[name] = get_field_value(instance, attname, extra)
+                except AttributeError:
+                    if not ignore_missing:
+                        raise
+            elif kind == ONE_OF:
+                related_instance = getattr(instance, name)
+                if related_instance is not None:
+                    obj_dict[name] = serialize_instance(related_instance, options)
+            elif kind == LIST_OF:
+                related = getattr(instance, name)
+                if related is not None:
+                    obj_dict[name] = [serialize_instance(item, options) for item in related]
+            elif kind == MAP_OF:
+                obj_dict[name] = dict([(key, serialize_instance(value, options))
+                                       for key, value in getattr(instance, name).items()])
+            elif kind == ONE_OF_DICT:
+                obj_dict[name] = getattr(instance, name)
+            elif kind == LIST_OF_BUILT_IN:
+                related = getattr(instance, name)
+                if related is not None:
+                    obj_dict[name] = deepcopy(related)
+            elif kind == MAP_OF_BUILT_IN:
+                obj_dict[name] = dict([(key, deepcopy(value))
+                                       for key, value in getattr(instance, name).items()])
+            else:
+                from .serializer import PythonSerializerVisitor
+                visitor = PythonSerializerVisitor(**options)
+                visitor.current_dict = obj_dict
+                extra.handle_visit(visitor, instance)
+        return obj_dict
+
+
+def get_serialization_plan(clazz):
+    """
+    Returns the (cached) serialization plan for a model class
+    """
+    meta = clazz._meta
+    try:
+        return meta._serialization_plan
+    except AttributeError:
+        plan = meta._serialization_plan = SerializationPlan(clazz)
+        return plan
+
+
+def serialize_instance(instance, options):
+    return get_serialization_plan(instance.__class__).serialize(instance, options)
@@ -1,5 +1,6 @@
 from django.utils.datastructures import SortedDict
 from utils import get_fqclassname_forclass
+from resolver import classResolver, resolve_class
 
 #__all__ = ('get_model', 'register_model')
 
@@ -14,6 +15,10 @@ class ModelCache(object):
  
         app_models = SortedDict(),
         _get_models_cache = {},
+        # model class -> fully qualified name -> all (also indirect) subclasses
+        _subclasses = {},
+        # classes that are not models but have subclasses, like dict
+        _polymorphic_foreign_classes = set(),
     )
 
     def __init__(self):
@@ -43,11 +48,59 @@ class ModelCache(object):
         """
         Register a model, abstract models are not registered
         """
+        self.register_subclass(model_clazz)
         if not model_clazz._meta.abstract:
             clazz_name = get_fqclassname_forclass(model_clazz)
             self.app_models[clazz_name] = model_clazz
+            # names that couldn't be resolved before may be resolvable now
+            classResolver.invalidate()
         
+    def register_subclass(self, model_clazz):
+        """
+        Adds a model (also abstract ones) to the subclasses of all its model superclasses
+        """
+        clazz_name = get_fqclassname_forclass(model_clazz)
+        self._subclasses.setdefault(model_clazz, SortedDict())
+        for base in model_clazz.__mro__[1:]:
+            subclasses = self._subclasses.get(base)
+            if subclasses is not None:
+                subclasses[clazz_name] = model_clazz
+
+    def get_subclasses(self, clazz):
+        """
+        Returns the direct and indirect subclasses of a model, by fully qualified name
+        """
+        return SortedDict(self._subclasses.get(clazz, {}))
+
+    def is_polymorphic(self, clazz):
+        """
+        Returns whether values of clazz can be instances of a subclass
+        """
+        subclasses = self._subclasses.get(clazz)
+        if subclasses is not None:
+            return len(subclasses) > 0
+        # not a model, subclasses are never removed so only remember the positive answer
+        if clazz in self._polymorphic_foreign_classes:
+            return True
+        if len(clazz.__subclasses__()) > 0:
+            self._polymorphic_foreign_classes.add(clazz)
+            return True
+        return False
+
+    def resolve_discriminator(self, clazz, clazz_name):
+        """
+        Returns the class named by the type discriminator of a value of clazz
+        """
+        subclasses = self._subclasses.get(clazz)
+        if subclasses is not None:
+            subclass = subclasses.get(clazz_name)
+            if subclass is not None:
+                return subclass
+        return resolve_class(clazz_name)
+
 modelCache = ModelCache()
 
 get_model = modelCache.get_model
 register_model = modelCache.register_model
+is_polymorphic = modelCache.is_polymorphic
+resolve_discriminator = modelCache.resolve_discriminator
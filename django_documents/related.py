@@ -86,6 +86,41 @@ def do_pending_lookups(sender, **kwargs):
 
 signals.class_prepared.connect(do_pending_lookups)
 
+class LazyRelatedValue(object):
+    """
+    Placeholder in the cache of a relation field for a value that is 
+    unserialized the first time it is accessed, unserialize is called without 
+    arguments and returns the value. Pickling and copying unserialize the value,
+    the unserialize function itself can't be pickled.
+    """
+    __slots__ = ('unserialize',)
+    
+    def __init__(self, unserialize):
+        self.unserialize = unserialize
+
+    def __reduce__(self):
+        return (get_unserialized_value, (self.unserialize(),))
+
+
+def get_unserialized_value(value):
+    """
+    Restores a pickled LazyRelatedValue as its value
+    """
+    return value
+
+
+def get_cached_related_value(instance, cache_name, *default):
+    """
+    Returns the value in the relation cache of instance, unserializing it
+    first when it is still lazy
+    """
+    value = getattr(instance, cache_name, *default)
+    if value.__class__ is LazyRelatedValue:
+        value = value.unserialize()
+        setattr(instance, cache_name, value)
+    return value
+
+
 #HACK in original
 class RelatedField(object):
     
@@ -182,7 +217,7 @@ class ReverseSingleObjectDescriptor(object):
             return self
 
         cache_name = self.field.get_cache_name()
-        return getattr(instance, cache_name, None)
+        return get_cached_related_value(instance, cache_name, None)
         
     def __set__(self, instance, value):
         if instance is None:
@@ -226,7 +261,7 @@ class ReverseListRelatedObjectDescriptor(object):
             return self
 
         cache_name = self.field.get_cache_name()
-        return getattr(instance, cache_name)
+        return get_cached_related_value(instance, cache_name)
         
     def __set__(self, instance, value):
         if instance is None:
@@ -274,7 +309,7 @@ class MapObjectDescriptor(object):
             return self
 
         cache_name = self.field.get_cache_name()
-        value = getattr(instance, cache_name)
+        value = get_cached_related_value(instance, cache_name)
         if value is None:
             value = {}
             setattr(instance, self.field.get_cache_name(), value)  
@@ -528,29 +563,18 @@ class ListOf(RelatedField, Field):
     
     def _validate(self, value):
         
-        for option_key, option_value in self._choices:
-            if isinstance(option_value, (list, tuple)):
-                # This is an optgroup, so look inside the group for options.
-                for optgroup_key, optgroup_value in option_value:
-                    if value == optgroup_key:
-                        return
-            elif value == option_key:
-                return
-        raise ValidationError(self.error_messages['invalid_choice'] % value)
+        if not self.is_valid_choice(value):
+            raise ValidationError(self.error_messages['invalid_choice'] % value)
             
     
     def validate_list_items(self, value):
         
         if value is not None:
-            errors = {}
-            for i, item_value in enumerate(value):
-                try:
-                    item_value.full_clean()
-                except ValidationError, e:
-                    # @todo: e.messages contains the flattened list of errors, message_dict is containing error per field. 
-                    errors[self.name + "." + str(i)] = e.messages
+            from validation import validate_items
+            from documents import ObjectValidationError
+            errors = validate_items(self, value)
             if errors:
-                raise ValidationError(errors)
+                raise ObjectValidationError(errors)
 
     def run_validators(self, value):
         #default run_validators doesn't run the validators if value is EMPTYVALUES, a [] is a empty value
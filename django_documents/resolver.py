@@ -0,0 +1,139 @@
+"""
+Resolving fully qualified class names (as found in _clazz) to classes.
+"""
+import sys
+import threading
+
+from django.utils.datastructures import SortedDict
+
+from classfactory import classFactoryCache
+
+
+# maximum number of resolved and of unresolvable names remembered
+DEFAULT_CACHE_SIZE = 1024
+
+# NOTE, TO REPAIR WRONG IMPORTS FROM THE PAST
+DEFAULT_ALIASES = (('db.', 'uso.db.'),)
+
+
+class ClassResolver(object):
+    """
+    Resolves class names through the registered aliases, importing and the
+    registered class factories. Resolved and unresolvable names are cached, the
+    caches are dropped when a model or a class factory is registered.
+    """
+    # Use the Borg pattern see http://aspn.activestate.com/ASPN/Cookbook/Python/Recipe/66531.
+    __shared_state = dict(
+        _aliases = SortedDict(DEFAULT_ALIASES),
+        _resolved = SortedDict(),
+        _unresolved = SortedDict(),
+        max_size = DEFAULT_CACHE_SIZE,
+        hits = 0,
+        misses = 0,
+        negative_hits = 0,
+        # guards the caches, not held while importing
+        _lock = threading.Lock(),
+        # incremented by invalidate, names loaded before aren't remembered
+        _generation = 0,
+    )
+
+    def __init__(self):
+        self.__dict__ = self.__shared_state
+
+    def resolve(self, fqcn):
+        """
+        Returns the class for the fully qualified class name, raises a
+        RuntimeError when there is no such class
+        """
+        try:
+            clazz = self._resolved[fqcn]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return clazz
+
+        if fqcn in self._unresolved:
+            self.negative_hits += 1
+            raise RuntimeError("Clazz with name [%s] not found " % fqcn)
+
+        self.misses += 1
+        generation = self._generation
+        clazz = self._load(fqcn)
+        if clazz is None:
+            self._remember(self._unresolved, fqcn, None, generation)
+            raise RuntimeError("Clazz with name [%s] not found " % fqcn)
+        self._remember(self._resolved, fqcn, clazz, generation)
+        return clazz
+
+    def _remember(self, cache, fqcn, value, generation):
+        with self._lock:
+            if generation != self._generation:
+                # invalidated while loading, the name may resolve differently now
+                return
+            if fqcn in cache:
+                # resolved by another thread as well
+                return
+            if len(cache) >= self.max_size:
+                # forget the oldest name
+                del cache[cache.keyOrder[0]]
+            cache[fqcn] = value
+
+    def get_aliased_name(self, fqcn):
+        with self._lock:
+            aliases = self._aliases.items()
+        for prefix, replacement in aliases:
+            if fqcn.startswith(prefix):
+                return replacement + fqcn[len(prefix):]
+        return fqcn
+
+    def _load(self, fqcn):
+        fqcn = self.get_aliased_name(fqcn)
+        try:
+            paths = fqcn.split('.')
+            modulename = '.'.join(paths[:-1])
+            classname = paths[-1]
+            __import__(modulename)
+            return getattr(sys.modules[modulename], classname)
+        except Exception:
+            return classFactoryCache.create_class(fqcn)
+
+    def register_alias(self, prefix, replacement):
+        """
+        Lets class names starting with prefix be resolved as starting with replacement
+        """
+        with self._lock:
+            self._aliases[prefix] = replacement
+        self.invalidate()
+
+    def unregister_alias(self, prefix):
+        with self._lock:
+            del self._aliases[prefix]
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Forgets all resolved and unresolvable names
+        """
+        with self._lock:
+            self._generation += 1
+            self._resolved.clear()
+            self._unresolved.clear()
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+            'resolved': len(self._resolved),
+            'unresolved': len(self._unresolved),
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.negative_hits = 0
+
+
+classResolver = ClassResolver()
+
+resolve_class = classResolver.resolve
+register_class_alias = classResolver.register_alias
@@ -3,20 +3,35 @@ Module for abstract serializer/unserializer base classes.
 """
 
 from StringIO import StringIO
+from functools import partial
 
 from django.utils.encoding import smart_unicode
 from django.utils import datetime_safe
-from elementtree.SimpleXMLWriter import XMLWriter
-from elementtree.ElementTree import parse
+from elementtree.ElementTree import parse, iterparse
 
-from .related import OneOnOneRelation, MapRelation, ListRelation
+from .related import OneOnOneRelation, MapRelation, ListRelation, LazyRelatedValue
+from . import plans
+from .plans import serialize_instance, get_serialization_plan, get_field_value
 from .utils import get_fqclassname_forclass, get_fqclassname_forinstance, get_class
+from .register import is_polymorphic, resolve_discriminator
+from .parallel import imap_ordered
+from .xmlwriter import XMLWriter, get_text_element_tags, get_element_tags
+from .binary import BinarySerializer, BinaryUnserializer
+from .temporal import parse_date, format_date, format_datetime, format_time
 
 
 CLAZZ = '_clazz'
 DYNAMIC_ATTRIBUTES = '_dynamic_attributes'
 
 
+def set_lazy_related_value(instance, field, unserialize):
+    """
+    Lets the relation field of instance be unserialized on first access by 
+    calling unserialize
+    """
+    setattr(instance, field.get_cache_name(), LazyRelatedValue(unserialize))
+
+
 def get_serialized_field_value(obj, field):
         
     value = field._get_val_from_obj(obj)        
@@ -27,6 +42,13 @@ def get_serialized_field_value(obj, field):
         value = field.value_to_string(obj)
     return value    
 
+def convert_date_field_value(str_value):
+    try:
+        return parse_date(str_value)
+    except ValueError:
+        raise exceptions.ValidationError("Value [%s]is incorrect date format " % str_value)
+
+
 class SerializationError(Exception):
     """Something bad happened during serialization."""
     pass
@@ -256,9 +278,7 @@ class PythonSerializer(Serializer):
             self.root_object_dict = self._serialize_object(obj_or_list)
     
     def _serialize_object(self, instance):
-        python_serializer_visitor = PythonSerializerVisitor(**self.options)
-        instance.visit(python_serializer_visitor)
-        return python_serializer_visitor.get_dict()
+        return serialize_instance(instance, self.options)
     
     
     def getvalue(self):
@@ -274,6 +294,13 @@ class PythonDeserializerVisitor(ModelVisitor):
         self.options = options
         self.clazz_factory = options['class_factory'] if options and  'class_factory' in options else None            
         self.one_of_handler = self.options['handle_one_of_handler'] if 'handle_one_of_handler' in self.options else None
+        # with validate every document is validated as soon as it is decoded, see end_handle_object
+        self.validate = self.options.get('validate', False)
+        # the errors of the validated documents by id, shared with the visitors of nested documents
+        self.validation_errors = {}
+        self.conversion_errors = {}
+        # with lazy nested documents are unserialized on first access 
+        self.lazy = self.options.get('lazy', False) and not self.validate
     
     
     def _optional_convert_to_subclazz(self, clazz, obj_dict):
@@ -290,13 +317,11 @@ class PythonDeserializerVisitor(ModelVisitor):
         if not field.name in value_dict['_errors']:
             value_dict['_errors'][field.name] = []
         value_dict['_errors'][field.name].append(e.messages) 
+        if self.validate:
+            self.conversion_errors[field.name] = e.messages
     
     def convert_date_field_value(self, str_value):
-        year, month, day = map(int, str_value.split('-'))
-        try:
-            return datetime.date(year, month, day)
-        except ValueError:
-                raise exceptions.ValidationError("Value [%s]is incorrect date format " % str_value)
+        return convert_date_field_value(str_value)
     
     def set_field_value(self, field, instance, value_dict):
         value = value_dict[field.name]
@@ -311,11 +336,11 @@ class PythonDeserializerVisitor(ModelVisitor):
             self.add_error(field, value_dict, e)
             
     def start_handle_object(self, instance):
-        from .fields import FieldDoesNotExist 
         from utils import get_class
         from .documents import DynamicModel
         
-        # instead of using handle_field (we ignore it), iterate through values, so we can use FieldDoesNotExist for dynamic fields
+        get_field_or_none = instance._meta.get_field_or_none
+        # instead of using handle_field (we ignore it), iterate through values, so we can detect dynamic fields
         for name, value in self.current_dict.items():
             if name == CLAZZ:
                 continue
@@ -323,16 +348,14 @@ class PythonDeserializerVisitor(ModelVisitor):
                 setattr(instance,'_errors', value)
                 continue
         
-            try:
-                field = instance._meta.get_field(name)
+            field = get_field_or_none(name)
+            if field is not None:
                 if field.serialize:
                     if field.rel is None:
                         self.set_field_value(field, instance, self.current_dict)
                     #else:
                         #field.rel.add_to_instance(instance, dict, self)
-                            
-                        
-            except FieldDoesNotExist:
+            else:
                 "its could be a dynamic field"
                 if issubclass( instance.__class__, DynamicModel):
                     if CLAZZ in value:
@@ -342,9 +365,26 @@ class PythonDeserializerVisitor(ModelVisitor):
                         child_instance = self._create_object(clazz, value)
                         instance.add_dynamic_attribute(name, child_instance)
 
+    def end_handle_object(self, instance):
+        if self.validate:
+            from validation import validate_decoded
+            for name, messages in self.conversion_errors.items():
+                instance._add_error(name, messages)
+            validate_decoded(instance, self.conversion_errors, self.validation_errors)
+
+    def raise_validation_errors(self, instance):
+        """
+        Raises an ObjectValidationError of documents when validating the decoded instance failed
+        """
+        errors = self.validation_errors.get(id(instance))
+        if errors:
+            from .documents import ObjectValidationError as DocumentValidationError
+            raise DocumentValidationError(errors, obj = instance)
+
     def _create_object(self, clazz, value_dict):
-        instance = clazz()
+        instance = clazz._from_values()
         python_deserializer_visitor = PythonDeserializerVisitor(value_dict, **self.options)
+        python_deserializer_visitor.validation_errors = self.validation_errors
         instance.visit(python_deserializer_visitor)
         return instance                    
     
@@ -369,6 +409,9 @@ class PythonDeserializerVisitor(ModelVisitor):
                 if not skip:     
                     if one_of_field.rel.to == types.DictType:
                         component_obj = obj_dict
+                    elif self.lazy and not self.one_of_handler:
+                        set_lazy_related_value(instance, one_of_field, partial(self._create_object, clazz, obj_dict))
+                        return
                     else:                           
                         component_obj = self._create_object(clazz, obj_dict)
                         if self.one_of_handler:
@@ -376,7 +419,6 @@ class PythonDeserializerVisitor(ModelVisitor):
             setattr(instance, one_of_field.name, component_obj)
             
     def handle_list_of(self, list_of_field, instance):
-        from utils import get_class
         if list_of_field.name in self.current_dict:
             expected_list = self.current_dict[list_of_field.name]
             
@@ -391,33 +433,45 @@ class PythonDeserializerVisitor(ModelVisitor):
                     for item in expected_list:
                         new_list.append(clazz(item))
                     setattr(instance, list_of_field.name, new_list)
+                elif self.lazy:
+                    set_lazy_related_value(instance, list_of_field, partial(self._create_list, clazz, expected_list))
                 else:
-                    clazz = list_of_field.rel.to
-                    new_list = []
-                    for item in expected_list:
-                        if "_clazz" in item:
-                            clazz_name = item['_clazz']
-                            clazz = get_class(clazz_name)
-                        
-                        new_list_instance = self._create_object(clazz, item)
-                        new_list.append(new_list_instance)
-                    setattr(instance, list_of_field.name, new_list)
+                    setattr(instance, list_of_field.name, self._create_list(clazz, expected_list))
 
+    def _create_list(self, clazz, expected_list):
+        from utils import get_class
+        new_list = []
+        for item in expected_list:
+            if "_clazz" in item:
+                clazz_name = item['_clazz']
+                clazz = get_class(clazz_name)
+            
+            new_list_instance = self._create_object(clazz, item)
+            new_list.append(new_list_instance)
+        return new_list    
   
     def handle_map_of(self, map_of_relation_field, instance):
         if map_of_relation_field.name in self.current_dict:
             dict = self.current_dict[map_of_relation_field.name]
             clazz = map_of_relation_field.rel.to
             
-            obj_dict = {}
             if map_of_relation_field.rel.contains_built_in_type:
+                obj_dict = {}
                 for key, value in dict.items():
                     obj_dict[key] = clazz(value)
+            elif self.lazy:
+                set_lazy_related_value(instance, map_of_relation_field, partial(self._create_map, clazz, dict))
+                return
             else:
-                for key, value in dict.items():
-                    new_map_instance = self._create_object(clazz, value) 
-                    obj_dict[key] = new_map_instance
+                obj_dict = self._create_map(clazz, dict)
             setattr(instance, map_of_relation_field.name, obj_dict)     
+
+    def _create_map(self, clazz, dict):
+        obj_dict = {}
+        for key, value in dict.items():
+            new_map_instance = self._create_object(clazz, value) 
+            obj_dict[key] = new_map_instance
+        return obj_dict    
             
 
     
@@ -432,10 +486,11 @@ class PythonDeserializer(object):
             assert CLAZZ in dict, "Expected a clazz-description in dictionary"
             clazz_name = dict[CLAZZ]
             clazz = get_class(clazz_name)
-        obj = clazz()
+        obj = clazz._from_values()
     
         python_deserializer_visitor = PythonDeserializerVisitor(dict, **options)
         obj.visit(python_deserializer_visitor)
+        python_deserializer_visitor.raise_validation_errors(obj)
         return obj 
 
         
@@ -454,6 +509,7 @@ class PythonDeserializer(object):
         
         python_deserializer_visitor = PythonDeserializerVisitor(dict, **options)
         instance.visit(python_deserializer_visitor)
+        python_deserializer_visitor.raise_validation_errors(instance)
                             
         if self._invalid:                
             raise ObjectValidationError(dict)             
@@ -487,30 +543,243 @@ import simplejson
 import datetime
 import decimal
 
+# options used by the serializers themselves, these are not passed on to the json encoder
+SERIALIZER_OPTIONS = ('stream', 'fields', 'use_natural_keys', 'root_name', 'ignoreMissingAttributes', 'streaming', 'chunk_size')
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def get_json_map_key(key):
+    """
+    Returns key as the string simplejson makes of a dict key
+    """
+    if isinstance(key, basestring):
+        return key
+    if key is True:
+        return 'true'
+    if key is False:
+        return 'false'
+    if key is None:
+        return 'null'
+    if isinstance(key, float):
+        return repr(key)
+    return unicode(key)
+
+
 class JsonSerializer(PythonSerializer):
     """
     Convert a queryset to JSON.
+    
+    With the option streaming = True the json is written to the stream while
+    the document is walked, no intermediate dictionaries are build. iter_serialize
+    yields the json in chunks of about chunk_size characters. Streamed json has the
+    keys in field order and isn't indented, so sort_keys and indent can't be used
+    with streaming.
     """
     internal_use_only = False
 
+    def serialize(self, obj, **options):
+        if not options.get('streaming', False):
+            return super(JsonSerializer, self).serialize(obj, **options)
+        
+        self.options = options
+        self.stream = options.get("stream", StringIO())
+        write = self.stream.write
+        for chunk in self.iter_serialize(obj, **options):
+            write(chunk)
+        return self.getvalue()
+
     def end_serialization(self):
         super(JsonSerializer,self).end_serialization()
-        self.options.pop('stream', None)
-        self.options.pop('fields', None)
-        self.options.pop('use_natural_keys', None)
-        self.options.pop('root_name', None)
         
-        simplejson.dump(self.root_object_dict, self.stream, cls=DjangoJSONEncoder, **self.options)
+        simplejson.dump(self.root_object_dict, self.stream, cls=DjangoJSONEncoder, **self._get_json_options(self.options))
+
+    def _get_json_options(self, options):
+        json_options = options.copy()
+        for name in SERIALIZER_OPTIONS:
+            json_options.pop(name, None)
+        return json_options
+
+    def iter_serialize(self, obj, **options):
+        """
+        Returns a generator returning the json of obj in chunks, usable for chunked
+        http responses. Raises a ValueError for the options sort_keys and indent.
+        """
+        json_options = self._get_json_options(options)
+        for name in ('sort_keys', 'indent'):
+            if json_options.get(name):
+                raise ValueError("%s can't be used with streaming json" % name)
+        return self._iter_chunks(obj, json_options, options)
+
+    def _iter_chunks(self, obj, json_options, options):
+        chunk_size = options.get('chunk_size', DEFAULT_CHUNK_SIZE)
+        encode = DjangoJSONEncoder(**json_options).encode
+        
+        buffer = []
+        size = 0
+        for token in self._iter_root(obj, encode, options):
+            buffer.append(token)
+            size += len(token)
+            if size >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer)
+
+    def _iter_root(self, obj_or_list, encode, options):
+        root_name = options.get('root_name', "")
+        if root_name:
+            yield '{%s: ' % encode(root_name)
+            
+        if isinstance(obj_or_list, list):
+            yield '['
+            for i, obj in enumerate(obj_or_list):
+                if i:
+                    yield ', '
+                for token in self._iter_object(obj, encode, options):
+                    yield token
+            yield ']'
+        elif isinstance(obj_or_list, dict):
+            yield encode(obj_or_list)
+        else:
+            for token in self._iter_object(obj_or_list, encode, options):
+                yield token
+                
+        if root_name:
+            yield '}'
+    
+    def _iter_object(self, instance, encode, options):
+        plan = get_serialization_plan(instance.__class__)
+        ignore_missing = options.get('ignoreMissingAttributes', False)
+        
+        yield '{%s: %s' % (encode(CLAZZ), encode(plan.clazz_name))
+        errors = getattr(instance, '_errors', None)
+        if errors is not None:
+            yield ', %s: %s' % (encode('_errors'), encode(errors))
+
+        for kind, name, attname, extra in plan.steps:
+            key = ', %s: ' % encode(name)
+            if kind == plans.FIELD:
+                try:
+                    value = get_field_value(instance, attname, extra)
+                except AttributeError:
+                    if not ignore_missing:
+                        raise
+                    continue
+                yield key + encode(value)
+            elif kind == plans.ONE_OF:
+                related_instance = getattr(instance, name)
+                if related_instance is not None:
+                    yield key
+                    for token in self._iter_object(related_instance, encode, options):
+                        yield token
+            elif kind == plans.LIST_OF or kind == plans.LIST_OF_BUILT_IN:
+                related = getattr(instance, name)
+                if related is not None:
+                    yield key + '['
+                    for i, item in enumerate(related):
+                        if i:
+                            yield ', '
+                        if kind == plans.LIST_OF:
+                            for token in self._iter_object(item, encode, options):
+                                yield token
+                        else:
+                            yield encode(item)
+                    yield ']'
+            elif kind == plans.MAP_OF or kind == plans.MAP_OF_BUILT_IN:
+                yield key + '{'
+                for i, (map_key, value) in enumerate(getattr(instance, name).iteritems()):
+                    yield '%s%s: ' % (', ' if i else '', encode(get_json_map_key(map_key)))
+                    if kind == plans.MAP_OF:
+                        for token in self._iter_object(value, encode, options):
+                            yield token
+                    else:
+                        yield encode(value)
+                yield '}'
+            elif kind == plans.ONE_OF_DICT:
+                yield key + encode(getattr(instance, name))
+            else:
+                visitor = PythonSerializerVisitor(**options)
+                extra.handle_visit(visitor, instance)
+                for visited_name, value in visitor.get_dict().iteritems():
+                    if visited_name != CLAZZ:
+                        yield ', %s: %s' % (encode(visited_name), encode(value))
+        yield '}'
 
     def getvalue(self):
         if callable(getattr(self.stream, 'getvalue', None)):
             return self.stream.getvalue()
 
+def get_xml_element_name(field):
+    """
+    Returns the name of the child element the XMLSerializerVisitor writes for field
+    """
+    if field.rel is None:
+        return field.xml_element_name
+    if isinstance(field.rel, ListRelation):
+        return field.xml_element_name if field.xml_element_name else field.name
+    return field.name
+
+
+def get_xml_child_fields(clazz):
+    """
+    Returns a (cached) dictionary from child element name to the fields of clazz
+    that are read from such an element
+    """
+    meta = clazz._meta
+    try:
+        return meta._xml_child_fields
+    except AttributeError:
+        child_fields = {}
+        for field in meta.local_fields:
+            if field.serialize or field.rel is not None:
+                child_fields.setdefault(get_xml_element_name(field), []).append(field)
+        meta._xml_child_fields = child_fields
+        return child_fields
+
+
+def get_xml_children(clazz, element):
+    """
+    Returns a dictionary from child element name to the child elements of element
+    that are read by the fields of clazz, iterating the children only once. When
+    there are more children with a name the first one is used, like find does.
+    """
+    child_fields = get_xml_child_fields(clazz)
+    children = {}
+    for child in element:
+        tag = child.tag
+        if tag in child_fields and not tag in children:
+            children[tag] = child
+    return children
+
+
 class XMLDeserializerVisitor(ModelVisitor):
                 
-    def __init__(self, element):
+    def __init__(self, element, lazy = False):
         self.root_element = element
-        self.current_element = self.root_element            
+        # the children of root_element read by the fields, by element name
+        self.children = {}
+        # with lazy nested documents are unserialized on first access 
+        self.lazy = lazy
+    
+    
+    def handle_child_element(self, instance, element):
+        """
+        Unserializes the fields of instance that are read from element, a single
+        child of the element of instance
+        """
+        fields = get_xml_child_fields(instance.__class__).get(element.tag)
+        if fields:
+            self.children = {element.tag: element}
+            try:
+                for field in fields:
+                    if field.rel is None:
+                        self.handle_field(field, instance)
+                    else:
+                        field.handle_visit(self, instance)
+            finally:
+                self.children = {}
     
     
     def add_error(self, field, element, e):
@@ -522,11 +791,7 @@ class XMLDeserializerVisitor(ModelVisitor):
         #value_dict['_errors'][field.name].append(e.messages) 
     
     def convert_date_field_value(self, str_value):
-        year, month, day = map(int, str_value.split('-'))
-        try:
-            return datetime.date(year, month, day)
-        except ValueError:
-                raise exceptions.ValidationError("Value [%s]is incorrect date format " % str_value)
+        return convert_date_field_value(str_value)
     
     def set_field_value(self, field, instance, child_element):
         value = child_element.text
@@ -549,31 +814,30 @@ class XMLDeserializerVisitor(ModelVisitor):
             setattr(instance, field.name, field.to_python(value))
             
     def start_handle_object(self, instance):
-        pass
+        self.children = get_xml_children(instance.__class__, self.root_element)
 
 
     
     def handle_field(self, field, instance):
         if field.serialize:
             element_name = field.xml_element_name
-            field_element = self.current_element.find(element_name)
+            field_element = self.children.get(element_name)
             if not field_element is None:
                 self.set_field_value(field, instance, field_element)
 
     def _create_object(self, clazz, element):
-        if len( clazz.__subclasses__()) > 0:
+        if is_polymorphic(clazz):
             # has subclass, use the type attribute for getting classname
-            clazz_name = element.attrib['type']
-            clazz = get_class(clazz_name)
+            clazz = resolve_discriminator(clazz, element.attrib['type'])
 
-        instance = clazz()
-        python_deserializer_visitor = XMLDeserializerVisitor(element)
+        instance = clazz._from_values()
+        python_deserializer_visitor = XMLDeserializerVisitor(element, self.lazy)
         instance.visit(python_deserializer_visitor)
         return instance                    
     
     
     def _create_from_element(self, name, clazz):
-        element = self.current_element.find(name)
+        element = self.children.get(name)
         if element:
             component_obj = self._create_object(clazz, element)
             return component_obj
@@ -620,7 +884,7 @@ class XMLDeserializerVisitor(ModelVisitor):
                         result.append(value)
                     
                 
-        element = self.current_element.find(name)
+        element = self.children.get(name)
         if element:
             result = {}
             write_key_value(result, list(element))
@@ -635,6 +899,11 @@ class XMLDeserializerVisitor(ModelVisitor):
         name = one_of_field.name
         if clazz == types.DictType:
             component_obj = self._create_dict(name)
+        elif self.lazy:
+            element = self.children.get(name)
+            if element:
+                set_lazy_related_value(instance, one_of_field, partial(self._create_object, clazz, element))
+            return
         else:    
             component_obj = self._create_from_element(name, clazz)
         if component_obj:
@@ -643,39 +912,51 @@ class XMLDeserializerVisitor(ModelVisitor):
             
     def handle_list_of(self, list_of_field, instance):
         element_name = list_of_field.xml_element_name if list_of_field.xml_element_name else list_of_field.name
-        list_elements = self.current_element.find(element_name )
+        list_elements = self.children.get(element_name)
         if list_elements:
-            new_list = []
-            clazz = list_of_field.rel.to
-            if list_of_field.rel.contains_built_in_type:
-                for element in list_elements.getchildren():
-                    new_list.append(clazz(element.text))
-            else:
-                for element in list_elements.getchildren():
-                    new_list_instance = self._create_object(clazz, element)
-                    new_list.append(new_list_instance)
-            setattr(instance, list_of_field.name, new_list)
+            if self.lazy and not list_of_field.rel.contains_built_in_type:
+                set_lazy_related_value(instance, list_of_field, partial(self._create_list, list_of_field, list_elements))
+            else:    
+                setattr(instance, list_of_field.name, self._create_list(list_of_field, list_elements))
+
+    def _create_list(self, list_of_field, list_elements):
+        new_list = []
+        clazz = list_of_field.rel.to
+        if list_of_field.rel.contains_built_in_type:
+            for element in list_elements.getchildren():
+                new_list.append(clazz(element.text))
+        else:
+            for element in list_elements.getchildren():
+                new_list_instance = self._create_object(clazz, element)
+                new_list.append(new_list_instance)
+        return new_list        
 
     def handle_map_of(self, map_of_relation_field, instance):
-        map_element = self.current_element.find(map_of_relation_field.name)
+        map_element = self.children.get(map_of_relation_field.name)
         if map_element:
-            obj_dict = {}
-            clazz = map_of_relation_field.rel.to
-            for element in map_element.getchildren():
-                key =  element.attrib[map_of_relation_field.rel.xml_key_attr_name]
-                if map_of_relation_field.rel.contains_built_in_type:
-                    obj_dict[key] = clazz(element.text)
-                else:
-                    new_map_instance = self._create_object(clazz, element) 
-                    obj_dict[key] = new_map_instance
-            setattr(instance, map_of_relation_field.name, obj_dict)
+            if self.lazy and not map_of_relation_field.rel.contains_built_in_type:
+                set_lazy_related_value(instance, map_of_relation_field, partial(self._create_map, map_of_relation_field, map_element))
+            else:    
+                setattr(instance, map_of_relation_field.name, self._create_map(map_of_relation_field, map_element))
+
+    def _create_map(self, map_of_relation_field, map_element):
+        obj_dict = {}
+        clazz = map_of_relation_field.rel.to
+        for element in map_element.getchildren():
+            key =  element.attrib[map_of_relation_field.rel.xml_key_attr_name]
+            if map_of_relation_field.rel.contains_built_in_type:
+                obj_dict[key] = clazz(element.text)
+            else:
+                new_map_instance = self._create_object(clazz, element) 
+                obj_dict[key] = new_map_instance
+        return obj_dict        
 
 
 class XMLUnserializer():
 
-    def _unserialize(self, element, clazz):
-        obj = clazz()
-        xml_deserializer_visitor = XMLDeserializerVisitor(element)
+    def _unserialize(self, element, clazz, lazy = False):
+        obj = clazz._from_values()
+        xml_deserializer_visitor = XMLDeserializerVisitor(element, lazy)
         obj.visit(xml_deserializer_visitor)
         return obj 
 
@@ -692,7 +973,83 @@ class XMLUnserializer():
             assert not clazz_element is None, "expected to find a clazz element or a supplied clazz"
             clazz_name = root_element.text
             clazz = get_class(clazz_name)
-        return self._unserialize(root_element.getroot(), clazz)    
+        return self._unserialize(root_element.getroot(), clazz, options.get('lazy', False))    
+    
+    def _iter_decoded(self, stream_or_string, clazz, list_field_name = None):
+        """
+        Parses incrementally, the children of the root element are unserialized when
+        they are closed and cleared afterwards. The items of top level ListOf fields 
+        are yielded as (field, item) when they are closed, when list_field_name is 
+        given only the items of that field are unserialized. Finally (None, instance)
+        is yielded. 
+        """
+        if isinstance(stream_or_string, basestring):
+            stream = StringIO(stream_or_string)
+        else:
+            stream = stream_or_string
+        
+        depth = 0
+        root = instance = visitor = None
+        child = list_field = None
+        seen_tags = set()
+        for event, element in iterparse(stream, events = ('start', 'end')):
+            if event == 'start':
+                if depth == 0:
+                    root = element
+                    instance = clazz._from_values()
+                    visitor = XMLDeserializerVisitor(root)
+                elif depth == 1:
+                    child = element
+                    list_field = None
+                    if not element.tag in seen_tags:
+                        for field in get_xml_child_fields(clazz).get(element.tag, ()):
+                            if isinstance(field.rel, ListRelation):
+                                list_field = field
+                depth += 1
+                continue
+            
+            depth -= 1
+            if depth == 2 and list_field is not None:
+                if list_field_name is None or list_field_name == list_field.name:
+                    if list_field.rel.contains_built_in_type:
+                        item = list_field.rel.to(element.text)
+                    else:    
+                        item = visitor._create_object(list_field.rel.to, element)
+                    yield list_field, item
+                # the item is done, forget it    
+                child.clear()
+            elif depth == 1:
+                if not element.tag in seen_tags:
+                    seen_tags.add(element.tag)
+                    if list_field is None and list_field_name is None:
+                        visitor.handle_child_element(instance, element)
+                root.clear()
+        yield None, instance        
+
+    def unserialize_incremental(self, stream_or_string, clazz, **options):
+        """
+        Unserializes like unserialize, but parses the stream incrementally so
+        processed elements can be freed while parsing 
+        """
+        assert clazz is not None, "expected a supplied clazz"
+        lists = {}
+        for field, value in self._iter_decoded(stream_or_string, clazz):
+            if field is None:
+                instance = value
+            else:
+                lists.setdefault(field, []).append(value)
+        for field, value in lists.items():
+            setattr(instance, field.name, value)
+        return instance    
+
+    def iter_list_items(self, stream_or_string, clazz, field_name, **options):
+        """
+        Generator yielding the items of the top level ListOf field_name of
+        the document one at a time
+        """
+        for field, value in self._iter_decoded(stream_or_string, clazz, field_name):
+            if field is not None:
+                yield value
             
     
 class JsonUnSerializer():
@@ -723,8 +1080,7 @@ class JsonUnSerializer():
         return PythonDeserializer().unserializeList(simplejson.load(stream), clazz,contains_built_in_type, **options)
         
 def contains_related_field_subclasses(related_field):
-    clazz = related_field.rel.to
-    return len( clazz.__subclasses__()) > 0
+    return is_polymorphic(related_field.rel.to)
     
 
 
@@ -739,9 +1095,8 @@ class XMLSerializerVisitor(ModelVisitor):
             value = get_serialized_field_value(instance, field)    
 
             if value is not None:
-                self.xmlwriter.start(field.xml_element_name, field.meta)
-                self.xmlwriter.data(unicode(value))
-                self.xmlwriter.end() 
+                tags = get_text_element_tags(instance._meta, field.name, field.xml_element_name, field.meta)
+                self.xmlwriter.text_element(tags, unicode(value))
 
     def write_value(self, value, name = None):
         if isinstance(value, types.DictType):
@@ -794,21 +1149,19 @@ class XMLSerializerVisitor(ModelVisitor):
         if related is not None:
             if list_of_field.rel.contains_built_in_type:
                 self.xmlwriter.start(list_of_field.name)
+                item_tags = get_text_element_tags(instance._meta, (list_of_field.name, ListRelation), list_of_field.rel.xml_element_name)
                 for item in related:
-                    self.xmlwriter.start(list_of_field.rel.xml_element_name)
-                    self.xmlwriter.data(unicode(item))
-                    self.xmlwriter.end()
+                    self.xmlwriter.text_element(item_tags, unicode(item))
                 self.xmlwriter.end()    
             else:            
                 has_subclasses = contains_related_field_subclasses(list_of_field)
                 element_name = list_of_field.xml_element_name if list_of_field.xml_element_name else list_of_field.name
                 self.xmlwriter.start(element_name)
                 for item in related:
-                    element_name = item._meta.xml_element_name
-                    attributes = {}
+                    start_tag, typed_start_tag, element_name = get_element_tags(item.__class__)
                     if has_subclasses: 
-                        attributes.update({"type" :get_fqclassname_forinstance(item)}) 
-                    self.xmlwriter.start(element_name, attributes)
+                        start_tag = typed_start_tag
+                    self.xmlwriter.start_prepared(start_tag, element_name)
                     item.visit(self)
                     self.xmlwriter.end()    
                 self.xmlwriter.end() 
@@ -849,7 +1202,7 @@ class XMLSerializer(Serializer):
         """
         self.options = options
         self.stream = options.get("stream", StringIO())
-        self.xmlwriter = XMLWriter( self.stream)
+        self.xmlwriter = XMLWriter(self.stream)
         self.start_serialization(obj)
         self.serialize_object( obj)
         self.end_serialization( obj)
@@ -883,12 +1236,18 @@ class DjangoJSONEncoder(simplejson.JSONEncoder):
 
     def default(self, o):
         if isinstance(o, datetime.datetime):
+            if self.DATE_FORMAT == DjangoJSONEncoder.DATE_FORMAT and self.TIME_FORMAT == DjangoJSONEncoder.TIME_FORMAT:
+                return format_datetime(o)
             d = datetime_safe.new_datetime(o)
             return d.strftime("%s %s" % (self.DATE_FORMAT, self.TIME_FORMAT))
         elif isinstance(o, datetime.date):
+            if self.DATE_FORMAT == DjangoJSONEncoder.DATE_FORMAT:
+                return format_date(o)
             d = datetime_safe.new_date(o)
             return d.strftime(self.DATE_FORMAT)
         elif isinstance(o, datetime.time):
+            if self.TIME_FORMAT == DjangoJSONEncoder.TIME_FORMAT:
+                return format_time(o)
             return o.strftime(self.TIME_FORMAT)
         elif isinstance(o, decimal.Decimal):
             return str(o)
@@ -899,6 +1258,56 @@ class DjangoJSONEncoder(simplejson.JSONEncoder):
 DateTimeAwareJSONEncoder = DjangoJSONEncoder
 
 
+SERIALIZERS = {
+    'python': PythonSerializer,
+    'json': JsonSerializer,
+    'xml': XMLSerializer,
+    'binary': BinarySerializer,
+}
+
+
+def _serialize_one(job):
+    format, obj, options = job
+    return SERIALIZERS[format]().serialize(obj, **options)
+
+
+def iter_serialize_many(docs, format = 'json', workers = None, chunksize = None, **options):
+    """
+    Generator yielding the serialized docs in the order of docs, with workers > 1 the 
+    documents are serialized by a pool of worker processes. The documents must be 
+    picklable, so their classes must be importable by the workers.
+    """
+    assert format in SERIALIZERS, "unknown serialization format %s" % format
+    assert not 'stream' in options, "serialized documents are returned, not written to a stream"
+    size = len(docs) if hasattr(docs, '__len__') else None
+    jobs = ((format, doc, options) for doc in docs)
+    return imap_ordered(_serialize_one, jobs, workers, chunksize, size)
+
+
+def serialize_many(docs, format = 'json', workers = None, chunksize = None, stream = None, **options):
+    """
+    Serializes the docs, see iter_serialize_many. Returns a list with the serialized
+    docs in the order of docs, or when a stream is given, writes the serialized docs
+    to the stream as soon as they are available. Only the json and binary formats
+    can be written to a stream: json as a list of the documents, binary as the
+    documents one after the other, read them with BinaryUnserializer.iter_unserialize.
+    """
+    assert stream is None or format in ('json', 'binary'), "%s documents can't be written to a stream" % format
+    results = iter_serialize_many(docs, format, workers, chunksize, **options)
+    if stream is None:
+        return list(results)
+    
+    is_json = format == 'json'
+    if is_json:
+        stream.write('[')
+    for i, result in enumerate(results):
+        if i and is_json:
+            stream.write(', ')
+        stream.write(result)
+    if is_json:
+        stream.write(']')
+
+
 
 def create_key_jsonvalue_dict(obj, exclude = None):
     """
@@ -948,14 +1357,14 @@ def object_from_key_jsonvalue_dict(clazz, json_value_dict):
     Creates a object of clazz and initializes it values from the json_value_dict
     """
     from .documents import DynamicModel
-    from .fields import FieldDoesNotExist
     
-    obj = clazz()
+    obj = clazz._from_values()
+    get_field_or_none = obj._meta.get_field_or_none
     for name, value in json_value_dict.items():
         if name in [CLAZZ,DYNAMIC_ATTRIBUTES]:
                 continue
-        try:
-            field = obj._meta.get_field(name)    
+        field = get_field_or_none(name)
+        if field is not None:
     
             if field.rel:
                 #assert isinstance(field.rel, OneOnOneRelation), "only OneOf relations allowed here"
@@ -972,7 +1381,7 @@ def object_from_key_jsonvalue_dict(clazz, json_value_dict):
                         
             else:
                 setattr(obj, name, value)
-        except FieldDoesNotExist:
+        else:
             "add it as a dynamic field"
             if issubclass( clazz, DynamicModel):
                     child = JsonUnSerializer().unserialize(value)
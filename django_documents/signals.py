@@ -4,6 +4,8 @@ aspect_class_prepared = Signal(providing_args=["class"])
 
 data_pre_save = Signal(providing_args=["instance"])
 data_post_save = Signal(providing_args=["instance"])
+# sent per written batch of save_many
+data_post_save_many = Signal(providing_args=["instances"])
 
 data_pre_delete = Signal(providing_args=["instance"])
 data_post_delete = Signal(providing_args=["instance"])
@@ -0,0 +1,107 @@
+"""
+Coalescing of concurrent calls for the same key.
+
+When several threads call SingleFlight.do with the same key at the same time,
+only the first one, the leader, calls the function. The others wait for it
+and get its result, or its exception. With copy_result the waiters get their
+own copy of the result: the leader makes a copy for them before it returns
+the result, so it can change its result straight away.
+
+Exceptions of error_types can be kept for error_ttl seconds, calls for the
+key raise them again without calling the function, until clear_errors is
+called.
+"""
+import sys
+import threading
+import time
+
+
+class Flight(object):
+    """
+    A call in progress
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+
+    def __init__(self, error_ttl = None, error_types = (), copy_result = None):
+        self.error_ttl = error_ttl
+        self.error_types = error_types
+        self.copy_result = copy_result
+        self._lock = threading.Lock()
+        self._flights = {}
+        # key -> (exception, expires)
+        self._errors = {}
+        # incremented by clear_errors, exceptions raised by calls started before aren't kept
+        self._generation = 0
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, func, *args):
+        """
+        Returns (func(*args), leader), leader is False for callers that got the
+        result of another caller
+        """
+        with self._lock:
+            if self._errors:
+                error = self._errors.get(key)
+                if error is not None:
+                    if error[1] >= time.time():
+                        raise error[0]
+                    del self._errors[key]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                generation = self._generation
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.exc_info is not None:
+                raise flight.exc_info[0], flight.exc_info[1], flight.exc_info[2]
+            if self.copy_result is not None:
+                return self.copy_result(flight.result), False
+            return flight.result, False
+        try:
+            result = func(*args)
+        except:
+            flight.exc_info = exc_info = sys.exc_info()
+            with self._lock:
+                del self._flights[key]
+                if (self.error_ttl and generation == self._generation
+                        and isinstance(exc_info[1], self.error_types)):
+                    self._errors[key] = (exc_info[1], time.time() + self.error_ttl)
+            flight.done.set()
+            raise exc_info[0], exc_info[1], exc_info[2]
+        try:
+            with self._lock:
+                # no waiters join after this
+                del self._flights[key]
+            if flight.waiters and self.copy_result is not None:
+                # the waiters copy a copy that the leader doesn't change
+                flight.result = self.copy_result(result)
+            else:
+                flight.result = result
+        except:
+            flight.exc_info = sys.exc_info()
+            raise
+        finally:
+            flight.done.set()
+        return result, True
+
+    def clear_errors(self):
+        """
+        Drops the kept exceptions
+        """
+        with self._lock:
+            self._generation += 1
+            self._errors.clear()
@@ -0,0 +1,239 @@
+"""
+Conversion of dates, datetimes and times from and to text, shared by the fields
+and the serializers.
+
+Parsing first tries fixed ISO-8601 formats with a regular expression per format.
+A DateTimeParser remembers which format parsed its last value and tries that
+format first, every DateTimeField has its own parser. Values in other formats
+are parsed by dateutil and the older strptime formats, unless the parser is
+strict.
+
+Formatting uses fixed formats as well, the text of recently formatted dates
+and datetimes is cached.
+"""
+import datetime
+import re
+import time
+
+from django.utils.tzinfo import FixedOffset
+
+
+class TemporalFormatError(ValueError):
+    """
+    The text isn't in a format that can be parsed
+    """
+    pass
+
+
+# number of formatted values kept per cache, a cache is cleared when it is full
+FORMAT_CACHE_SIZE = 4096
+
+_date_texts = {}
+_datetime_texts = {}
+
+
+def format_date(value):
+    """
+    Returns value as YYYY-MM-DD
+    """
+    try:
+        return _date_texts[value]
+    except KeyError:
+        text = '%04d-%02d-%02d' % (value.year, value.month, value.day)
+        if len(_date_texts) >= FORMAT_CACHE_SIZE:
+            _date_texts.clear()
+        _date_texts[value] = text
+        return text
+
+
+def format_datetime(value, separator = ' '):
+    """
+    Returns value as YYYY-MM-DD HH:MM:SS, without microseconds and time zone,
+    separator is put between the date and the time
+    """
+    if value.tzinfo is not None:
+        # aware datetimes of the same instant are equal, but not their texts
+        return '%04d-%02d-%02d%s%02d:%02d:%02d' % (value.year, value.month, value.day, separator,
+                                                   value.hour, value.minute, value.second)
+    key = (value, separator)
+    try:
+        return _datetime_texts[key]
+    except KeyError:
+        text = '%04d-%02d-%02d%s%02d:%02d:%02d' % (value.year, value.month, value.day, separator,
+                                                   value.hour, value.minute, value.second)
+        if len(_datetime_texts) >= FORMAT_CACHE_SIZE:
+            _datetime_texts.clear()
+        _datetime_texts[key] = text
+        return text
+
+
+def format_time(value):
+    """
+    Returns value as HH:MM:SS
+    """
+    return '%02d:%02d:%02d' % (value.hour, value.minute, value.second)
+
+
+def format_datetimes(values, separator = ' '):
+    """
+    Returns the formatted values, None values stay None
+    """
+    return [None if value is None else format_datetime(value, separator) for value in values]
+
+
+_date_re = re.compile(r'(\d{4})-(\d{2})-(\d{2})$')
+# the format DateField accepted before
+_ansi_date_re = re.compile(r'^\d{4}-\d{1,2}-\d{1,2}$')
+
+
+def parse_date(value):
+    """
+    Returns the date of value in YYYY-MM-DD format, raises a TemporalFormatError
+    for other formats and a ValueError for dates that don't exist
+    """
+    match = _date_re.match(value)
+    if match is not None:
+        year, month, day = match.groups()
+        return datetime.date(int(year), int(month), int(day))
+    if not _ansi_date_re.search(value):
+        raise TemporalFormatError("Value [%s] is not in YYYY-MM-DD format" % value)
+    year, month, day = map(int, value.split('-'))
+    return datetime.date(year, month, day)
+
+
+def _build_datetime(match):
+    year, month, day, hour, minute, second = match.groups()[:6]
+    return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second or 0))
+
+
+def _build_datetime_usecs(match):
+    year, month, day, hour, minute, second, usecs = match.groups()
+    return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                             int(usecs.ljust(6, '0')))
+
+
+def _build_date(match):
+    year, month, day = match.groups()
+    return datetime.datetime(int(year), int(month), int(day))
+
+
+def _build_datetime_tz(match):
+    year, month, day, hour, minute, second, usecs, zulu, sign, tz_hours, tz_minutes = match.groups()
+    if zulu:
+        offset = 0
+    else:
+        offset = int(tz_hours) * 60 + int(tz_minutes)
+        if sign == '-':
+            offset = -offset
+    return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second or 0),
+                             int((usecs or '0').ljust(6, '0')), FixedOffset(offset))
+
+
+# (regular expression, function building the datetime of a match), the most used formats first
+DATETIME_FORMATS = (
+    (re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})$'), _build_datetime),
+    (re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})\.(\d{1,6})$'), _build_datetime_usecs),
+    (re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2})()$'), _build_datetime),
+    (re.compile(r'(\d{4})-(\d{2})-(\d{2})$'), _build_date),
+)
+
+# only strict parsers build time zones themselves, dateutil does it for the others
+DATETIME_TZ_FORMATS = (
+    (re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?(?:(Z)|([+-])(\d{2}):?(\d{2}))$'),
+     _build_datetime_tz),
+)
+
+
+def _parse_datetime_with_fallbacks(value):
+    """
+    How DateTimeField parsed any value before: with dateutil, otherwise with strptime
+    """
+    try:
+        import dateutil.parser
+        return dateutil.parser.parse(value)
+    except ValueError:
+        pass
+
+    # split usecs, because they are not recognized by strptime.
+    if '.' in value:
+        value, usecs = value.split('.')
+        usecs = int(usecs)
+    else:
+        usecs = 0
+    for format in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.datetime(*time.strptime(value, format)[:6], microsecond = usecs)
+        except ValueError:
+            pass
+    raise TemporalFormatError("Value [%s] is not a datetime" % value)
+
+
+class DateTimeParser(object):
+    """
+    Parses datetimes, trying the ISO-8601 format of the previous value first.
+    A strict parser only parses ISO-8601 values (with time zones), others
+    also parse any format dateutil knows.
+    """
+
+    def __init__(self, strict = False):
+        self.strict = strict
+        self.formats = DATETIME_FORMATS + DATETIME_TZ_FORMATS if strict else DATETIME_FORMATS
+        self.last_format = self.formats[0]
+
+    def parse(self, value):
+        """
+        Returns the datetime of value, raises a ValueError when it can't be parsed
+        """
+        regex, build = self.last_format
+        match = regex.match(value)
+        if match is None:
+            for format in self.formats:
+                regex, build = format
+                match = regex.match(value)
+                if match is not None:
+                    self.last_format = format
+                    break
+            else:
+                if self.strict:
+                    raise TemporalFormatError("Value [%s] is not an ISO-8601 datetime" % value)
+                return _parse_datetime_with_fallbacks(value)
+        return build(match)
+
+    def parse_many(self, values):
+        """
+        Returns the datetimes of values, None values stay None
+        """
+        parse = self.parse
+        return [None if value is None else parse(value) for value in values]
+
+
+def parse_datetimes(values, strict = False):
+    """
+    Returns the datetimes of values, see DateTimeParser
+    """
+    return DateTimeParser(strict).parse_many(values)
+
+
+_time_re = re.compile(r'(\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{6}))?)?$')
+
+
+def parse_time(value):
+    """
+    Returns the time of value in HH:MM[:ss[.uuuuuu]] format, raises a ValueError otherwise
+    """
+    match = _time_re.match(value)
+    if match is not None:
+        hour, minute, second, usecs = match.groups()
+        return datetime.time(int(hour), int(minute), int(second or 0), int(usecs or 0))
+
+    # split usecs, because they are not recognized by strptime.
+    if '.' in value:
+        value, usecs = value.split('.')
+        usecs = int(usecs)
+    else:
+        usecs = 0
+    try: # Seconds are optional, so try converting seconds first.
+        return datetime.time(*time.strptime(value, '%H:%M:%S')[3:6], microsecond = usecs)
+    except ValueError:
+        # Try without seconds.
+        return datetime.time(*time.strptime(value, '%H:%M')[3:5], microsecond = usecs)
@@ -1,50 +1,19 @@
-import sys
-from classfactory import classFactoryCache
+from resolver import resolve_class
 
 from django.utils.encoding import force_unicode
 
-import time, random, md5, socket
+from ids import generate_id
 
 
 def uuid(*args):
     """
-    Generates a universally unique ID.
-    Any arguments only create more randomness.
+    Generates a universally unique ID, see ids. The IDs sort in the order they
+    were generated. Arguments are ignored, they are accepted for compatibility.
     """
-    t = long(time.time() * 1000)
-    r = long(random.random()*100000000000000000L)
-    try:
-        a = socket.gethostbyname(socket.gethostname())
-    except:
-    # if we can't get a network address, just imagine one
-        a = random.random()*100000000000000000L
-    data = str(t)+' '+str(r)+' '+str(a)+' '+str(args)
-    data = md5.md5(data).hexdigest()
-    return data
+    return generate_id()
 
-def fix_uso_db_space(fqcn):
-    """
-    NOTE, THIS IS A TEMP FIX. TO REPAIR WRONG IMPORTS FROM THE PAST
-    """
-    if fqcn[0:3] == 'db.':
-        return 'uso.' + fqcn
-    else:
-        return fqcn
-
-
-def get_class(fqcn):
-    try:
-        fqcn = fix_uso_db_space(fqcn)
-        paths = fqcn.split('.')
-        modulename = '.'.join(paths[:-1])
-        classname = paths[-1]
-        __import__(modulename)
-        return getattr(sys.modules[modulename], classname)
-    except:
-        clazz = classFactoryCache.create_class(fqcn)
-        if clazz is None:
-            raise RuntimeError("Clazz with name [%s] not found " % fqcn)
-        return clazz
+# resolves with the cached class resolver, raises a RuntimeError for unknown classes
+get_class = resolve_class
 
 def get_fqclassname_forclass(aclass):
     return "%s.%s" % ( aclass.__module__ ,  aclass.__name__)
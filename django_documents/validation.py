@@ -0,0 +1,434 @@
+"""
+Compiled validation of models.
+
+Model.clean_fields and Model.full_clean use a ValidationPlan, built once per model
+class. The plan leaves out fields for which validation can't fail and doesn't
+change the value, it skips to_python when the value already has the python type
+of the field and it does the null and blank checks without calling the field.
+Errors are collected in a dict, nested models (OneOf, ListOf) are validated with
+their own plans.
+
+Incremental validation is opt-in: after a successful full_clean(incremental = True)
+a snapshot of the field values is stored in the state of the instance, later
+full_cleans keep it up to date. full_clean(incremental = True) compares the
+instance with its snapshot and only validates fields that changed, and nested
+models that changed, since. Values are compared by identity, lists and dicts by their items,
+values of other mutable types always count as changed.
+
+The python deserializer can validate documents while it decodes them, see
+validate_decoded: every document is validated when it is complete, its nested
+documents are validated before it and their results are looked up in the dict
+decoded, by the id of the nested document.
+"""
+import datetime
+import decimal
+import time
+from itertools import izip
+
+from django.core import validators
+from django.core.exceptions import ValidationError
+
+from fields import Field, CharField, IntegerField, FloatField, DateField, DateTimeField, TimeField, BooleanField
+from related import OneOf, ListOf
+from parallel import imap_ordered
+from utils import get_fqclassname_forclass
+
+
+# to_python returns values of these types unchanged, None means to_python never changes the value
+UNCONVERTED_TYPES = {
+    Field.to_python.im_func: None,
+    CharField.to_python.im_func: (str, unicode, type(None)),
+    IntegerField.to_python.im_func: (int, type(None)),
+    FloatField.to_python.im_func: (float, type(None)),
+    DateField.to_python.im_func: (datetime.date, type(None)),
+    DateTimeField.to_python.im_func: (datetime.datetime, type(None)),
+    TimeField.to_python.im_func: (datetime.time, type(None)),
+    BooleanField.to_python.im_func: (bool,),
+}
+
+# values of these types can only change by being replaced
+IMMUTABLE_TYPES = frozenset([type(None), bool, int, long, float, str, unicode, decimal.Decimal,
+                             datetime.date, datetime.datetime, datetime.time])
+
+# snapshot of a value that can't be compared
+UNTRACKED = object()
+
+# kinds of field checks
+FIELD, ONE_OF, LIST_OF, CLEAN = range(4)
+
+
+def is_method_of(clazz, name, base):
+    """
+    Returns whether the method name of clazz is the one defined by base
+    """
+    return getattr(clazz, name).im_func is getattr(base, name).im_func
+
+
+class FieldCheck(object):
+    """
+    The compiled validation of one field
+    """
+
+    def __init__(self, field):
+        clazz = field.__class__
+        self.field = field
+        self.name = field.name
+        self.attname = field.attname
+        self.blank = field.blank
+
+        if isinstance(field, OneOf) and is_method_of(clazz, 'clean', OneOf):
+            self.kind = ONE_OF
+        elif isinstance(field, ListOf) and is_method_of(clazz, 'clean', Field):
+            self.kind = LIST_OF
+        elif is_method_of(clazz, 'clean', Field):
+            self.kind = FIELD
+        else:
+            self.kind = CLEAN
+
+        to_python = clazz.to_python.im_func
+        if to_python in UNCONVERTED_TYPES:
+            self.unconverted_types = UNCONVERTED_TYPES[to_python]
+            self.convert = self.unconverted_types is not None
+        else:
+            self.unconverted_types = None
+            self.convert = True
+
+        # the null and blank checks of the field's validate are done by the check itself
+        if self.kind == ONE_OF:
+            self.inline_validate = is_method_of(clazz, 'validate', OneOf) and not field._choices
+            editable = field.editable and not field.rel.parent_link
+        elif self.kind == LIST_OF:
+            self.inline_validate = is_method_of(clazz, 'validate', ListOf)
+            editable = field.editable
+        else:
+            self.inline_validate = is_method_of(clazz, 'validate', Field) and not field._choices
+            editable = field.editable
+        self.check_null = editable and not field.null
+        # ListOf doesn't check blank values
+        self.check_blank = editable and not field.blank and self.kind != LIST_OF
+        self.check_items = editable and self.kind == LIST_OF and not field.rel.contains_built_in_type
+        self.check_choices = editable and self.kind == LIST_OF and field.rel.contains_built_in_type and bool(field._choices)
+
+        base = ListOf if self.kind == LIST_OF else Field
+        self.run_validators = bool(field.validators) or not is_method_of(clazz, 'run_validators', base)
+
+    def is_noop(self):
+        """
+        Returns whether validating the field can't raise errors or change the value
+        """
+        return (self.kind == FIELD and not self.convert and self.inline_validate and
+                not self.check_null and not self.check_blank and not self.run_validators)
+
+    def clean(self, instance, value, incremental = False, decoded = None):
+        """
+        Validates value, the value of the field of instance, sets the cleaned value
+        and returns the error messages, or None when the value is valid
+        """
+        field = self.field
+        if self.kind == CLEAN:
+            try:
+                setattr(instance, self.attname, field.clean(value, instance))
+            except ValidationError, e:
+                return e.messages
+            return None
+
+        try:
+            if self.convert and (self.unconverted_types is None or type(value) not in self.unconverted_types):
+                converted = field.to_python(value)
+                if converted is not value:
+                    setattr(instance, self.attname, converted)
+                    value = converted
+
+            if not self.inline_validate:
+                field.validate(value, instance)
+            elif self.kind == LIST_OF:
+                if self.check_choices and value:
+                    for item_value in value:
+                        field._validate(item_value)
+                elif self.check_items and value is not None:
+                    errors = validate_items(field, value, incremental, decoded)
+                    if errors:
+                        return errors
+                if self.check_null and value is None:
+                    raise ValidationError(field.error_messages['null'])
+            else:
+                if self.check_null and value is None:
+                    raise ValidationError(field.error_messages['null'])
+                if self.check_blank and value in validators.EMPTY_VALUES:
+                    raise ValidationError(field.error_messages['blank'])
+
+            if self.run_validators:
+                field.run_validators(value)
+        except ValidationError, e:
+            return e.messages
+
+        if self.kind == ONE_OF and value:
+            return validate_object(value, incremental, decoded)
+        return None
+
+
+class ValidationPlan(object):
+    """
+    The compiled validation of a model class
+    """
+
+    def __init__(self, clazz):
+        from documents import Model
+        self.attnames = [field.attname for field in clazz._meta.fields]
+        self.checks = []
+        for field in clazz._meta.fields:
+            check = FieldCheck(field)
+            if not check.is_noop():
+                self.checks.append(check)
+        # overridden methods of the model are called instead of the compiled validation
+        self.custom_clean_fields = not is_method_of(clazz, 'clean_fields', Model)
+        self.custom_full_clean = not is_method_of(clazz, 'full_clean', Model)
+
+    def clean_fields(self, instance, exclude = None, incremental = False, decoded = None):
+        """
+        Cleans the fields of instance, returns a dict with the error messages per field name.
+        Incremental skips the fields that didn't change since the last successful full_clean.
+        """
+        snapshot = self.get_snapshot(instance) if incremental else None
+        errors = {}
+        for check in self.checks:
+            if exclude and check.name in exclude:
+                continue
+            value = getattr(instance, check.attname)
+            # Skip validation for empty fields with blank=True. The developer
+            # is responsible for making sure they have a valid value.
+            if check.blank and value in validators.EMPTY_VALUES:
+                continue
+            if snapshot is not None and is_unchanged(value, snapshot[check.attname]):
+                continue
+            messages = check.clean(instance, value, incremental, decoded)
+            if messages is not None:
+                errors[check.name] = messages
+                instance._add_error(check.attname, messages)
+        return errors
+
+    def full_clean(self, instance, exclude = None, incremental = False, decoded = None):
+        """
+        Cleans the fields of instance and calls its clean, returns a dict with the error messages.
+        Incremental validates only what changed since the last successful full_clean.
+        """
+        if incremental and not exclude and self.is_unchanged(instance):
+            return {}
+        if self.custom_clean_fields:
+            errors = {}
+            try:
+                instance.clean_fields(exclude = exclude)
+            except ValidationError, e:
+                errors = e.update_error_dict(errors)
+        else:
+            errors = self.clean_fields(instance, exclude, incremental, decoded)
+        # Form.clean() is run even if other validation fails, so do the
+        # same with Model.clean() for consistency.
+        try:
+            instance.clean()
+        except ValidationError, e:
+            errors = e.update_error_dict(errors)
+
+        state = getattr(instance, '_state', None)
+        if state is not None:
+            if errors:
+                state.validated = None
+            elif not exclude and (incremental or state.validated is not None):
+                # only instances that are validated incrementally get snapshots
+                state.validated = (self, [take_snapshot(getattr(instance, attname)) for attname in self.attnames])
+        return errors
+
+    def get_snapshot(self, instance):
+        """
+        Returns the field values of instance, by attname, at its last successful full_clean, or None
+        """
+        validated = getattr(getattr(instance, '_state', None), 'validated', None)
+        # the snapshot is dropped when the fields of the class change
+        if validated is None or validated[0] is not self:
+            return None
+        return dict(izip(self.attnames, validated[1]))
+
+    def is_unchanged(self, instance):
+        """
+        Returns whether instance and its nested models didn't change since the last successful full_clean
+        """
+        validated = getattr(getattr(instance, '_state', None), 'validated', None)
+        if validated is None or validated[0] is not self:
+            return False
+        for attname, snapshot in izip(self.attnames, validated[1]):
+            if not is_unchanged(getattr(instance, attname), snapshot):
+                return False
+        return True
+
+
+def take_snapshot(value):
+    """
+    Returns the snapshot of a field value, the value and a copy of the items of a list or dict
+    """
+    clazz = type(value)
+    if clazz in IMMUTABLE_TYPES or getattr(value, '_meta', None) is not None:
+        return (value, None)
+    if clazz is list:
+        return (value, tuple(value))
+    if clazz is dict:
+        return (value, tuple(value.iteritems()))
+    return UNTRACKED
+
+
+def is_unchanged_item(value, old_value):
+    if value is not old_value:
+        return False
+    if type(value) in IMMUTABLE_TYPES:
+        return True
+    if getattr(value, '_meta', None) is not None:
+        return get_validation_plan(value.__class__).is_unchanged(value)
+    return False
+
+
+def is_unchanged(value, snapshot):
+    """
+    Returns whether value is the value, with the same items and unchanged nested models, of snapshot
+    """
+    if snapshot is UNTRACKED:
+        return False
+    old_value, items = snapshot
+    if items is None:
+        return is_unchanged_item(value, old_value)
+    if value is not old_value or len(value) != len(items):
+        return False
+    if type(value) is list:
+        for item_value, old_item_value in izip(value, items):
+            if not is_unchanged_item(item_value, old_item_value):
+                return False
+    else:
+        for key, old_item_value in items:
+            if not is_unchanged_item(value.get(key, UNTRACKED), old_item_value):
+                return False
+    return True
+
+
+def get_validation_plan(clazz):
+    """
+    Returns the (cached) ValidationPlan of a model class
+    """
+    meta = clazz._meta
+    try:
+        return meta._validation_plan
+    except AttributeError:
+        plan = meta._validation_plan = ValidationPlan(clazz)
+        return plan
+
+
+def validate_object(instance, incremental = False, decoded = None):
+    """
+    Validates a nested model instance like its full_clean, returns the error messages or None
+    """
+    if getattr(instance, '_meta', None) is None:
+        return None
+    if decoded is not None and id(instance) in decoded:
+        return decoded[id(instance)]
+    plan = get_validation_plan(instance.__class__)
+    if plan.custom_full_clean:
+        try:
+            instance.full_clean()
+        except ValidationError, e:
+            return e.messages
+        return None
+    return plan.full_clean(instance, incremental = incremental) or None
+
+
+def validate_items(list_of_field, value, incremental = False, decoded = None):
+    """
+    Validates the model instances in value, returns a dict with the error messages per item
+    """
+    errors = {}
+    for i, item_value in enumerate(value):
+        messages = validate_object(item_value, incremental, decoded)
+        if messages is not None:
+            errors[list_of_field.name + "." + str(i)] = messages
+    return errors
+
+
+def validate_decoded(instance, conversion_errors, decoded):
+    """
+    Validates a just decoded instance, its nested documents must be validated already.
+    conversion_errors are the error messages per field name of values that couldn't be
+    converted, these fields aren't validated again. Stores and returns the error messages
+    or None.
+    """
+    plan = get_validation_plan(instance.__class__)
+    if plan.custom_full_clean:
+        errors = {}
+        try:
+            instance.full_clean(exclude = conversion_errors.keys())
+        except ValidationError, e:
+            errors = e.update_error_dict(errors)
+    else:
+        errors = plan.full_clean(instance, set(conversion_errors), decoded = decoded)
+    errors.update(conversion_errors)
+    errors = decoded[id(instance)] = errors or None
+    return errors
+
+
+class ValidationReport(object):
+    """
+    The result of validate_many: the message_dict per index of an invalid document
+    and the number of documents and the validation time per class
+    """
+
+    def __init__(self):
+        self.errors = {}
+        self.count = 0
+        self.timings = {}
+
+    def is_valid(self):
+        return not self.errors
+
+    def add(self, index, clazz_name, seconds, message_dict):
+        self.count += 1
+        timing = self.timings.get(clazz_name)
+        if timing is None:
+            timing = self.timings[clazz_name] = [0, 0.0]
+        timing[0] += 1
+        timing[1] += seconds
+        if message_dict is not None:
+            self.errors[index] = message_dict
+
+    def get_class_stats(self):
+        """
+        Returns per class name a dict with the number of documents, the total and the average seconds
+        """
+        stats = {}
+        for clazz_name, (count, seconds) in self.timings.items():
+            stats[clazz_name] = {'count': count, 'seconds': seconds, 'average': seconds / count}
+        return stats
+
+
+def _validate_one(doc):
+    start = time.time()
+    try:
+        doc.full_clean()
+        message_dict = None
+    except ValidationError, e:
+        message_dict = e.update_error_dict({})
+    return get_fqclassname_forclass(doc.__class__), time.time() - start, message_dict
+
+
+def validate_many(docs, workers = None, fail_fast = False, chunksize = None):
+    """
+    Validates the docs with full_clean and returns a ValidationReport, with workers > 1
+    the documents are validated by a pool of worker processes. The workers validate copies
+    of the documents, so the cleaned values and errors aren't set on docs then.
+    With fail_fast the validation stops at the first invalid document.
+    """
+    report = ValidationReport()
+    results = imap_ordered(_validate_one, docs, workers, chunksize)
+    try:
+        for index, (clazz_name, seconds, message_dict) in enumerate(results):
+            report.add(index, clazz_name, seconds, message_dict)
+            if fail_fast and message_dict is not None:
+                break
+    finally:
+        # stops the workers
+        results.close()
+    return report
@@ -0,0 +1,181 @@
+"""
+Buffered XML writer, producing the same output as elementtree's SimpleXMLWriter.
+
+Next to the SimpleXMLWriter methods (start, data, end, close, element) the writer
+has methods taking tags that are escaped and encoded in advance, see
+get_text_element_tags and get_element_tags, so only text values are escaped while
+writing. Output is collected and written to the stream in large chunks.
+"""
+from .utils import get_fqclassname_forclass
+
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+def escape_cdata(text, encoding = 'us-ascii'):
+    text = text.replace(u"&", u"&amp;").replace(u"<", u"&lt;").replace(u">", u"&gt;")
+    return text.encode(encoding, 'xmlcharrefreplace')
+
+
+def escape_attrib(text, encoding = 'us-ascii'):
+    text = text.replace(u"&", u"&amp;").replace(u"'", u"&apos;").replace(u"\"", u"&quot;")
+    text = text.replace(u"<", u"&lt;").replace(u">", u"&gt;")
+    return text.encode(encoding, 'xmlcharrefreplace')
+
+
+def format_start_tag(tag, attrib = None, encoding = 'us-ascii'):
+    """
+    Returns the escaped and encoded start tag, without the closing >
+    """
+    parts = ["<", escape_cdata(tag, encoding)]
+    if attrib:
+        for key, value in sorted(attrib.items()):
+            parts.append(" %s=\"%s\"" % (escape_cdata(key, encoding), escape_attrib(value, encoding)))
+    return "".join(parts)
+
+
+def format_end_tag(tag, encoding = 'us-ascii'):
+    return "</%s>" % escape_cdata(tag, encoding)
+
+
+def get_text_element_tags(meta, key, tag, attrib = None):
+    """
+    Returns the (cached) complete start tag and the end tag of a text element
+    written for the model of meta, key identifies the element within the model
+    (like a field name), tag and attrib must be the same for every call with key.
+    """
+    try:
+        cache = meta._xml_text_element_tags
+    except AttributeError:
+        cache = meta._xml_text_element_tags = {}
+    try:
+        return cache[key]
+    except KeyError:
+        tags = cache[key] = (format_start_tag(tag, attrib) + ">", format_end_tag(tag))
+        return tags
+
+
+def get_element_tags(clazz):
+    """
+    Returns the (cached) start tags, without the closing >, of the element for an
+    instance of clazz: without and with the type attribute. And the tag name.
+    """
+    meta = clazz._meta
+    try:
+        return meta._xml_element_tags
+    except AttributeError:
+        tag = meta.xml_element_name
+        tags = meta._xml_element_tags = (format_start_tag(tag),
+                                         format_start_tag(tag, {"type": get_fqclassname_forclass(clazz)}),
+                                         tag)
+        return tags
+
+
+class XMLWriter(object):
+    """
+    Buffered replacement for elementtree's SimpleXMLWriter, the output is written
+    to the stream when the buffer is full, on flush and on close
+    """
+
+    def __init__(self, file, encoding = 'us-ascii', buffer_size = DEFAULT_BUFFER_SIZE):
+        if not hasattr(file, "write"):
+            file = open(file, "wb")
+        self._file = file
+        self._encoding = encoding
+        self._buffer_size = buffer_size
+        self._buffer = []
+        self._buffered = 0
+        self._tags = []
+        # a start tag is written without its closing >, until it is known whether the element is empty
+        self._open = False
+
+    def _write(self, text):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        if hasattr(self._file, "flush"):
+            self._file.flush()
+
+    def declaration(self):
+        encoding = self._encoding
+        if encoding == "us-ascii" or encoding == "utf-8":
+            self._write("<?xml version='1.0'?>\n")
+        else:
+            self._write("<?xml version='1.0' encoding='%s'?>\n" % encoding)
+
+    def start(self, tag, attrib = {}, **extra):
+        """
+        Opens an element, returns an id for close
+        """
+        if extra:
+            attrib = dict(attrib or {})
+            attrib.update(extra)
+        return self.start_prepared(format_start_tag(tag, attrib, self._encoding), tag)
+
+    def start_prepared(self, start_tag, tag):
+        """
+        Opens an element with a start tag (without the closing >) from format_start_tag
+        """
+        if self._open:
+            self._write(">" + start_tag)
+        else:
+            self._write(start_tag)
+        self._tags.append(tag)
+        self._open = True
+        return len(self._tags) - 1
+
+    def data(self, text):
+        text = escape_cdata(text, self._encoding)
+        if self._open:
+            self._open = False
+            self._write(">" + text)
+        else:
+            self._write(text)
+
+    def end(self, tag = None):
+        """
+        Closes the current element
+        """
+        if tag:
+            assert self._tags, "unbalanced end(%s)" % tag
+            assert tag == self._tags[-1], "expected end(%s), got %s" % (self._tags[-1], tag)
+        else:
+            assert self._tags, "unbalanced end()"
+        tag = self._tags.pop()
+        if self._open:
+            self._open = False
+            self._write(" />")
+        else:
+            self._write(format_end_tag(tag, self._encoding))
+
+    def element(self, tag, text = None, attrib = {}, **extra):
+        self.start(tag, attrib, **extra)
+        if text:
+            self.data(text)
+        self.end()
+
+    def text_element(self, tags, text):
+        """
+        Writes a complete element with tags from get_text_element_tags
+        """
+        start_tag, end_tag = tags
+        if self._open:
+            self._open = False
+            self._write(">" + start_tag + escape_cdata(text, self._encoding) + end_tag)
+        else:
+            self._write(start_tag + escape_cdata(text, self._encoding) + end_tag)
+
+    def close(self, id):
+        """
+        Closes all elements up to and including the element with id and flushes
+        """
+        while len(self._tags) > id:
+            self.end()
+        self.flush()
@@ -0,0 +1,121 @@
+import prepare_settings
+
+from unittest import TestCase, main
+from datetime import date, datetime, time
+from decimal import Decimal
+from StringIO import StringIO
+import types
+
+from django_documents.binary import BinarySerializer, BinaryUnserializer, BinaryStreamWriter
+from django_documents.serializer import JsonSerializer, DeserializationError, serialize_many
+from django_documents.documents import Model, DataAspect, DynamicModel
+from django_documents import fields, related
+from model_definitions_for_test import ModelWithAllBaseFields
+
+
+class BinaryItem(Model):
+    name = fields.CharField()
+    amount = fields.DecimalField(max_digits=10, decimal_places=2)
+
+
+class BinaryAspect(DataAspect):
+    remark = fields.CharField()
+
+
+class BinaryDocument(DynamicModel):
+    title = fields.CharField()
+    count = fields.IntegerField()
+    ratio = fields.FloatField()
+    active = fields.BooleanField()
+    created = fields.DateField()
+    modified = fields.DateTimeField()
+    starts = fields.TimeField()
+    base = related.OneOf(ModelWithAllBaseFields)
+    data = related.OneOf(types.DictType)
+    items = related.ListOf(BinaryItem)
+    tags = related.ListOf(types.StringType)
+    named = related.MapOf(BinaryItem)
+    labels = related.MapOf(types.StringType)
+
+
+class BinarySerializationTest(TestCase):
+
+    def create_document(self):
+        doc = BinaryDocument(title=u"t\xebst", count=-300, ratio=0.25, active=True)
+        doc.created = date(2012, 1, 2)
+        doc.modified = datetime(2012, 1, 2, 13, 14, 15, 16)
+        doc.starts = time(8, 30)
+        doc.base = ModelWithAllBaseFields(char="a", integer=1, float=2.5, date=date(1968, 9, 17))
+        doc.data = {"lat": 0.8, "names": ["a", "b"]}
+        doc.items = [BinaryItem(name="one", amount=Decimal("1.25")), BinaryItem(name="two")]
+        doc.tags = ["x", "y"]
+        doc.named = {"first": BinaryItem(name="first")}
+        doc.labels = {"nl": "Nederlands"}
+        doc.add_dynamic_attribute("aspect", BinaryAspect(remark="dynamic"))
+        return doc
+
+    def test_roundtrip_equals_json(self):
+        doc = self.create_document()
+        unser_doc = BinaryUnserializer().unserialize(BinarySerializer().serialize(doc))
+        self.assertEqual(JsonSerializer().serialize(unser_doc), JsonSerializer().serialize(doc))
+        self.assertEqual(unser_doc.items[0].amount, Decimal("1.25"))
+        self.assertEqual(unser_doc.modified, datetime(2012, 1, 2, 13, 14, 15, 16))
+        self.assertEqual(unser_doc.aspect.remark, "dynamic")
+
+    def test_smaller_than_json(self):
+        doc = self.create_document()
+        doc.items = [BinaryItem(name="item", amount=Decimal("1.00")) for i in range(20)]
+        self.assertTrue(len(BinarySerializer().serialize(doc)) < len(JsonSerializer().serialize(doc)) / 2)
+
+    def test_unserialize_memoryview(self):
+        data = BinarySerializer().serialize(self.create_document())
+        unser_doc = BinaryUnserializer().unserialize(memoryview(data), BinaryDocument)
+        self.assertEqual(unser_doc.title, u"t\xebst")
+        self.assertEqual(unser_doc.count, -300)
+
+    def test_truncated_data(self):
+        data = BinarySerializer().serialize(self.create_document())
+        self.assertRaises(DeserializationError, BinaryUnserializer().unserialize, data[:-3])
+
+    def test_serialize_many_stream(self):
+        stream = StringIO()
+        serialize_many([BinaryItem(name="a"), BinaryItem(name="b")], format='binary', stream=stream)
+        items = list(BinaryUnserializer().iter_unserialize(stream.getvalue(), BinaryItem))
+        self.assertEqual([item.name for item in items], ["a", "b"])
+
+    def test_stream_writer_shares_class_table(self):
+        items = [BinaryItem(name="item%s" % i, amount=Decimal(i)) for i in range(5)]
+        stream = StringIO()
+        writer = BinaryStreamWriter(stream)
+        for item in items:
+            writer.write(item)
+        data = stream.getvalue()
+        self.assertEqual(data.count("BinaryItem"), 1)
+        separate = StringIO()
+        serialize_many(items, format='binary', stream=separate)
+        self.assertTrue(len(data) < len(separate.getvalue()))
+        unser_items = list(BinaryUnserializer().iter_unserialize(data, BinaryItem))
+        self.assertEqual([(item.name, item.amount) for item in unser_items], [(item.name, item.amount) for item in items])
+        # a continued document can't be read on its own
+        second = StringIO()
+        writer = BinaryStreamWriter(second)
+        writer.write(items[0])
+        position = len(second.getvalue())
+        writer.write(items[1])
+        self.assertRaises(DeserializationError, BinaryUnserializer().unserialize, second.getvalue()[position:])
+
+    def test_stream_writer_failed_document(self):
+        stream = StringIO()
+        writer = BinaryStreamWriter(stream)
+        writer.write(BinaryItem(name="first"))
+        bad = BinaryDocument(title=u"bad", base=ModelWithAllBaseFields(char="a"))
+        del bad.count
+        self.assertRaises(AttributeError, writer.write, bad)
+        writer.write(BinaryDocument(title=u"ok", base=ModelWithAllBaseFields(char="b")))
+        docs = list(BinaryUnserializer().iter_unserialize(stream.getvalue()))
+        self.assertEqual([doc.__class__ for doc in docs], [BinaryItem, BinaryDocument])
+        self.assertEqual((docs[1].title, docs[1].base.char), (u"ok", "b"))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,10 @@ from django.utils.translation import activate, deactivate
         
 from unittest import TestCase, main   
 
-from django_documents.documents import Model
-from django_documents import fields
+import types
+
+from django_documents.documents import Model, ObjectValidationError
+from django_documents import fields, related
 
 PARKING_FACILITIES_CHOICES_TR = [('OPS', { 'nl':'Eigen parkeerplaats beschikbaar', "de":"Eigene parkplatz", "en": "Private Parkplace"}),
                                  ('FPW', { 'nl': 'Gratis parkeren openbare weg', "de":"Eigene parkplatz", "en": "Private Parkplace"}), 
@@ -39,5 +41,49 @@ class ChoicesTest(TestCase):
         finally:
             deactivate
 
+CURRENCY_CHOICES = [('Europe', [('EUR', {'nl': 'Euro', 'en': 'Euro'}), ('GBP', {'nl': 'Brits pond', 'en': 'Pound sterling'})]),
+                    ('USD', {'nl': 'Amerikaanse dollar', 'en': 'US dollar'})]
+
+
+class ModelWithGroupedChoices(Model):
+    currency = fields.CharField(choices = CURRENCY_CHOICES)
+    currencies = related.ListOf(types.StringType, choices = CURRENCY_CHOICES, blank = True, null = True)
+
+
+class ChoiceIndexTest(TestCase):
+
+    def testIndexIsBuiltOnce(self):
+        field = ModelWithGroupedChoices._meta.get_field('currency')
+        index = field.get_choice_index()
+        self.assertTrue(index is field.get_choice_index())
+        self.assertEqual(index.values, frozenset(['EUR', 'GBP', 'USD']))
+        self.assertEqual(sorted(index.tables.keys()), ['en', 'nl'])
+
+    def testValidation(self):
+        model = ModelWithGroupedChoices(currency = 'GBP', currencies = ['EUR', 'USD'])
+        model.full_clean()
+        model.currencies = ['EUR', 'XXX']
+        self.assertRaises(ObjectValidationError, model.full_clean)
+        model = ModelWithGroupedChoices(currency = 'XXX')
+        self.assertRaises(ObjectValidationError, model.full_clean)
+
+    def testDisplayValues(self):
+        field = ModelWithGroupedChoices._meta.get_field('currency')
+        self.assertEqual(field.get_display_value('GBP', 'en'), 'Pound sterling')
+        self.assertTrue(field.get_display_value('GBP', 'fr') in ('Pound sterling', 'Brits pond'))
+        self.assertEqual(field.get_display_value('XXX', 'en'), 'XXX')
+        activate('nl-nl')
+        try:
+            self.assertEqual(ModelWithGroupedChoices(currency = 'USD').get_currency_display(), u'Amerikaanse dollar')
+        finally:
+            deactivate()
+
+    def testCallableChoices(self):
+        field = fields.CharField(choices = lambda: [('a', 'A')])
+        self.assertTrue(field.get_choice_index() is None)
+        self.assertTrue(field.is_valid_choice('a'))
+        self.assertFalse(field.is_valid_choice('b'))
+
+
 if __name__ == '__main__':
     main()    
\ No newline at end of file
@@ -0,0 +1,111 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import threading
+
+from django_documents.resolver import classResolver, resolve_class
+from django_documents.classfactory import classFactoryCache
+from django_documents.utils import get_class
+from django_documents import documents, fields
+
+
+class ResolverModel(documents.Model):
+    name = fields.CharField()
+
+
+class FactoryClass(object):
+    pass
+
+
+class TestClassFactory(object):
+
+    def get_class(self, fq_clazzname):
+        if fq_clazzname == "factory.FactoryClass":
+            return FactoryClass
+        return None
+
+
+class ClassResolverTest(TestCase):
+
+    def setUp(self):
+        classResolver.invalidate()
+        classResolver.reset_stats()
+
+    def test_resolve_is_cached(self):
+        self.assertTrue(resolve_class("test_class_resolver.ResolverModel") is ResolverModel)
+        self.assertTrue(get_class("test_class_resolver.ResolverModel") is ResolverModel)
+        stats = classResolver.get_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_unknown_class_is_remembered(self):
+        self.assertRaises(RuntimeError, resolve_class, "test_class_resolver.Unknown")
+        self.assertRaises(RuntimeError, resolve_class, "test_class_resolver.Unknown")
+        stats = classResolver.get_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['negative_hits'], 1)
+
+    def test_alias(self):
+        classResolver.register_alias("old.", "test_class_resolver.")
+        try:
+            self.assertTrue(resolve_class("old.ResolverModel") is ResolverModel)
+        finally:
+            classResolver.unregister_alias("old.")
+
+    def test_register_class_factory_invalidates(self):
+        self.assertRaises(RuntimeError, resolve_class, "factory.FactoryClass")
+        classFactoryCache.register_class_factory(TestClassFactory())
+        self.assertTrue(resolve_class("factory.FactoryClass") is FactoryClass)
+
+    def test_cache_is_bounded(self):
+        max_size = classResolver.max_size
+        classResolver.max_size = 2
+        try:
+            for name in ("ResolverModel", "FactoryClass", "TestClassFactory"):
+                resolve_class("test_class_resolver.%s" % name)
+            self.assertEqual(classResolver.get_stats()['resolved'], 2)
+        finally:
+            classResolver.max_size = max_size
+
+    def test_invalidate_while_loading(self):
+        calls = []
+        class RacingClassFactory(object):
+            # a factory registered by another thread while the name is loaded
+            def get_class(self, fq_clazzname):
+                if fq_clazzname != "racing.RacingClass":
+                    return None
+                calls.append(fq_clazzname)
+                if len(calls) == 1:
+                    classResolver.invalidate()
+                    return None
+                return FactoryClass
+        classFactoryCache.register_class_factory(RacingClassFactory())
+        self.assertRaises(RuntimeError, resolve_class, "racing.RacingClass")
+        self.assertEqual(classResolver.get_stats()['unresolved'], 0)
+        self.assertTrue(resolve_class("racing.RacingClass") is FactoryClass)
+
+    def test_threads(self):
+        max_size = classResolver.max_size
+        classResolver.max_size = 2
+        names = ["test_class_resolver.%s" % name for name in ("ResolverModel", "FactoryClass", "TestClassFactory")]
+        def resolve():
+            for i in range(300):
+                if i % 50 == 0:
+                    classResolver.invalidate()
+                resolve_class(names[i % 3])
+        threads = [threading.Thread(target = resolve) for i in range(8)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            resolved = classResolver._resolved
+            self.assertTrue(len(resolved) <= 2)
+            self.assertEqual(sorted(resolved.keyOrder), sorted(resolved.keys()))
+            self.assertEqual(len(set(resolved.keyOrder)), len(resolved.keyOrder))
+        finally:
+            classResolver.max_size = max_size
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import pickle
+import copy
+
+from django_documents.documents import Model, DataAspect, DynamicModel
+from django_documents.serializer import JsonSerializer, JsonUnSerializer, XMLSerializer, XMLUnserializer
+from django_documents.binary import BinarySerializer, BinaryUnserializer
+from django_documents import fields, related
+
+
+class CompactLocation(DataAspect):
+    lat = fields.FloatField()
+    lng = fields.FloatField()
+
+    class Meta:
+        compact = True
+
+
+class CompactAddress(Model):
+    street = fields.CharField()
+    city = fields.CharField(default = "Utrecht")
+    location = related.OneOf(CompactLocation)
+    previous = related.ListOf(CompactLocation)
+
+    class Meta:
+        compact = True
+
+
+class CompactModelTest(TestCase):
+
+    def create_address(self):
+        address = CompactAddress(street = u"Oudegracht")
+        address.location = CompactLocation(lat = 52.09, lng = 5.12)
+        address.previous = [CompactLocation(lat = 1.0, lng = 2.0)]
+        return address
+
+    def test_no_instance_dict(self):
+        address = self.create_address()
+        self.assertFalse(hasattr(address, '__dict__'))
+        self.assertFalse(hasattr(address.location, '__dict__'))
+        self.assertEqual(address.city, u"Utrecht")
+        self.assertTrue(getattr(address, '_errors', None) is None)
+        self.assertRaises(AttributeError, setattr, address, 'unknown', 1)
+
+    def test_serializers(self):
+        address = self.create_address()
+        json = JsonSerializer().serialize(address)
+        self.assertEqual(JsonSerializer().serialize(JsonUnSerializer().unserialize(json)), json)
+        self.assertEqual(JsonSerializer().serialize(JsonUnSerializer().unserialize(json, lazy = True)), json)
+        xml = XMLSerializer().serialize(address)
+        self.assertEqual(XMLSerializer().serialize(XMLUnserializer().unserialize(xml, CompactAddress)), xml)
+        unser_address = BinaryUnserializer().unserialize(BinarySerializer().serialize(address))
+        self.assertEqual(JsonSerializer().serialize(unser_address), json)
+
+    def test_pickle_and_copy(self):
+        address = self.create_address()
+        json = JsonSerializer().serialize(address)
+        self.assertEqual(JsonSerializer().serialize(pickle.loads(pickle.dumps(address, 2))), json)
+        self.assertEqual(JsonSerializer().serialize(copy.deepcopy(address)), json)
+
+    def test_only_compact_superclasses(self):
+        def create_dynamic():
+            class CompactDynamic(DynamicModel):
+                name = fields.CharField()
+                class Meta:
+                    compact = True
+        self.assertRaises(TypeError, create_dynamic)
+
+        class NotCompact(Model):
+            name = fields.CharField()
+        def create_sub():
+            class CompactSub(NotCompact):
+                class Meta:
+                    compact = True
+        self.assertRaises(TypeError, create_sub)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import time
+
+from django_documents.backends import NotFoundException, backendCache
+from django_documents.cache import DocumentCache, get_cache_key
+from django_documents.documents import Model
+from django_documents.managers import Manager
+from django_documents.utils import uuid
+from django_documents import fields, related
+
+
+class Room(Model):
+    name = fields.CharField()
+
+
+class Hotel(Model):
+    id = fields.CharField()
+    name = fields.CharField()
+    rooms = related.ListOf(Room, blank = True, null = True)
+
+    objects = Manager(cache = DocumentCache(max_size = 1000))
+
+    class Meta:
+        is_root = True
+        key_space_name = 'travel'
+        column_family_name = 'hotels_cached'
+
+
+class Animal(Model):
+    id = fields.CharField()
+    name = fields.CharField()
+
+    objects = Manager(cache = DocumentCache())
+
+    class Meta:
+        is_root = True
+        key_space_name = 'zoo'
+        column_family_name = 'animals_cached'
+
+
+class Dog(Animal):
+    pass
+
+
+class DocumentCacheTest(TestCase):
+
+    def setUp(self):
+        self.cache = Hotel.objects.cache
+        self.cache.clear()
+        self.cache.hits = self.cache.misses = self.cache.evictions = 0
+
+    def test_read_through(self):
+        hotel = Hotel(id = uuid(), name = u"Krasnapolsky", rooms = [Room(name = u"101")])
+        hotel.save()
+        first = Hotel.objects.get(hotel.id)
+        second = Hotel.objects.get(hotel.id)
+        self.assertEqual(second.name, u"Krasnapolsky")
+        self.assertEqual(second.rooms[0].name, u"101")
+        # copy on read
+        self.assertFalse(first is second)
+        second.rooms[0].name = u"102"
+        self.assertEqual(Hotel.objects.get(hotel.id).rooms[0].name, u"101")
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['count']), (2, 1, 1))
+        # props are read from the backend
+        self.assertTrue(Hotel.objects.get(hotel.id, ['name']).rooms is None)
+        self.assertEqual(self.cache.get_stats()['hits'], 2)
+
+    def test_invalidation(self):
+        hotel = Hotel(id = uuid(), name = u"Krasnapolsky")
+        hotel.save()
+        Hotel.objects.get(hotel.id)
+        hotel.name = u"Amstel"
+        hotel.save()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(Hotel.objects.get(hotel.id).name, u"Amstel")
+        hotel.delete()
+        self.assertRaises(NotFoundException, Hotel.objects.get, hotel.id)
+
+    def test_subclass_invalidation(self):
+        dog = Dog(id = uuid(), name = u"Rex")
+        Animal.objects.save(dog)
+        self.assertEqual(Animal.objects.get(dog.id).name, u"Rex")
+        dog.name = u"Max"
+        Animal.objects.save(dog)
+        self.assertEqual(Animal.objects.get(dog.id).name, u"Max")
+        Animal.objects.delete(dog.id)
+        self.assertRaises(NotFoundException, Animal.objects.get, dog.id)
+
+    def test_unrelated_writes(self):
+        key = get_cache_key('travel', 'hotels_cached', 'x')
+        generation = self.cache.get_generation(key)
+        Animal.objects.save(Animal(id = uuid(), name = u"Rex"))
+        self.cache.put(key, Hotel(id = 'x'), 10, generation)
+        self.assertEqual(self.cache.get(key).id, 'x')
+
+    def test_stale_put(self):
+        key = get_cache_key('travel', 'hotels_cached', 'x')
+        generation = self.cache.get_generation(key)
+        self.cache.invalidate(key)
+        self.cache.put(key, Hotel(id = 'x'), 10, generation)
+        self.assertTrue(self.cache.get(key) is None)
+
+    def test_eviction(self):
+        cache = DocumentCache(max_size = 100, copy_on_read = False)
+        hotels = [Hotel(id = str(i)) for i in range(4)]
+        for hotel in hotels[:3]:
+            cache.put(hotel.id, hotel, 30)
+        self.assertTrue(cache.get('0') is hotels[0])
+        cache.put('3', hotels[3], 30)
+        self.assertTrue(cache.get('1') is None)
+        self.assertEqual([cache.get(id) is not None for id in ('0', '2', '3')], [True, True, True])
+        cache.put('big', Hotel(id = 'big'), 101)
+        self.assertTrue(cache.get('big') is None)
+        self.assertEqual(cache.get_stats(), {'hits': 4, 'misses': 2, 'evictions': 1, 'count': 3, 'size': 90})
+
+    def test_ttl(self):
+        cache = DocumentCache(ttl = 0.05)
+        cache.put('a', Hotel(id = 'a'), 10)
+        self.assertEqual(cache.get('a').id, 'a')
+        time.sleep(0.1)
+        self.assertTrue(cache.get('a') is None)
+        self.assertEqual(len(cache), 0)
+
+    def tearDown(self):
+        backendCache.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import os
+import threading
+import time
+
+from django_documents.ids import IdGenerator, get_id_time, encode_id, decode_id, ID_LENGTH
+from django_documents.utils import uuid
+
+
+class IdGeneratorTest(TestCase):
+
+    def test_ids_are_increasing(self):
+        generator = IdGenerator()
+        ids = [generator.generate() for _ in range(1000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 1000)
+        self.assertEqual(set(len(id) for id in ids), set([ID_LENGTH]))
+        self.assertTrue(abs(get_id_time(ids[0]) - time.time() * 1000) < 10000)
+
+    def test_encoding(self):
+        value = (1 << 127) + 12345
+        self.assertEqual(decode_id(encode_id(value)), value)
+        self.assertEqual(decode_id(encode_id(value).lower()), value)
+
+    def test_allocate(self):
+        generator = IdGenerator()
+        first = generator.generate()
+        block = generator.allocate(500)
+        self.assertEqual(len(set(block)), 500)
+        self.assertEqual(block, sorted(block))
+        self.assertTrue(first < block[0] < generator.generate())
+
+    def test_threads(self):
+        generator = IdGenerator()
+        results = []
+        def generate():
+            results.extend(generator.allocate(1) + [generator.generate() for _ in range(500)])
+        threads = [threading.Thread(target = generate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 2004)
+
+    def test_fork(self):
+        generator = IdGenerator()
+        parent_id = generator.generate()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            os.write(write_fd, generator.generate())
+            os._exit(0)
+        os.close(write_fd)
+        child_id = os.read(read_fd, 100)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        node = lambda id: (decode_id(id) >> 48) & 0xffffffff
+        self.assertNotEqual(node(child_id), node(parent_id))
+
+    def test_uuid(self):
+        self.assertTrue(uuid() < uuid())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import pickle
+
+from django_documents.documents import Model, ObjectValidationError
+from django_documents import fields, related
+
+
+cleaned = []
+
+
+class Paragraph(Model):
+    text = fields.CharField(max_length = 10)
+
+    def clean(self):
+        cleaned.append(self)
+
+
+class Chapter(Model):
+    title = fields.CharField()
+    paragraphs = related.ListOf(Paragraph)
+    summary = related.OneOf(Paragraph, blank = True, null = True)
+
+
+class IncrementalValidationTest(TestCase):
+
+    def create_chapter(self):
+        chapter = Chapter(title = u"chapter")
+        chapter.paragraphs = [Paragraph(text = u"p%s" % i) for i in range(100)]
+        chapter.summary = Paragraph(text = u"summary")
+        chapter.full_clean(incremental = True)
+        del cleaned[:]
+        return chapter
+
+    def test_unchanged_document_is_not_validated(self):
+        chapter = self.create_chapter()
+        chapter.full_clean(incremental = True)
+        self.assertEqual(cleaned, [])
+        chapter.full_clean()
+        self.assertEqual(len(cleaned), 101)
+
+    def test_only_changed_items_are_validated(self):
+        chapter = self.create_chapter()
+        chapter.paragraphs[10].text = u"changed"
+        chapter.summary.text = u"changed"
+        chapter.full_clean(incremental = True)
+        self.assertEqual(cleaned, [chapter.paragraphs[10], chapter.summary])
+
+        del cleaned[:]
+        chapter.paragraphs.append(Paragraph(text = u"new"))
+        chapter.full_clean(incremental = True)
+        self.assertEqual(cleaned, [chapter.paragraphs[-1]])
+
+    def test_errors_are_found(self):
+        chapter = self.create_chapter()
+        chapter.paragraphs[5].text = u"much too long"
+        self.assertRaises(ObjectValidationError, chapter.full_clean, incremental = True)
+        self.assertRaises(ObjectValidationError, chapter.full_clean, incremental = True)
+        chapter.paragraphs[5].text = u"short"
+        chapter.full_clean(incremental = True)
+
+    def test_no_snapshot_without_incremental(self):
+        chapter = Chapter(title = u"chapter", paragraphs = [Paragraph(text = u"p")])
+        chapter.full_clean()
+        self.assertTrue(chapter._state.validated is None)
+        self.assertTrue(chapter.paragraphs[0]._state.validated is None)
+        chapter.full_clean(incremental = True)
+        self.assertFalse(chapter._state.validated is None)
+
+    def test_snapshot_is_not_pickled(self):
+        chapter = pickle.loads(pickle.dumps(self.create_chapter()))
+        chapter.full_clean(incremental = True)
+        self.assertEqual(len(cleaned), 101)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import prepare_settings
+
+from unittest import TestCase, main
+
+from django_documents.documents import Model, DynamicModel, get_init_plan
+from django_documents import fields, related
+
+
+counter = []
+
+def next_number():
+    counter.append(1)
+    return len(counter)
+
+
+class InitItem(Model):
+    name = fields.CharField(default = "unknown")
+
+
+class InitDocument(Model):
+    title = fields.CharField()
+    number = fields.IntegerField(default = next_number)
+    item = related.OneOf(InitItem)
+    items = related.ListOf(InitItem)
+
+
+class DynamicInitDocument(DynamicModel):
+    title = fields.CharField(default = "dynamic")
+
+
+class InitPlanTest(TestCase):
+
+    def test_defaults(self):
+        item = InitItem()
+        self.assertEqual(item.name, u"unknown")
+        self.assertTrue(item.key is None)
+        doc = InitDocument()
+        self.assertTrue(doc.title is None)
+        self.assertTrue(doc.item is None)
+        self.assertTrue(doc.items is None)
+
+    def test_callable_default_only_when_not_given(self):
+        del counter[:]
+        InitDocument(number = 10)
+        self.assertEqual(counter, [])
+        self.assertEqual(InitDocument().number, 1)
+        self.assertEqual(InitDocument().number, 2)
+
+    def test_args_and_kwargs(self):
+        doc = InitDocument(u"title", 5, items = [InitItem()])
+        self.assertEqual(doc.title, u"title")
+        self.assertEqual(doc.number, 5)
+        self.assertEqual(len(doc.items), 1)
+        self.assertRaises(TypeError, InitDocument, unknown = 1)
+        self.assertRaises(IndexError, InitDocument, 1, 2, 3, 4, 5)
+        self.assertRaises(ValueError, InitDocument, item = "no item")
+
+    def test_from_values(self):
+        item = InitItem(name = u"item")
+        doc = InitDocument._from_values({'title': u"title", 'item': item})
+        self.assertEqual(doc.title, u"title")
+        self.assertTrue(doc.item is item)
+        self.assertTrue(doc.items is None)
+        self.assertEqual(InitItem._from_values().name, u"unknown")
+
+    def test_from_values_own_init(self):
+        doc = DynamicInitDocument._from_values()
+        self.assertEqual(doc.title, u"dynamic")
+        self.assertEqual(doc._get_dynamic_attributes(), {})
+
+    def test_plan_is_cached(self):
+        self.assertTrue(get_init_plan(InitDocument) is get_init_plan(InitDocument))
+
+
+if __name__ == '__main__':
+    main()
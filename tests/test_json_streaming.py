@@ -0,0 +1,77 @@
+import prepare_settings
+
+from unittest import TestCase, main
+from StringIO import StringIO
+from datetime import date, datetime
+import simplejson as json
+
+from django_documents.serializer import JsonSerializer, JsonUnSerializer
+from model_definitions_for_test import ModelWithAllBaseFields, ModelWithListModelWithAllBaseFields, ModelWithMapModelWithAllBaseFields, ModelWithListOffStringType
+
+
+class JsonStreamingTest(TestCase):
+
+    def create_list_model(self, count):
+        model = ModelWithListModelWithAllBaseFields(name="list")
+        model.listOf = [ModelWithAllBaseFields(char="c%s" % i, integer=i, float=i / 2.0, date=date(2012, 1, 1))
+                        for i in range(count)]
+        return model
+
+    def test_streaming_equals_default(self):
+        model = self.create_list_model(10)
+        default_json = JsonSerializer().serialize(model)
+        streamed_json = JsonSerializer().serialize(model, streaming=True)
+        self.assertEqual(json.loads(default_json), json.loads(streamed_json))
+
+    def test_streaming_to_stream(self):
+        model = ModelWithMapModelWithAllBaseFields(name="map")
+        model.mapOf = {"a": ModelWithAllBaseFields(char="a", integer=1)}
+        stream = StringIO()
+        JsonSerializer().serialize(model, streaming=True, stream=stream)
+        self.assertEqual(json.loads(stream.getvalue()), json.loads(JsonSerializer().serialize(model)))
+
+    def test_streaming_map_keys(self):
+        model = ModelWithMapModelWithAllBaseFields(name="map")
+        model.mapOf = {1: ModelWithAllBaseFields(char="a", integer=1), 2.5: ModelWithAllBaseFields(char="b"),
+                       "c": ModelWithAllBaseFields(char="c")}
+        default_json = JsonSerializer().serialize(model)
+        streamed_json = JsonSerializer().serialize(model, streaming=True)
+        self.assertEqual(json.loads(streamed_json), json.loads(default_json))
+        self.assertEqual(sorted(json.loads(streamed_json)['mapOf'].keys()), ["1", "2.5", "c"])
+
+    def test_streaming_rejects_sort_keys_and_indent(self):
+        model = self.create_list_model(2)
+        self.assertRaises(ValueError, JsonSerializer().serialize, model, streaming=True, sort_keys=True)
+        self.assertRaises(ValueError, JsonSerializer().serialize, model, streaming=True, indent=2)
+        self.assertRaises(ValueError, JsonSerializer().iter_serialize, model, indent=2)
+        self.assertEqual(json.loads(JsonSerializer().serialize(model, streaming=True, sort_keys=False)),
+                         json.loads(JsonSerializer().serialize(model, sort_keys=True)))
+
+    def test_streaming_root_name_and_list(self):
+        models = [ModelWithListOffStringType(name="a", listOfString=["x", "y"]), ModelWithListOffStringType(name="b")]
+        default_json = JsonSerializer().serialize(models, root_name="items")
+        streamed_json = JsonSerializer().serialize(models, root_name="items", streaming=True)
+        self.assertEqual(json.loads(default_json), json.loads(streamed_json))
+
+    def test_iter_serialize_chunks(self):
+        model = self.create_list_model(200)
+        chunks = list(JsonSerializer().iter_serialize(model, chunk_size=1024))
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks[:-1]:
+            self.assertTrue(len(chunk) >= 1024)
+        unser_model = JsonUnSerializer().unserialize("".join(chunks), ModelWithListModelWithAllBaseFields)
+        self.assertEqual(len(unser_model.listOf), 200)
+        self.assertEqual(unser_model.listOf[199].char, "c199")
+
+    def test_streaming_datetime(self):
+        from django_documents import documents, fields
+
+        class StreamedHistoricData(documents.Model):
+            annoDate = fields.DateTimeField()
+
+        model = StreamedHistoricData(annoDate=datetime(2013, 5, 22, 10, 30))
+        self.assertEqual(json.loads(JsonSerializer().serialize(model, streaming=True))['annoDate'], "2013-05-22 10:30:00")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import prepare_settings
+
+from unittest import TestCase, main
+from datetime import date
+import copy
+import pickle
+
+from django_documents.serializer import JsonSerializer, JsonUnSerializer, XMLSerializer, XMLUnserializer
+from django_documents.related import LazyRelatedValue
+from django_documents.validation import validate_many
+from model_definitions_for_test import ModelWithAllBaseFields, ModelWithListModelWithAllBaseFields, ModelWithOneOffField
+
+
+def cached_value(instance, field_name):
+    field = instance._meta.get_field(field_name)
+    return instance.__dict__[field.get_cache_name()]
+
+
+class LazyUnserializeTest(TestCase):
+
+    def create_one_of_model(self):
+        model = ModelWithOneOffField(name="test")
+        model.oneOf = ModelWithAllBaseFields(char="ab", integer=8, float=12.3, date=date(1968, 9, 17))
+        return model
+
+    def create_list_model(self):
+        model = ModelWithListModelWithAllBaseFields(name="list")
+        model.listOf = [ModelWithAllBaseFields(char="c%s" % i, integer=i, float=1.5, date=date(2012, 1, 1))
+                        for i in range(3)]
+        return model
+
+    def test_json_one_of_is_lazy(self):
+        json = JsonSerializer().serialize(self.create_one_of_model())
+        model = JsonUnSerializer().unserialize(json, lazy=True)
+        self.assertTrue(isinstance(cached_value(model, "oneOf"), LazyRelatedValue))
+        self.assertEqual(model.oneOf.integer, 8)
+        self.assertEqual(model.oneOf.date, date(1968, 9, 17))
+        self.assertFalse(isinstance(cached_value(model, "oneOf"), LazyRelatedValue))
+
+    def test_json_list_equals_eager(self):
+        json = JsonSerializer().serialize(self.create_list_model())
+        lazy_model = JsonUnSerializer().unserialize(json, lazy=True)
+        eager_model = JsonUnSerializer().unserialize(json)
+        self.assertTrue(isinstance(cached_value(lazy_model, "listOf"), LazyRelatedValue))
+        self.assertEqual([item.char for item in lazy_model.listOf], [item.char for item in eager_model.listOf])
+
+    def test_xml_one_of_is_lazy(self):
+        xml = XMLSerializer().serialize(self.create_one_of_model())
+        model = XMLUnserializer().unserialize(xml, ModelWithOneOffField, lazy=True)
+        self.assertTrue(isinstance(cached_value(model, "oneOf"), LazyRelatedValue))
+        self.assertEqual(model.oneOf.integer, 8)
+
+    def test_xml_list_equals_eager(self):
+        xml = XMLSerializer().serialize(self.create_list_model())
+        lazy_model = XMLUnserializer().unserialize(xml, ModelWithListModelWithAllBaseFields, lazy=True)
+        eager_model = XMLUnserializer().unserialize(xml, ModelWithListModelWithAllBaseFields)
+        self.assertEqual([item.integer for item in lazy_model.listOf], [item.integer for item in eager_model.listOf])
+
+    def test_pickle_resolves_lazy(self):
+        json = JsonSerializer().serialize(self.create_list_model())
+        model = JsonUnSerializer().unserialize(json, lazy=True)
+        for copied in (pickle.loads(pickle.dumps(model, pickle.HIGHEST_PROTOCOL)), copy.deepcopy(model)):
+            self.assertFalse(isinstance(cached_value(copied, "listOf"), LazyRelatedValue))
+            self.assertEqual([item.char for item in copied.listOf], ["c0", "c1", "c2"])
+        xml = XMLSerializer().serialize(self.create_one_of_model())
+        model = XMLUnserializer().unserialize(xml, ModelWithOneOffField, lazy=True)
+        self.assertEqual(pickle.loads(pickle.dumps(model)).oneOf.integer, 8)
+
+    def test_validate_many_workers(self):
+        json = JsonSerializer().serialize(self.create_list_model())
+        models = [JsonUnSerializer().unserialize(json, lazy=True) for i in range(4)]
+        report = validate_many(models, workers = 2, chunksize = 1)
+        self.assertTrue(report.is_valid())
+        self.assertEqual(report.count, 4)
+
+    def test_reserialize_resolves_lazy(self):
+        json = JsonSerializer().serialize(self.create_one_of_model())
+        model = JsonUnSerializer().unserialize(json, lazy=True)
+        self.assertEqual(JsonSerializer().serialize(model), json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import prepare_settings
+
+from unittest import TestCase, main
+
+from django_documents.backends import backendCache
+from django_documents.documents import Model
+from django_documents.managers import Manager
+from django_documents.utils import uuid
+from django_documents import fields, managers
+
+
+class Hotel(Model):
+    id = fields.CharField()
+    name = fields.CharField()
+    city = fields.CharField(blank = True, null = True)
+
+    objects = Manager()
+
+    class Meta:
+        is_root = True
+        key_space_name = 'travel'
+        column_family_name = 'hotels_get_many'
+
+
+class Motel(Hotel):
+
+    class Meta:
+        is_root = True
+        key_space_name = 'travel'
+        column_family_name = 'hotels_get_many'
+
+
+class GetManyTest(TestCase):
+
+    def setUp(self):
+        self.hotels = [Hotel(id = uuid(), name = u"Hotel %s" % i, city = u"Zeist") for i in range(5)]
+        self.hotels.append(Motel(id = uuid(), name = u"Motel", city = u"Utrecht"))
+        for hotel in self.hotels:
+            hotel.save()
+
+    def test_get_many(self):
+        ids = [hotel.id for hotel in reversed(self.hotels)]
+        missing_id = uuid()
+        ids.insert(2, missing_id)
+        documents = Hotel.objects.get_many(ids)
+        self.assertEqual(documents.keys(), ids)
+        self.assertTrue(documents[missing_id] is None)
+        self.assertEqual([id for id, document in documents.items() if document is None], [missing_id])
+        self.assertTrue(isinstance(documents[self.hotels[-1].id], Motel))
+        for hotel in self.hotels:
+            self.assertEqual(documents[hotel.id].name, hotel.name)
+            self.assertEqual(documents[hotel.id].city, hotel.city)
+
+    def test_props(self):
+        props = ['name']
+        documents = Hotel.objects.get_many([hotel.id for hotel in self.hotels], props)
+        self.assertEqual(props, ['name'])
+        for hotel in self.hotels:
+            self.assertEqual(documents[hotel.id].name, hotel.name)
+            self.assertEqual(documents[hotel.id].id, hotel.id)
+            self.assertTrue(documents[hotel.id].city is None)
+
+    def test_batches(self):
+        resolved = []
+        get_class = managers.get_class
+        def counting_get_class(clazz_name):
+            resolved.append(clazz_name)
+            return get_class(clazz_name)
+        batch_size = managers.GET_MANY_BATCH_SIZE
+        managers.GET_MANY_BATCH_SIZE = 2
+        managers.get_class = counting_get_class
+        try:
+            documents = Hotel.objects.get_many([hotel.id for hotel in self.hotels])
+        finally:
+            managers.GET_MANY_BATCH_SIZE = batch_size
+            managers.get_class = get_class
+        self.assertEqual([document.id for document in documents.values()], [hotel.id for hotel in self.hotels])
+        self.assertEqual(sorted(resolved), sorted(set(resolved)))
+        self.assertEqual(len(resolved), 2)
+        self.assertEqual(len(Hotel.objects.get_many([])), 0)
+
+    def tearDown(self):
+        backendCache.close_all()
+
+
+if __name__ == '__main__':
+    main()
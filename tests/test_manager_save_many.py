@@ -0,0 +1,79 @@
+import prepare_settings
+
+from unittest import TestCase, main
+
+from django_documents.backends import NotFoundException, backendCache
+from django_documents.documents import Model, ObjectValidationError
+from django_documents.managers import Manager
+from django_documents.utils import uuid
+from django_documents import fields, signals
+
+
+class Hotel(Model):
+    id = fields.CharField()
+    name = fields.CharField(max_length = 20)
+    stars = fields.IntegerField(blank = True, null = True)
+
+    objects = Manager()
+
+    class Meta:
+        is_root = True
+        key_space_name = 'travel'
+        column_family_name = 'hotels_save_many'
+
+
+class SaveManyTest(TestCase):
+
+    def setUp(self):
+        self.batches = []
+        self.saved = []
+        signals.data_post_save_many.connect(self.on_save_many)
+        signals.data_post_save.connect(self.on_save)
+
+    def on_save_many(self, sender, instances, **kwargs):
+        self.batches.append([instance.id for instance in instances])
+
+    def on_save(self, sender, instance, **kwargs):
+        self.saved.append(instance.id)
+
+    def test_save_many(self):
+        hotels = [Hotel(id = uuid(), name = u"Hotel %s" % i, stars = str(i % 5)) for i in range(7)]
+        Hotel.objects.save_many(hotels, batch_size = 3)
+        ids = [hotel.id for hotel in hotels]
+        self.assertEqual(self.batches, [ids[:3], ids[3:6], ids[6:]])
+        self.assertEqual(self.saved, ids)
+        # cleaned by full_clean
+        self.assertEqual(hotels[2].stars, 2)
+        documents = Hotel.objects.get_many(ids)
+        self.assertEqual([document.name for document in documents.values()], [hotel.name for hotel in hotels])
+
+    def test_invalid(self):
+        hotels = [Hotel(id = uuid(), name = u"Hotel"), Hotel(id = uuid(), name = u"x" * 30),
+                  Hotel(id = uuid(), name = u"Hotel", stars = "many")]
+        try:
+            Hotel.objects.save_many(hotels)
+            self.fail("expected an ObjectValidationError")
+        except ObjectValidationError, e:
+            self.assertEqual(sorted(e.message_dict.keys()), [1, 2])
+            self.assertTrue('name' in e.message_dict[1])
+            self.assertTrue('stars' in e.message_dict[2])
+        self.assertRaises(NotFoundException, Hotel.objects.get, hotels[0].id)
+        self.assertEqual(self.batches, [])
+        self.assertEqual(self.saved, [])
+
+    def test_workers(self):
+        hotels = [Hotel(id = uuid(), name = u"Hotel %s" % i) for i in range(20)]
+        Hotel.objects.save_many(hotels, workers = 2, chunksize = 4)
+        documents = Hotel.objects.get_many([hotel.id for hotel in hotels])
+        self.assertEqual([document.name for document in documents.values()], [hotel.name for hotel in hotels])
+        Hotel.objects.save_many([])
+        self.assertEqual(len(self.batches), 1)
+
+    def tearDown(self):
+        signals.data_post_save_many.disconnect(self.on_save_many)
+        signals.data_post_save.disconnect(self.on_save)
+        backendCache.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,9 @@ from unittest import TestCase, main
 from django_documents.documents import Model
 from django_documents import fields
 from django_documents import related
-from django_documents.register import get_model
+from django_documents.register import get_model, modelCache, is_polymorphic, resolve_discriminator
 from django_documents.utils import get_class
+from django_documents.fields import FieldDoesNotExist
 
 class Restaurant(Model):
     name = fields.CharField(max_length = 20, blank = False, null= False, verbose_name = {"nl": "Naam","de":"Name","en": "Name"})
@@ -80,6 +81,61 @@ class TestRunTimeCreationClass(TestCase):
         
         instance = dynClass2()
         instance.test = "Hello"
+
+class Location(Model):
+    lat = fields.FloatField(xml_element_name = 'latitude')
+    lng = fields.FloatField(xml_element_name = 'longitude')
+
+
+class FieldLookupTestCase(TestCase):
+
+    def test_get_field(self):
+        self.assertTrue(Location._meta.get_field('lat') is Location._meta.fields[0])
+        self.assertRaises(FieldDoesNotExist, Location._meta.get_field, 'latitude')
+
+    def test_get_field_or_none(self):
+        self.assertTrue(Location._meta.get_field_or_none('lng') is Location._meta.fields[1])
+        self.assertTrue(Location._meta.get_field_or_none('unknown') is None)
+
+    def test_get_field_by_xml_element_name(self):
+        self.assertTrue(Location._meta.get_field_by_xml_element_name('latitude') is Location._meta.fields[0])
+        self.assertRaises(FieldDoesNotExist, Location._meta.get_field_by_xml_element_name, 'lat')
+
+    def test_index_invalidated_on_add_field(self):
+        dynClass = type("IndexedDynamicType", (Model,), {'__module__' : "test" , 'text': fields.CharField()})
+        self.assertTrue(dynClass._meta.get_field_or_none('added') is None)
+        dynClass.add_to_class('added', fields.CharField())
+        self.assertEqual(dynClass._meta.get_field('added').name, 'added')
+        self.assertEqual(dynClass._meta.get_field_by_attname('added').name, 'added')
+
+
+class Shape(Model):
+    name = fields.CharField()
+
+class Polygon(Shape):
+    corners = fields.IntegerField()
+
+class Square(Polygon):
+    pass
+
+
+class SubclassIndexTestCase(TestCase):
+
+    def test_transitive_subclasses(self):
+        subclasses = modelCache.get_subclasses(Shape)
+        self.assertTrue(subclasses['test_meta_data.Polygon'] is Polygon)
+        self.assertTrue(subclasses['test_meta_data.Square'] is Square)
+        self.assertEqual(modelCache.get_subclasses(Square).keys(), [])
+
+    def test_is_polymorphic(self):
+        self.assertTrue(is_polymorphic(Shape))
+        self.assertFalse(is_polymorphic(Square))
+        self.assertTrue(is_polymorphic(dict))
+
+    def test_resolve_discriminator(self):
+        self.assertTrue(resolve_discriminator(Shape, 'test_meta_data.Square') is Square)
+        self.assertTrue(resolve_discriminator(Polygon, 'test_meta_data.Polygon') is Polygon)
+
             
 if __name__ == '__main__':
     main()  
\ No newline at end of file
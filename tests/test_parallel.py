@@ -0,0 +1,42 @@
+import prepare_settings
+
+from unittest import TestCase, main
+
+from django_documents import parallel
+from django_documents.parallel import imap_ordered, get_chunksize
+
+
+def square(value):
+    return value * value
+
+
+class ImapOrderedTest(TestCase):
+
+    def test_order(self):
+        self.assertEqual(list(imap_ordered(square, range(100), workers = 2)), [i * i for i in range(100)])
+        self.assertEqual(list(imap_ordered(square, iter(range(10)), workers = 2, chunksize = 3)),
+                         [i * i for i in range(10)])
+        self.assertEqual(list(imap_ordered(square, [], workers = 2)), [])
+
+    def test_chunksize(self):
+        self.assertEqual(get_chunksize(2, 100), 12)
+        self.assertEqual(get_chunksize(2, 3), 1)
+        self.assertEqual(get_chunksize(2, 100000), parallel.DEFAULT_CHUNKSIZE)
+        self.assertEqual(get_chunksize(2), parallel.DEFAULT_CHUNKSIZE)
+
+    def test_bounded_input(self):
+        taken = []
+        def items():
+            for i in xrange(10000):
+                taken.append(i)
+                yield i
+        results = imap_ordered(square, items(), workers = 2, chunksize = 10)
+        self.assertEqual(results.next(), 0)
+        # only the pending chunks are taken from the items
+        self.assertTrue(len(taken) <= 10 * 2 * parallel.PENDING_CHUNKS_PER_WORKER + 10)
+        self.assertEqual(sum(1 for _ in results), 9999)
+        self.assertEqual(len(taken), 10000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import prepare_settings
+
+from unittest import TestCase, main
+from datetime import date
+import types
+
+from django_documents.serializer import PythonSerializer, PythonSerializerVisitor
+from django_documents.plans import get_serialization_plan
+from django_documents import documents, fields, related
+from model_definitions_for_test import ModelWithAllBaseFields
+
+
+class PlanItem(documents.Model):
+    name = fields.CharField()
+
+
+class PlanSubItem(PlanItem):
+    extra = fields.IntegerField()
+
+
+class PlanDocument(documents.Model):
+    title = fields.CharField()
+    created = fields.DateField()
+    flag = fields.BooleanField()
+    base = related.OneOf(ModelWithAllBaseFields)
+    data = related.OneOf(types.DictType)
+    items = related.ListOf(PlanItem)
+    tags = related.ListOf(types.StringType)
+    named = related.MapOf(PlanItem)
+    labels = related.MapOf(types.StringType)
+
+
+def visit_dict(instance):
+    visitor = PythonSerializerVisitor()
+    instance.visit(visitor)
+    return visitor.get_dict()
+
+
+class SerializationPlanTest(TestCase):
+
+    def create_document(self):
+        doc = PlanDocument(title=u"test", created=date(2012, 1, 2))
+        doc.base = ModelWithAllBaseFields(char="a", integer=1, float=2.5, date=date(1968, 9, 17))
+        doc.data = {"lat": 0.8, "names": ["a", "b"]}
+        doc.items = [PlanItem(name="one"), PlanSubItem(name="two", extra=2)]
+        doc.tags = ["x", "y"]
+        doc.named = {"first": PlanItem(name="first")}
+        doc.labels = {"nl": "Nederlands"}
+        return doc
+
+    def test_plan_equals_visitor(self):
+        doc = self.create_document()
+        self.assertEqual(PythonSerializer().serialize(doc), visit_dict(doc))
+
+    def test_plan_equals_visitor_empty(self):
+        doc = PlanDocument()
+        self.assertEqual(PythonSerializer().serialize(doc), visit_dict(doc))
+
+    def test_subclass_item_uses_own_plan(self):
+        doc = self.create_document()
+        adict = PythonSerializer().serialize(doc)
+        self.assertEqual(adict['items'][1]['extra'], 2)
+        self.assertEqual(adict['items'][1]['_clazz'], 'test_serialization_plan.PlanSubItem')
+
+    def test_plan_is_cached(self):
+        self.assertTrue(get_serialization_plan(PlanDocument) is get_serialization_plan(PlanDocument))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import prepare_settings
+
+from unittest import TestCase, main
+from StringIO import StringIO
+import simplejson as json
+
+from django_documents.serializer import serialize_many, iter_serialize_many, JsonSerializer, XMLSerializer
+from model_definitions_for_test import ModelWithAllBaseFields
+
+
+class SerializeManyTest(TestCase):
+
+    def create_models(self, count):
+        return [ModelWithAllBaseFields(char="c%s" % i, integer=i) for i in range(count)]
+
+    def test_serialize_many_in_process(self):
+        models = self.create_models(5)
+        results = serialize_many(models, format='json')
+        self.assertEqual(results, [JsonSerializer().serialize(model) for model in models])
+
+    def test_serialize_many_workers_keeps_order(self):
+        models = self.create_models(100)
+        results = serialize_many(models, format='json', workers=2, chunksize=7)
+        self.assertEqual([json.loads(result)['integer'] for result in results], range(100))
+
+    def test_serialize_many_python_workers(self):
+        models = self.create_models(10)
+        results = serialize_many(models, format='python', workers=2)
+        self.assertEqual([result['char'] for result in results], ["c%s" % i for i in range(10)])
+
+    def test_iter_serialize_many_xml(self):
+        models = self.create_models(3)
+        results = list(iter_serialize_many(models, format='xml', workers=2))
+        self.assertEqual(results, [XMLSerializer().serialize(model) for model in models])
+
+    def test_serialize_many_to_stream(self):
+        models = self.create_models(20)
+        stream = StringIO()
+        serialize_many(models, format='json', workers=2, stream=stream)
+        self.assertEqual([item['integer'] for item in json.loads(stream.getvalue())], range(20))
+
+    def test_serialize_many_xml_not_to_stream(self):
+        models = self.create_models(2)
+        self.assertRaises(AssertionError, serialize_many, models, format='xml', stream=StringIO())
+        self.assertRaises(AssertionError, serialize_many, models, format='python', stream=StringIO())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import sys
+import threading
+import time
+import traceback
+
+from django_documents.backends import NotFoundException, backendCache
+from django_documents.documents import Model
+from django_documents.managers import Manager
+from django_documents.singleflight import SingleFlight
+from django_documents.utils import uuid
+from django_documents import fields
+
+
+class Hotel(Model):
+    id = fields.CharField()
+    name = fields.CharField()
+
+    objects = Manager(single_flight = True, negative_ttl = 60)
+
+    class Meta:
+        is_root = True
+        key_space_name = 'travel'
+        column_family_name = 'hotels_single_flight'
+
+
+class SlowColumnFamily(object):
+    """
+    Counts the gets of the column family, which take a while
+    """
+
+    def __init__(self, column_family):
+        self.column_family = column_family
+        self.gets = 0
+
+    def get(self, key, columns = None):
+        self.gets += 1
+        time.sleep(0.1)
+        return self.column_family.get(key, columns)
+
+    def __getattr__(self, name):
+        return getattr(self.column_family, name)
+
+
+class SingleFlightTest(TestCase):
+
+    def setUp(self):
+        self.column_family = SlowColumnFamily(Hotel.objects._get_column_family())
+        Hotel.objects._column_family = self.column_family
+        Hotel.objects._flights.clear_errors()
+
+    def get_concurrently(self, id, props = None, count = 8):
+        results = [None] * count
+        def get(i):
+            try:
+                results[i] = Hotel.objects.get(id, props and list(props))
+            except Exception, e:
+                results[i] = e
+        threads = [threading.Thread(target = get, args = (i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesce(self):
+        hotel = Hotel(id = uuid(), name = u"Krasnapolsky")
+        hotel.save()
+        results = self.get_concurrently(hotel.id)
+        self.assertEqual(self.column_family.gets, 1)
+        self.assertEqual([result.name for result in results], [u"Krasnapolsky"] * 8)
+        self.assertEqual(len(set(map(id, results))), 8)
+        # other props are another flight
+        self.get_concurrently(hotel.id, ['name'], count = 2)
+        self.assertEqual(self.column_family.gets, 2)
+
+    def test_not_found(self):
+        missing_id = uuid()
+        results = self.get_concurrently(missing_id)
+        self.assertEqual(self.column_family.gets, 1)
+        self.assertTrue(all(isinstance(result, NotFoundException) for result in results))
+        # kept for negative_ttl
+        self.assertRaises(NotFoundException, Hotel.objects.get, missing_id)
+        self.assertEqual(self.column_family.gets, 1)
+        Hotel(id = missing_id, name = u"Amstel").save()
+        self.assertEqual(Hotel.objects.get(missing_id).name, u"Amstel")
+        self.assertEqual(self.column_family.gets, 2)
+
+    def test_error_ttl(self):
+        flight = SingleFlight(error_ttl = 0.05, error_types = (KeyError,))
+        calls = []
+        def fail(exception):
+            calls.append(exception)
+            raise exception
+        self.assertRaises(KeyError, flight.do, 'a', fail, KeyError('a'))
+        self.assertRaises(KeyError, flight.do, 'a', fail, KeyError('a'))
+        self.assertRaises(ValueError, flight.do, 'b', fail, ValueError('b'))
+        self.assertRaises(ValueError, flight.do, 'b', fail, ValueError('b'))
+        self.assertEqual(len(calls), 3)
+        time.sleep(0.1)
+        self.assertEqual(flight.do('a', lambda: 1), (1, True))
+
+    def run_flights(self, flight, func, count = 4):
+        results = [None] * count
+        def do(i):
+            try:
+                result, leader = flight.do('a', func)
+                if leader:
+                    # the leader changes its result straight away
+                    result.extend(range(1000))
+                results[i] = result
+            except Exception:
+                results[i] = sys.exc_info()
+        threads = [threading.Thread(target = do, args = (i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_leader_changes_result(self):
+        def read():
+            time.sleep(0.1)
+            return ['x']
+        results = self.run_flights(SingleFlight(copy_result = list), read)
+        self.assertEqual(sorted(len(result) for result in results), [1, 1, 1, 1001])
+
+    def test_waiters_get_traceback(self):
+        def fail():
+            time.sleep(0.1)
+            raise KeyError('a')
+        results = self.run_flights(SingleFlight(), fail)
+        for exc_type, exception, tb in results:
+            self.assertTrue(exc_type is KeyError)
+            self.assertTrue('fail' in [entry[2] for entry in traceback.extract_tb(tb)])
+
+    def tearDown(self):
+        backendCache.close_all()
+
+
+if __name__ == '__main__':
+    main()
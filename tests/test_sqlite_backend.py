@@ -0,0 +1,142 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import gc
+import shutil
+import tempfile
+import threading
+
+from django_documents.backends import NotFoundException, get_backend, backendCache
+from django_documents.backends.sqlite import SQLiteBackend
+from django_documents.documents import Model
+from django_documents.managers import Manager
+from django_documents.utils import uuid
+from django_documents import fields, related
+
+
+class Room(Model):
+    name = fields.CharField()
+
+
+class Hotel(Model):
+    id = fields.CharField()
+    name = fields.CharField()
+    room = related.OneOf(Room, blank = True, null = True)
+
+    objects = Manager()
+
+    class Meta:
+        is_root = True
+        key_space_name = 'travel'
+        column_family_name = 'hotels'
+
+
+class SQLiteBackendTest(TestCase):
+
+    def check_column_family(self, column_family):
+        column_family.insert('b', {'name': u'B', 'city': u'Utrecht'})
+        column_family.insert('a', {'name': u'A'})
+        column_family.insert('a', {'city': u'Zeist'})
+        self.assertEqual(column_family.get('a'), {'name': u'A', 'city': u'Zeist'})
+        self.assertEqual(column_family.get('b', ['city']), {'city': u'Utrecht'})
+        self.assertRaises(NotFoundException, column_family.get, 'c')
+        self.assertRaises(NotFoundException, column_family.get, 'a', ['unknown'])
+        self.assertEqual(column_family.multiget(['c', 'b', 'a'], ['name']).items(),
+                         [('b', {'name': u'B'}), ('a', {'name': u'A'})])
+        self.assertEqual([key for key, row in column_family.get_range()], ['a', 'b'])
+        self.assertEqual([key for key, row in column_family.get_range(start = 'b')], ['b'])
+        column_family.remove('b', ['city'])
+        self.assertEqual(column_family.get('b'), {'name': u'B'})
+        column_family.remove('b')
+        self.assertRaises(NotFoundException, column_family.get, 'b')
+
+    def test_memory(self):
+        backend = SQLiteBackend('memory')
+        try:
+            self.check_column_family(backend.get_column_family('cf'))
+        finally:
+            backend.close()
+
+    def test_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            backend = SQLiteBackend('files', path = directory)
+            column_family = backend.get_column_family('cf')
+            self.check_column_family(column_family)
+            def insert(thread):
+                for i in range(50):
+                    column_family.insert('%s-%02d' % (thread, i), {'value': u'x'})
+            threads = [threading.Thread(target = insert, args = (thread,)) for thread in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(list(column_family.get_range(start = '0', finish = '9', count = 300))), 200)
+            other_backend = SQLiteBackend('files', path = directory)
+            self.assertEqual(len(list(other_backend.get_column_family('cf').get_range(count = 120))), 120)
+            other_backend.close()
+            backend.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_thread_connections(self):
+        directory = tempfile.mkdtemp()
+        try:
+            backend = SQLiteBackend('threads', path = directory)
+            column_family = backend.get_column_family('cf')
+            def insert(i):
+                column_family.insert('%02d' % i, {'value': u'x'})
+            for i in range(50):
+                thread = threading.Thread(target = insert, args = (i,))
+                thread.start()
+                thread.join()
+            gc.collect()
+            # only the connection of this thread is left
+            self.assertEqual(len(backend._thread_connections), 1)
+            self.assertEqual(len(list(column_family.get_range())), 50)
+            backend.close()
+            self.assertEqual(len(backend._thread_connections), 0)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_manager_after_close_all(self):
+        hotel = Hotel(id = uuid(), name = u"Krasnapolsky")
+        hotel.save()
+        backendCache.close_all()
+        # the in-memory key space is gone with its backend
+        self.assertRaises(NotFoundException, Hotel.objects.get, hotel.id)
+        hotel.save()
+        self.assertEqual(Hotel.objects.get(hotel.id).name, u"Krasnapolsky")
+
+    def test_manager(self):
+        hotel = Hotel(id = uuid(), name = u"Krasnapolsky", room = Room(name = u"101"))
+        hotel.save()
+        self.assertTrue(get_backend('travel') is get_backend('travel'))
+        retrieved = Hotel.objects.get(hotel.id)
+        self.assertEqual(retrieved.name, u"Krasnapolsky")
+        self.assertEqual(retrieved.room.name, u"101")
+        hotel.delete()
+        self.assertRaises(NotFoundException, Hotel.objects.get, hotel.id)
+
+    def test_manager_clears_relation(self):
+        hotel = Hotel(id = uuid(), name = u"Krasnapolsky", room = Room(name = u"101"))
+        hotel.save()
+        hotel.room = None
+        hotel.save()
+        self.assertTrue(Hotel.objects.get(hotel.id).room is None)
+        hotel.room = Room(name = u"102")
+        Hotel.objects.save_many([hotel])
+        hotel.room = None
+        Hotel.objects.save_many([hotel])
+        self.assertTrue(Hotel.objects.get(hotel.id).room is None)
+        column_family = Hotel.objects._get_column_family()
+        column_family.insert('r', {'name': u'A', 'city': u'Zeist'})
+        column_family.insert('r', {'name': u'B'}, replace = True)
+        self.assertEqual(column_family.get('r'), {'name': u'B'})
+
+    def tearDown(self):
+        backendCache.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import datetime
+
+from django.core.exceptions import ValidationError
+
+from django_documents.temporal import (DateTimeParser, DATETIME_FORMATS, parse_datetimes, parse_date, parse_time,
+                                       format_date, format_datetime, format_datetimes, TemporalFormatError)
+from django_documents.documents import Model
+from django_documents.serializer import JsonSerializer, JsonUnSerializer, XMLSerializer, XMLUnserializer
+from django_documents import fields
+
+
+class Appointment(Model):
+    day = fields.DateField()
+    start = fields.DateTimeField()
+    at = fields.TimeField()
+    logged = fields.DateTimeField(strict = True, blank = True, null = True)
+
+
+class TemporalTest(TestCase):
+
+    def test_parse_datetime_formats(self):
+        parser = DateTimeParser()
+        self.assertEqual(parser.parse('2013-05-22 10:30:15'), datetime.datetime(2013, 5, 22, 10, 30, 15))
+        self.assertEqual(parser.parse('2013-05-22T10:30'), datetime.datetime(2013, 5, 22, 10, 30))
+        self.assertEqual(parser.parse('2013-05-22 10:30:15.5'), datetime.datetime(2013, 5, 22, 10, 30, 15, 500000))
+        self.assertTrue(parser.last_format is DATETIME_FORMATS[1])
+        self.assertEqual(parser.parse('2013-05-22'), datetime.datetime(2013, 5, 22))
+        # other formats are parsed by dateutil
+        self.assertEqual(parser.parse('May 22 2013 10:30'), datetime.datetime(2013, 5, 22, 10, 30))
+        self.assertRaises(ValueError, parser.parse, '2013-13-22 10:30:15')
+
+    def test_strict(self):
+        parser = DateTimeParser(strict = True)
+        self.assertRaises(TemporalFormatError, parser.parse, 'May 22 2013 10:30')
+        value = parser.parse('2013-05-22T10:30:15.123+02:00')
+        self.assertEqual(value.utcoffset(), datetime.timedelta(hours = 2))
+        self.assertEqual(value.microsecond, 123000)
+        self.assertEqual(parser.parse('2013-05-22T10:30:15Z').utcoffset(), datetime.timedelta(0))
+        # the same instant in other time zones
+        self.assertEqual(format_datetime(parser.parse('2012-01-02T10:00:00+02:00'), 'T'), '2012-01-02T10:00:00')
+        self.assertEqual(format_datetime(parser.parse('2012-01-02T08:00:00Z'), 'T'), '2012-01-02T08:00:00')
+
+    def test_batch(self):
+        values = parse_datetimes(['2013-05-22 10:30:15', None, '2014-01-01 00:00:00'])
+        self.assertEqual(values, [datetime.datetime(2013, 5, 22, 10, 30, 15), None, datetime.datetime(2014, 1, 1)])
+        self.assertEqual(format_datetimes(values, 'T'), ['2013-05-22T10:30:15', None, '2014-01-01T00:00:00'])
+
+    def test_dates_and_times(self):
+        self.assertEqual(parse_date('2013-5-2'), datetime.date(2013, 5, 2))
+        self.assertRaises(TemporalFormatError, parse_date, '22-05-2013')
+        self.assertEqual(parse_time('10:30'), datetime.time(10, 30))
+        self.assertEqual(parse_time('9:30:01'), datetime.time(9, 30, 1))
+        self.assertEqual(format_date(datetime.date(1850, 1, 2)), '1850-01-02')
+        self.assertEqual(format_datetime(datetime.datetime(1850, 1, 2, 3, 4, 5, 6)), '1850-01-02 03:04:05')
+
+    def test_fields(self):
+        appointment = Appointment(day = '2013-05-22', start = '2013-05-22 10:30:00', at = '10:30:00')
+        appointment.full_clean()
+        self.assertEqual(appointment.day, datetime.date(2013, 5, 22))
+        self.assertEqual(appointment.start, datetime.datetime(2013, 5, 22, 10, 30))
+        self.assertEqual(Appointment._meta.get_field('start').value_to_string(appointment), '2013-05-22T10:30:00')
+        appointment.logged = 'May 22 2013 10:30'
+        self.assertRaises(ValidationError, appointment.full_clean)
+
+    def test_serializers(self):
+        appointment = Appointment(day = datetime.date(2013, 5, 22), start = datetime.datetime(2013, 5, 22, 10, 30, 1, 5),
+                                  at = datetime.time(10, 30))
+        json = JsonSerializer().serialize(appointment)
+        self.assertTrue('"2013-05-22 10:30:01"' in json)
+        self.assertEqual(JsonUnSerializer().unserialize(json).start, datetime.datetime(2013, 5, 22, 10, 30, 1))
+        unser_appointment = XMLUnserializer().unserialize(XMLSerializer().serialize(appointment), Appointment)
+        self.assertEqual(unser_appointment.start, appointment.start)
+        self.assertEqual(unser_appointment.day, appointment.day)
+        self.assertEqual(unser_appointment.at, appointment.at)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import types
+
+from django_documents.documents import Model, ObjectValidationError
+from django_documents.serializer import JsonSerializer, JsonUnSerializer, PythonDeserializer
+from django_documents import fields, related
+
+
+class Track(Model):
+    title = fields.CharField(max_length = 10)
+    seconds = fields.IntegerField()
+
+
+class Album(Model):
+    name = fields.CharField()
+    genre = fields.CharField(choices = (('pop', 'Pop'), ('jazz', 'Jazz')), blank = True, null = True)
+    tracks = related.ListOf(Track, min_length = 1)
+    bonus = related.OneOf(Track, blank = True, null = True)
+    tags = related.ListOf(types.StringType, blank = True, null = True)
+
+
+class UnserializeValidateTest(TestCase):
+
+    def create_album(self):
+        album = Album(name = u"album", genre = u"jazz", tags = ["a"])
+        album.tracks = [Track(title = u"one", seconds = 10), Track(title = u"two", seconds = 20)]
+        album.bonus = Track(title = u"bonus", seconds = 5)
+        return album
+
+    def test_valid_document(self):
+        json = JsonSerializer().serialize(self.create_album())
+        album = JsonUnSerializer().unserialize(json, validate = True)
+        self.assertEqual(album.tracks[1].seconds, 20)
+        self.assertEqual(JsonSerializer().serialize(album), json)
+
+    def test_same_errors_as_full_clean(self):
+        album = self.create_album()
+        album.genre = "rock"
+        album.tracks[1].title = u"much too long"
+        album.bonus.seconds = None
+        json = JsonSerializer().serialize(album)
+
+        try:
+            album.full_clean()
+            self.fail("expected an object validation error")
+        except ObjectValidationError, ove:
+            expected = ove.message_dict
+        try:
+            JsonUnSerializer().unserialize(json, validate = True)
+            self.fail("expected an object validation error")
+        except ObjectValidationError, ove:
+            self.assertEqual(ove.message_dict, expected)
+            self.assertEqual(ove.obj.tracks[1].title, u"much too long")
+
+    def test_conversion_errors(self):
+        album_dict = {'_clazz': 'test_unserialize_validate.Album', 'name': u"album",
+                      'tracks': [{'title': u"one", 'seconds': u"ten"}]}
+        try:
+            PythonDeserializer().unserialize(album_dict, validate = True)
+            self.fail("expected an object validation error")
+        except ObjectValidationError, ove:
+            self.assertEqual(ove.message_dict['tracks']['tracks.0'].keys(), ['seconds'])
+        album_dict['tracks'] = []
+        try:
+            PythonDeserializer().unserialize(album_dict, validate = True)
+            self.fail("expected an object validation error")
+        except ObjectValidationError, ove:
+            self.assertEqual(ove.message_dict.keys(), ['tracks'])
+
+
+if __name__ == '__main__':
+    main()
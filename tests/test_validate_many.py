@@ -0,0 +1,41 @@
+import prepare_settings
+
+from unittest import TestCase, main
+import datetime
+
+from django_documents.validation import validate_many
+from model_definitions_for_test import ModelWithAllBaseFields
+
+
+class ValidateManyTest(TestCase):
+
+    def create_models(self, count, invalid = ()):
+        models = [ModelWithAllBaseFields(char = "c%s" % i, integer = i, float = 1.5, date = datetime.date(2012, 1, 1))
+                  for i in range(count)]
+        for i in invalid:
+            models[i].integer = "not a number"
+        return models
+
+    def test_validate_many_in_process(self):
+        report = validate_many(self.create_models(10, invalid = (3, 7)))
+        self.assertFalse(report.is_valid())
+        self.assertEqual(report.count, 10)
+        self.assertEqual(sorted(report.errors.keys()), [3, 7])
+        self.assertTrue('integer' in report.errors[3])
+        stats = report.get_class_stats()
+        self.assertEqual(stats['model_definitions_for_test.ModelWithAllBaseFields']['count'], 10)
+
+    def test_validate_many_workers(self):
+        report = validate_many(self.create_models(50, invalid = (20,)), workers = 2, chunksize = 4)
+        self.assertEqual(report.count, 50)
+        self.assertEqual(report.errors.keys(), [20])
+
+    def test_fail_fast(self):
+        report = validate_many(self.create_models(50, invalid = (5, 30)), workers = 2, fail_fast = True)
+        self.assertEqual(report.count, 6)
+        self.assertEqual(report.errors.keys(), [5])
+        self.assertTrue(validate_many(self.create_models(5), fail_fast = True).is_valid())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import prepare_settings
+
+from unittest import TestCase, main
+
+from django.core.exceptions import ValidationError
+
+from django_documents.documents import Model, ObjectValidationError
+from django_documents.validation import get_validation_plan
+from django_documents import fields, related
+
+
+class PlanChild(Model):
+    name = fields.CharField(max_length = 5)
+
+
+class PlanDocument(Model):
+    title = fields.CharField()
+    remark = fields.TextField(blank = True, null = True)
+    number = fields.IntegerField(blank = True, null = True)
+    child = related.OneOf(PlanChild, blank = True, null = True)
+    children = related.ListOf(PlanChild, blank = True, null = True)
+
+
+class CheckedChild(PlanChild):
+
+    def clean_fields(self, exclude = None):
+        raise ValidationError(u"checked")
+
+
+class ValidationPlanTest(TestCase):
+
+    def test_noop_fields_are_skipped(self):
+        names = [check.name for check in get_validation_plan(PlanDocument).checks]
+        self.assertEqual(names, ['title', 'number', 'child', 'children'])
+        self.assertTrue(get_validation_plan(PlanDocument) is get_validation_plan(PlanDocument))
+
+    def test_exclude_and_conversion(self):
+        doc = PlanDocument(number = "12")
+        doc.full_clean(exclude = ['title'])
+        self.assertEqual(doc.number, 12)
+        try:
+            doc.full_clean()
+            self.fail("expected an object validation error")
+        except ObjectValidationError, ove:
+            self.assertEqual(ove.message_dict.keys(), ['title'])
+            self.assertTrue(ove.obj is doc)
+
+    def test_nested_errors(self):
+        doc = PlanDocument(title = u"doc")
+        doc.child = PlanChild(name = u"too long")
+        doc.children = [PlanChild(name = u"ok"), PlanChild(), PlanChild(name = u"too long")]
+        try:
+            doc.full_clean()
+            self.fail("expected an object validation error")
+        except ObjectValidationError, ove:
+            self.assertEqual(sorted(ove.message_dict['children'].keys()), ['children.1', 'children.2'])
+            self.assertTrue('name' in ove.message_dict['child'])
+        self.assertTrue('name' in doc.children[1]._errors)
+        self.assertTrue('children' in doc._errors)
+
+    def test_overridden_clean_fields(self):
+        doc = PlanDocument(title = u"doc", child = CheckedChild(name = u"ok"))
+        try:
+            doc.full_clean()
+            self.fail("expected an object validation error")
+        except ObjectValidationError, ove:
+            self.assertEqual(ove.message_dict['child'], {'__all__': [u"checked"]})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import prepare_settings
+
+from unittest import TestCase, main
+from datetime import date
+
+from django_documents.serializer import XMLSerializer, XMLUnserializer
+from model_definitions_for_test import ModelWithAllBaseFields, ModelWithListModelWithAllBaseFields, ModelWithListOffStringType, ModelWithOneOffField
+
+
+class XMLIncrementalUnserializerTest(TestCase):
+
+    def create_list_model(self, count):
+        model = ModelWithListModelWithAllBaseFields(name="list")
+        model.listOf = [ModelWithAllBaseFields(char="c%s" % i, integer=i, float=1.5, date=date(2012, 1, 1))
+                        for i in range(count)]
+        return model
+
+    def test_incremental_equals_default(self):
+        model = ModelWithOneOffField(name="test")
+        model.oneOf = ModelWithAllBaseFields(char="ab", integer=8, float=12.3, date=date(1968, 9, 17))
+        xml = XMLSerializer().serialize(model)
+
+        unser_model = XMLUnserializer().unserialize_incremental(xml, ModelWithOneOffField)
+        default_model = XMLUnserializer().unserialize(xml, ModelWithOneOffField)
+        self.assertEqual(unser_model.name, default_model.name)
+        self.assertEqual(unser_model.oneOf.date, default_model.oneOf.date)
+        self.assertEqual(unser_model.oneOf.integer, 8)
+
+    def test_incremental_list(self):
+        xml = XMLSerializer().serialize(self.create_list_model(50))
+        unser_model = XMLUnserializer().unserialize_incremental(xml, ModelWithListModelWithAllBaseFields)
+        self.assertEqual(unser_model.name, "list")
+        self.assertEqual(len(unser_model.listOf), 50)
+        self.assertEqual(unser_model.listOf[49].char, "c49")
+
+    def test_incremental_list_of_strings(self):
+        xml = XMLSerializer().serialize(ModelWithListOffStringType(name="test", listOfString=["aap", "noot"]))
+        unser_model = XMLUnserializer().unserialize_incremental(xml, ModelWithListOffStringType)
+        self.assertEqual(unser_model.listOfString, ["aap", "noot"])
+
+    def test_iter_list_items(self):
+        xml = XMLSerializer().serialize(self.create_list_model(20))
+        items = XMLUnserializer().iter_list_items(xml, ModelWithListModelWithAllBaseFields, "listOf")
+        integers = [item.integer for item in items]
+        self.assertEqual(integers, range(20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import prepare_settings
+
+from unittest import TestCase, main
+
+from django_documents.serializer import XMLSerializer, XMLUnserializer, get_xml_children
+from django_documents import documents, fields, related
+from elementtree.ElementTree import fromstring
+
+
+class Animal(documents.Model):
+    name = fields.CharField()
+
+
+class Dog(Animal):
+    barks = fields.IntegerField()
+
+
+class Zoo(documents.Model):
+    city = fields.CharField(xml_element_name = 'town')
+    size = fields.IntegerField()
+    animals = related.ListOf(Animal)
+    favourite = related.OneOf(Animal)
+
+
+class XMLSinglePassTest(TestCase):
+
+    def test_children_by_name(self):
+        element = fromstring('<Zoo><town>Utrecht</town><unknown>x</unknown><size>1</size><town>Zeist</town></Zoo>')
+        children = get_xml_children(Zoo, element)
+        self.assertEqual(sorted(children.keys()), ['size', 'town'])
+        self.assertEqual(children['town'].text, 'Utrecht')
+
+    def test_first_element_wins(self):
+        xml = '<Zoo><town>Utrecht</town><size>1</size><town>Zeist</town></Zoo>'
+        zoo = XMLUnserializer().unserialize(xml, Zoo)
+        self.assertEqual(zoo.city, u'Utrecht')
+        self.assertEqual(zoo.size, 1)
+
+    def test_polymorphic_items(self):
+        zoo = Zoo(city=u'Amersfoort', size=2)
+        zoo.animals = [Animal(name=u'cat'), Dog(name=u'dog', barks=3)]
+        zoo.favourite = Dog(name=u'rex', barks=1)
+        unser_zoo = XMLUnserializer().unserialize(XMLSerializer().serialize(zoo), Zoo)
+        self.assertEqual(unser_zoo.city, u'Amersfoort')
+        self.assertEqual([animal.__class__ for animal in unser_zoo.animals], [Animal, Dog])
+        self.assertEqual(unser_zoo.animals[1].barks, 3)
+        self.assertTrue(isinstance(unser_zoo.favourite, Dog))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import prepare_settings
+
+from unittest import TestCase, main
+from StringIO import StringIO
+
+from django_documents.xmlwriter import XMLWriter, get_text_element_tags, get_element_tags
+from django_documents.serializer import XMLSerializer
+from model_definitions_for_test import ModelWithAllBaseFields, ModelWithListOffStringType
+
+
+class XMLWriterTest(TestCase):
+
+    def test_empty_elements(self):
+        stream = StringIO()
+        writer = XMLWriter(stream)
+        root = writer.start("root", {"b": "2", "a": "1"})
+        writer.start("empty")
+        writer.end()
+        writer.start("empty_text")
+        writer.data(u"")
+        writer.end()
+        writer.close(root)
+        self.assertEqual(stream.getvalue(), '<root a="1" b="2"><empty /><empty_text></empty_text></root>')
+
+    def test_escaping(self):
+        stream = StringIO()
+        writer = XMLWriter(stream)
+        writer.element("text", u"a<b & \xeb", {"q": u"\"'"})
+        writer.flush()
+        self.assertEqual(stream.getvalue(), '<text q="&quot;&apos;">a&lt;b &amp; &#235;</text>')
+
+    def test_buffered(self):
+        stream = StringIO()
+        writer = XMLWriter(stream, buffer_size=100)
+        root = writer.start("root")
+        tags = get_text_element_tags(ModelWithAllBaseFields._meta, "char", "char")
+        writer.text_element(tags, u"value")
+        self.assertEqual(stream.getvalue(), "")
+        for i in range(20):
+            writer.text_element(tags, u"value")
+        self.assertTrue(len(stream.getvalue()) >= 100)
+        writer.close(root)
+        self.assertEqual(stream.getvalue(), "<root>%s</root>" % ("<char>value</char>" * 21))
+
+    def test_prepared_tags(self):
+        start_tag, typed_start_tag, tag = get_element_tags(ModelWithAllBaseFields)
+        self.assertEqual(start_tag, "<ModelWithAllBaseFields")
+        self.assertEqual(typed_start_tag, '<ModelWithAllBaseFields type="model_definitions_for_test.ModelWithAllBaseFields"')
+        self.assertTrue(get_element_tags(ModelWithAllBaseFields) is get_element_tags(ModelWithAllBaseFields))
+
+    def test_serializer_output(self):
+        model = ModelWithListOffStringType(name=u"a&b")
+        model.listOfString = ["x", "y"]
+        self.assertEqual(XMLSerializer().serialize(model),
+                         '<ModelWithListOffStringType><name>a&amp;b</name>'
+                         '<listOfString><item>x</item><item>y</item></listOfString></ModelWithListOffStringType>')
+
+
+if __name__ == '__main__':
+    main()